@@ -0,0 +1,139 @@
+import os
+import math
+from typing import List, Dict, Any, Tuple
+
+# Token budget for the profile part of the insights prompt
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# Share of the budget reserved for column stats; correlations get the rest
+PROMPT_COLUMN_SHARE = float(os.getenv("PROMPT_COLUMN_SHARE", "0.6"))
+
+# tiktoken is optional: without it tokens are estimated from characters
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+def _fmt(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value).replace("|", "/")
+
+def correlation_pairs(correlation: Dict[str, Dict[str, Any]]) -> List[Tuple[str, str, float]]:
+    """Distinct column pairs of a correlation matrix, strongest |r| first."""
+    pairs = []
+    columns = list(correlation)
+    for i, a in enumerate(columns):
+        row = correlation[a] or {}
+        for b in columns[i + 1:]:
+            r = row.get(b)
+            if r is not None and not math.isnan(r):
+                pairs.append((a, b, r))
+    pairs.sort(key=lambda p: -abs(p[2]))
+    return pairs
+
+def _skew(stats: Dict[str, Any]):
+    """Pearson's median skewness, 3 * (mean - median) / std, from the describe stats."""
+    mean, median, std = stats.get("mean"), stats.get("50%"), stats.get("std")
+    if mean is None or median is None or not std:
+        return None
+    return 3 * (mean - median) / std
+
+def _column_rows(summary: Dict[str, Dict[str, Any]], row_count: int,
+                 correlated: Dict[str, float]) -> List[Tuple[float, str, str]]:
+    """(score, kind, row) per column; higher scores are more worth showing."""
+    rows = []
+    for col, stats in summary.items():
+        missing = stats.get("missing_count") or 0
+        missing_pct = 100 * missing / row_count if row_count else 0.0
+        if stats.get("mean") is not None:
+            skew = _skew(stats)
+            score = missing_pct / 100 + min(abs(skew or 0) / 3, 1) + correlated.get(col, 0)
+            values = [col, missing_pct, stats.get("mean"), stats.get("std"), stats.get("min"),
+                      stats.get("50%"), stats.get("max"), skew]
+            rows.append((score, "numeric", "|".join(_fmt(v) for v in values)))
+        else:
+            unique = stats.get("unique")
+            # Near-constant and near-unique columns are both notable
+            dominance = (stats.get("freq") or 0) / stats["count"] if stats.get("count") else 0
+            score = missing_pct / 100 + dominance / 2
+            values = [col, missing_pct, unique, stats.get("top"), stats.get("freq")]
+            rows.append((score, "categorical", "|".join(_fmt(v) for v in values)))
+    rows.sort(key=lambda r: -r[0])
+    return rows
+
+def compact_profile(profile: Dict[str, Any], budget: int = PROMPT_TOKEN_BUDGET) -> Tuple[str, Dict[str, int]]:
+    """
+    Renders the profile as compact pipe-separated tables, keeping the most
+    informative columns (missingness, skew, strong correlations) and the
+    strongest correlation pairs that fit in `budget` tokens. Returns the
+    text and token/selection counts.
+    """
+    summary = profile.get("summary", {}) or {}
+    row_count = profile.get("row_count") or max((s.get("count") or 0 for s in summary.values()), default=0)
+    if profile.get("correlation_pairs") is not None:
+        # Already the strongest pairs, strongest first
+        pairs = [(p["a"], p["b"], p["r"]) for p in profile["correlation_pairs"]]
+    else:
+        pairs = correlation_pairs(profile.get("correlation", {}) or {})
+
+    correlated = {}
+    for a, b, r in pairs:
+        correlated[a] = max(correlated.get(a, 0), abs(r))
+        correlated[b] = max(correlated.get(b, 0), abs(r))
+
+    header = f"{row_count} rows x {len(summary)} columns. Missing is a percentage; skew is 3*(mean-median)/std."
+    if profile.get("approximate"):
+        bounds = profile.get("error_bounds", {})
+        header += (f"\nThis is an APPROXIMATE profile from sketches: quantiles are within "
+                   f"{bounds.get('quantile_rank_error', 0):.1%} in rank, distinct counts within "
+                   f"{bounds.get('distinct_relative_error', 0):.1%}; top category counts are lower bounds.")
+        if profile.get("truncated"):
+            header += " Only the first rows of the file were read."
+    used = count_tokens(header)
+
+    # Column rows, best first, up to their share of the budget
+    column_budget = used + int((budget - used) * PROMPT_COLUMN_SHARE) if pairs else budget
+    numeric, categorical = [], []
+    for _, kind, row in _column_rows(summary, row_count, correlated):
+        cost = count_tokens(row) + 1
+        if used + cost > column_budget:
+            break
+        (numeric if kind == "numeric" else categorical).append(row)
+        used += cost
+
+    # Correlation pairs fill whatever is left
+    pair_rows = []
+    for a, b, r in pairs:
+        row = f"{_fmt(a)}|{_fmt(b)}|{r:.3f}"
+        cost = count_tokens(row) + 1
+        if used + cost > budget:
+            break
+        pair_rows.append(row)
+        used += cost
+
+    sections = [header]
+    if numeric:
+        sections.append("Numeric columns (name|missing|mean|std|min|median|max|skew):\n" + "\n".join(numeric))
+    if categorical:
+        sections.append("Categorical columns (name|missing|unique|top|top_freq):\n" + "\n".join(categorical))
+    if pair_rows:
+        sections.append("Strongest correlations (a|b|r):\n" + "\n".join(pair_rows))
+    shown = len(numeric) + len(categorical)
+    if shown < len(summary) or len(pair_rows) < len(pairs):
+        sections.append(f"({shown} of {len(summary)} columns and {len(pair_rows)} of {len(pairs)} "
+                        f"correlation pairs shown, ranked by informativeness.)")
+    text = "\n\n".join(sections)
+
+    return text, {
+        "tokens": count_tokens(text),
+        "columns": shown,
+        "pairs": len(pair_rows)
+    }
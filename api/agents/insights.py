@@ -1,25 +1,39 @@
 import json
+import logging
+from ..services import metrics
 from ..services.llm_client import get_llm_client
+from .compaction import compact_profile, count_tokens
 
-async def generate_insights(dataset_profile: dict) -> list:
+logger = logging.getLogger(__name__)
+
+def _uncompacted_tokens(dataset_profile: dict) -> int:
+    """Tokens the profile would take as pretty-printed JSON; costly on wide profiles, debug only."""
+    return sum(
+        count_tokens(json.dumps(dataset_profile.get(key, default), indent=2))
+        for key, default in (("summary", {}), ("correlation", {}), ("correlation_pairs", []))
+    )
+
+async def generate_insights(dataset_profile: dict, use_cache: bool = True) -> list:
     """
     Uses the LLM to generate insights from the dataset profile.
+    `use_cache=False` forces a fresh completion.
     """
     client = get_llm_client()
     
     # Construct Prompt
-    # We truncate summary to avoid context window issues in simple implementations
-    summary_str = json.dumps(dataset_profile.get("summary", {}), indent=2)
-    corr_str = json.dumps(dataset_profile.get("correlation", {}), indent=2)
+    # Pretty-printed JSON of wide profiles overflows the context window, so
+    # only the most informative stats that fit the token budget are sent
+    with metrics.span("prompt_compaction"):
+        profile_str, compacted = compact_profile(dataset_profile)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Insights prompt profile: %d -> %d tokens (%d columns, %d correlation pairs)",
+                     _uncompacted_tokens(dataset_profile), compacted["tokens"],
+                     compacted["columns"], compacted["pairs"])
     
     prompt = f"""
     You are an expert Data Analyst. Analyze the following dataset summary and correlation matrix.
     
-    Summary Stats:
-    {summary_str}
-    
-    Correlation Matrix:
-    {corr_str}
+    {profile_str}
     
     Provide 3 distinct, interesting business or data quality insights.
     Return the response as a valid JSON array of objects with keys: "title", "description", "confidence" (0-1), "verification_code" (pandas/python).
@@ -27,7 +41,7 @@ async def generate_insights(dataset_profile: dict) -> list:
     """
     
     # Call LLM
-    response_text = await client.generate(prompt)
+    response_text = await client.generate(prompt, use_cache=use_cache)
     
     # Parse Response
     try:
@@ -39,5 +53,6 @@ async def generate_insights(dataset_profile: dict) -> list:
         insights = json.loads(cleaned_text)
         return insights
     except json.JSONDecodeError:
-        print(f"Failed to parse LLM response: {response_text}")
+        logger.error("Failed to parse LLM response: %s", response_text)
+        metrics.error("insights_parse")
         return []
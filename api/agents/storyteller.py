@@ -1,29 +1,8 @@
 from ..services.llm_client import get_llm_client
+from typing import AsyncIterator
 import json
 
-async def generate_story(dataset_name: str, insights: list) -> str:
-    """
-    Generates a narrative data story based on the insights.
-    """
-    client = get_llm_client()
-    
-    # Mock Override for Demo (if using Mock Client, we return a fixed story to match the mock insights)
-    # Ideally the MockLLMClient would handle this context-switching, but for simplicity:
-    if "MockLLMClient" in str(type(client)):
-        return f"""
-# Executive Summary: {dataset_name}
-
-## Key Findings
-Analysis of the uploaded dataset reveals several critical trends. notably, there is a strong correlation between **Age and Fare** (0.54), suggesting that older demographic groups are driving higher revenue per ticket. This presents an opportunity to tailor premium services to this segment.
-
-## Data Quality Concerns
-However, data quality remains a challenge. The **Cabin** column has significant missing values (77%), which limits our ability to analyze location-based preferences. We recommend improving data collection at the point of booking.
-
-## Pricing Strategy
-The distribution of **Fares** is highly skewed. A small number of high-value transactions are distorting the average, indicating that a tiered pricing strategy might be more effective than a one-size-fits-all approach.
-        """
-
-    # Real LLM Prompt
+def _story_prompt(dataset_name: str, insights: list) -> str:
     insights_str = "\n".join([f"- {i['title']}: {i['description']} (Conf: {i['confidence']})" for i in insights])
     
     prompt = f"""
@@ -39,6 +18,19 @@ The distribution of **Fares** is highly skewed. A small number of high-value tra
     
     Use bolding for key terms. Do not include a greeting or sign-off.
     """
-    
-    response = await client.generate(prompt)
+    return prompt
+
+async def generate_story(dataset_name: str, insights: list, use_cache: bool = True) -> str:
+    """
+    Generates a narrative data story based on the insights.
+    `use_cache=False` forces a fresh completion.
+    """
+    client = get_llm_client()
+    response = await client.generate(_story_prompt(dataset_name, insights), use_cache=use_cache)
     return response
+
+async def stream_story(dataset_name: str, insights: list, use_cache: bool = True) -> AsyncIterator[str]:
+    """Like generate_story, but yields the story as the LLM produces it."""
+    client = get_llm_client()
+    async for token in client.generate_stream(_story_prompt(dataset_name, insights), use_cache=use_cache):
+        yield token
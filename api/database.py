@@ -1,5 +1,6 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -14,21 +15,51 @@ USE_SQLITE = os.getenv("USE_SQLITE", "True") # Defaulting to True for now given
 
 if USE_SQLITE == "True":
     SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+    ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./sql_app.db"
     # SQLite requires check_same_thread=False
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
     )
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
 else:
     SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    ASYNC_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
 
+# Sync sessions are for code outside the event loop (analysis jobs, seeding)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request handlers use async sessions so queries don't block the event loop.
+# Objects stay usable after commit; lazy loads are not available, so load
+# relationships explicitly (selectinload)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+def upgrade_schema(bind=engine):
+    """
+    Creates missing tables, then adds the columns and indexes that models
+    gained since an existing database was created, which create_all never
+    does. Existing rows get the new column's scalar default. Idempotent, so
+    it runs at every startup.
+    """
+    Base.metadata.create_all(bind=bind)
+    quote = bind.dialect.identifier_preparer.quote
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+                if column.default is not None and column.default.is_scalar:
+                    conn.execute(table.update().where(column.is_(None)).values({column.name: column.default.arg}))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,15 +1,18 @@
 from fastapi import Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import Optional
 from .database import get_db
 from .models import User, Tenant
+from .services.identity import get_identity_cache, UserSnapshot
 
 # Mocking Auth for Initial Dev (until Keycloak is fully wired)
 # In production, this would verify the Bearer token against Keycloak's public key.
 
 async def get_current_user(
     x_user_email: Optional[str] = Header(None, alias="X-User-Email"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Simulates getting the current user. 
@@ -21,14 +24,23 @@ async def get_current_user(
         # In real prod, raise 401
         return None 
         
-    user = db.query(User).filter(User.email == x_user_email).first()
+    cache = get_identity_cache()
+    snapshot = cache.get(x_user_email)
+    if snapshot is not None:
+        return snapshot
+
+    # User and tenant in one query; async sessions can't lazy-load the tenant later
+    user = await db.scalar(
+        select(User).options(joinedload(User.tenant)).where(User.email == x_user_email)
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    cache.put(snapshot)
+    return snapshot
 
 async def get_current_tenant(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     """
     Resolves the tenant for the current request.
@@ -1,15 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
+from fastapi.responses import Response
+from .database import async_engine, upgrade_schema
 from .routers import datasets
+from .services import jobs, llm_client, metrics
+from .services.llm_cache import CachingLLMClient
 
-# Create Tables (for MVP simple init)
-Base.metadata.create_all(bind=engine)
+# Create tables, and add columns and indexes new since the database was created
+upgrade_schema()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.resume_pending()
+    await llm_client.startup()
+    yield
+    await llm_client.shutdown()
+    jobs.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="AI Data Storytelling API",
     description="Backend API for AI Data Storytelling SaaS",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 app.include_router(datasets.router)
@@ -22,12 +36,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets browser clients read the per-stage timings
+    expose_headers=["Server-Timing"],
 )
 
+# Outermost, so request latency includes the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "service": "api"}
 
+@app.get("/llm/cache")
+async def llm_cache_stats():
+    client = llm_client.get_llm_client()
+    if not isinstance(client, CachingLLMClient):
+        return {"enabled": False}
+    return {"enabled": True, **client.stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage timings, per-route latency, cache and LLM token counters in Prometheus text format."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to AI Data Storytelling API"}
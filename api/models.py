@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Uuid, JSON
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Uuid, JSON, Index, Integer, LargeBinary
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -32,11 +32,51 @@ class Dataset(Base):
     id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, index=True)
     description = Column(Text, nullable=True)
-    meta_info = Column(JSON, nullable=True)
+    meta_info = Column(JSON, nullable=True)  # Profile overview; the large sections are in ProfileSection
     insights = Column(JSON, nullable=True)
     story = Column(Text, nullable=True)
-    file_path = Column(String)  # MinIO path: tenants/{tenant_id}/{dataset_id}.csv
+    status = Column(String, default="ready")  # pending, running, ready, failed
+    profile_mode = Column(String, default="exact")  # exact, approximate (sketches)
+    file_path = Column(String)  # MinIO path: {tenant_id}/blobs/{content_hash}.csv
+    content_hash = Column(String, index=True, nullable=True)  # sha256 of the uploaded file
+    columnar_path = Column(String, nullable=True)  # Parquet copy next to the CSV, if written
+    ingest_schema = Column(JSON, nullable=True)  # Column kinds sniffed at ingest, used to pick load dtypes
+    profile_state_path = Column(String, nullable=True)  # Mergeable profile state, written on first append
     tenant_id = Column(Uuid(as_uuid=True), ForeignKey("tenants.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
     
     tenant = relationship("Tenant", back_populates="datasets")
+    chunks = relationship("DatasetChunk", back_populates="dataset", order_by="DatasetChunk.seq")
+    profile_sections = relationship("ProfileSection", back_populates="dataset")
+
+    __table_args__ = (
+        # Serves the newest-first, keyset-paginated dataset listing
+        Index("ix_datasets_tenant_created", "tenant_id", "created_at"),
+    )
+
+class DatasetChunk(Base):
+    """Rows appended to a dataset after its initial upload, one row per appended file."""
+    __tablename__ = "dataset_chunks"
+
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    dataset_id = Column(Uuid(as_uuid=True), ForeignKey("datasets.id"), index=True)
+    seq = Column(Integer)  # 1 for the first append; the original upload is chunk 0
+    file_path = Column(String)  # Content-addressed blob, like Dataset.file_path
+    content_hash = Column(String, nullable=True)
+    row_count = Column(Integer, nullable=True)
+    status = Column(String, default="pending")  # pending, running, ready, failed
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    dataset = relationship("Dataset", back_populates="chunks")
+
+class ProfileSection(Base):
+    """One large part of a dataset's profile (summary, distributions...), stored as compressed JSON."""
+    __tablename__ = "profile_sections"
+
+    dataset_id = Column(Uuid(as_uuid=True), ForeignKey("datasets.id"), primary_key=True)
+    name = Column(String, primary_key=True)
+    data = Column(LargeBinary)  # zlib-compressed JSON, see services.profile_store
+    size = Column(Integer)  # Uncompressed bytes
+
+    dataset = relationship("Dataset", back_populates="profile_sections")
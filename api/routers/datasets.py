@@ -1,98 +1,463 @@
+import os
+import logging
+import json
+import time
 import uuid
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import Dataset, Tenant
+import base64
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update, delete, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db, AsyncSessionLocal
+from ..models import Dataset, DatasetChunk, ProfileSection, Tenant
 from ..dependencies import get_current_tenant
-from ..services import storage, eda
+from ..services import storage, jobs, appends, eda, metrics, profile_store, profiling, column_arrays, correlation
 from ..agents import insights as insights_agent
 from ..agents import storyteller
 from ..services import rag, llm_client
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/datasets", tags=["datasets"])
 
+def _sse(data: dict, event: str = None) -> str:
+    """Formats one Server-Sent Events message."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def _event_stream(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _index_story(dataset_id: str, story: str):
+    # Index Story for RAG
+    try:
+        # Split story by paragraphs approximately
+        paragraphs = [p for p in story.split('\n\n') if p.strip()]
+        metas = [{"source": "story"} for _ in range(len(paragraphs))]
+        rag.index_text(dataset_id, paragraphs, metas)
+    except Exception:
+        logger.exception("Indexing story failed for dataset %s", dataset_id)
+        metrics.error("index")
+
+def _index_insights(dataset_id: str, generated: list):
+    # Index Insights for RAG
+    try:
+        texts = [f"Insight: {i['title']}. {i['description']}" for i in generated]
+        metas = [{"source": "insight"} for _ in range(len(texts))]
+        rag.index_text(dataset_id, texts, metas)
+    except Exception:
+        logger.exception("Indexing insights failed for dataset %s", dataset_id)
+        metrics.error("index")
+
+def _remove_dataset_files(dataset_id: str, paths: List[str]):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+    try:
+        rag.delete_index(dataset_id)
+    except Exception:
+        logger.exception("Removing the index failed for dataset %s", dataset_id)
+        metrics.error("index")
+
+async def _save_story(dataset_id: uuid.UUID, story: str):
+    # Streaming responses outlive the request's DB session, so use a fresh one
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Dataset).where(Dataset.id == dataset_id).values(story=story))
+        with metrics.span("db_commit"):
+            await db.commit()
+
 @router.post("/upload")
 async def upload_dataset(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    profile_mode: str = Query(eda.EXACT, pattern=f"^({eda.EXACT}|{eda.APPROXIMATE})$"),
+    upload_id: Optional[str] = Query(None, max_length=64),
+    db: AsyncSession = Depends(get_db),
     tenant: Tenant = Depends(get_current_tenant)
 ):
+    """
+    `profile_mode=approximate` profiles with bounded-memory sketches, for
+    very large files where exact statistics aren't worth the cost.
+    With a client-chosen `upload_id`, GET /datasets/uploads/{upload_id}
+    reports how much of the file has been stored while this request runs.
+    """
     if not tenant:
         raise HTTPException(status_code=400, detail="Tenant context required")
 
     dataset_id = uuid.uuid4()
-    object_name = f"{tenant.id}/{dataset_id}.csv"
-    
-    # Upload to MinIO
+
+    # Upload to MinIO, stored once per tenant under the content hash
+    # (blocking I/O, keep it off the event loop)
     try:
-        s3_path = storage.upload_file(file, object_name)
+        with metrics.span("storage_write"), storage.track_upload(tenant.id, upload_id, file.size) as progress:
+            s3_path, content_hash = await run_in_threadpool(storage.upload_blob, file, str(tenant.id), progress)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Storage error: {str(e)}")
 
-    # Run Analysis
-    analysis_result = eda.analyze_dataset(s3_path)
+    # Re-uploads of an already profiled file reuse its profile, unless rows
+    # were appended to that dataset since. An exact profile also serves
+    # approximate requests, not the other way round
+    accepted_modes = [eda.EXACT] if profile_mode == eda.EXACT else [eda.EXACT, eda.APPROXIMATE]
+    cached_profile = (await db.execute(select(
+        Dataset.id, Dataset.meta_info, Dataset.columnar_path, Dataset.profile_mode, Dataset.ingest_schema
+    ).where(
+        Dataset.tenant_id == tenant.id,
+        Dataset.content_hash == content_hash,
+        Dataset.status == jobs.READY,
+        or_(Dataset.profile_mode.in_(accepted_modes), Dataset.profile_mode.is_(None)),
+        ~Dataset.chunks.any()
+    ).limit(1))).first()
+    metrics.cache("profile", "hit" if cached_profile else "miss")
 
-    # Save to DB
+    # Save to DB; otherwise the profile is filled in by the analysis job
     new_dataset = Dataset(
         id=dataset_id,
         name=file.filename,
         file_path=s3_path,
+        content_hash=content_hash,
         tenant_id=tenant.id,
-        meta_info=analysis_result
+        status=jobs.READY if cached_profile else jobs.PENDING,
+        profile_mode=(cached_profile.profile_mode or eda.EXACT) if cached_profile else profile_mode,
+        meta_info=cached_profile.meta_info if cached_profile else None,
+        columnar_path=cached_profile.columnar_path if cached_profile else None,
+        ingest_schema=cached_profile.ingest_schema if cached_profile else None
     )
     db.add(new_dataset)
-    db.commit()
-    db.refresh(new_dataset)
+    if cached_profile:
+        await profile_store.copy(db, cached_profile.id, dataset_id)
+    with metrics.span("db_commit"):
+        await db.commit()
+
+    # Run Analysis in the worker pool
+    if not cached_profile:
+        jobs.submit_analysis(dataset_id, s3_path, profile_mode)
+
+    return {"id": str(dataset_id), "name": file.filename, "status": new_dataset.status}
 
-    return new_dataset
+@router.get("/uploads/{upload_id}")
+async def get_upload_progress(
+    upload_id: str,
+    tenant: Tenant = Depends(get_current_tenant)
+):
+    """Bytes stored so far of an upload or append sent with this `upload_id`; 404 once it has finished."""
+    progress = storage.upload_progress(tenant.id, upload_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="No upload in progress")
+    return progress
+
+def _encode_cursor(created_at: datetime, dataset_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{dataset_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, dataset_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(dataset_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/", response_model=List[dict])
 async def list_datasets(
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    prefix: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     tenant: Tenant = Depends(get_current_tenant)
 ):
+    """
+    Newest first, one page at a time. When more datasets follow, the
+    X-Next-Cursor header holds the `cursor` for the next page.
+    """
     if not tenant:
         raise HTTPException(status_code=400, detail="Tenant context required")
     
-    datasets = db.query(Dataset).filter(Dataset.tenant_id == tenant.id).all()
-    # Pydantic is stricter, but for MVP returning ORM dicts
-    return [{"id": str(d.id), "name": d.name, "created_at": d.created_at} for d in datasets]
+    # Only the listed columns; the profile/insights/story blobs stay in the DB
+    query = select(Dataset.id, Dataset.name, Dataset.created_at).where(Dataset.tenant_id == tenant.id)
+    if prefix:
+        query = query.where(Dataset.name.startswith(prefix, autoescape=True))
+    if cursor:
+        # Keyset pagination: rows strictly after the last one of the previous page
+        created_at, last_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            Dataset.created_at < created_at,
+            and_(Dataset.created_at == created_at, Dataset.id < last_id)
+        ))
+    query = query.order_by(Dataset.created_at.desc(), Dataset.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [{"id": str(d.id), "name": d.name, "created_at": d.created_at} for d in rows]
 
 @router.get("/{dataset_id}")
 async def get_dataset(
     dataset_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     tenant: Tenant = Depends(get_current_tenant)
 ):
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id, 
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
         Dataset.tenant_id == tenant.id
-    ).first()
+    ))
     
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
-        
+
+    # Scalar metadata only; the schema, stats and correlations are
+    # fetched from /profile as needed
+    meta_info = dataset.meta_info
+    if meta_info is not None:
+        meta_info = {k: v for k, v in meta_info.items() if k not in profile_store.SECTIONS}
+
     return {
         "id": str(dataset.id),
         "name": dataset.name,
         "created_at": dataset.created_at,
-        "meta_info": dataset.meta_info,
+        "status": dataset.status,
+        "meta_info": meta_info,
         "insights": dataset.insights,
         "story": dataset.story
     }
 
+@router.delete("/{dataset_id}")
+async def delete_dataset(
+    dataset_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    tenant: Tenant = Depends(get_current_tenant)
+):
+    """
+    Deletes the dataset with its appended chunks, stored profile and search
+    index. Uploaded files are content-addressed and may back other
+    datasets, so they are kept.
+    """
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
+        Dataset.tenant_id == tenant.id
+    ))
+
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    pending_appends = await db.scalar(select(func.count(DatasetChunk.id)).where(
+        DatasetChunk.dataset_id == dataset_id,
+        DatasetChunk.status.in_([jobs.PENDING, jobs.RUNNING])
+    ))
+    if dataset.status in (jobs.PENDING, jobs.RUNNING) or pending_appends:
+        raise HTTPException(status_code=409, detail="Dataset is still being analyzed")
+
+    files = appends.dataset_files(dataset.file_path, dataset.id)
+    await db.execute(delete(ProfileSection).where(ProfileSection.dataset_id == dataset_id))
+    await db.execute(delete(DatasetChunk).where(DatasetChunk.dataset_id == dataset_id))
+    await db.delete(dataset)
+    with metrics.span("db_commit"):
+        await db.commit()
+
+    await run_in_threadpool(_remove_dataset_files, str(dataset_id), files)
+    return {"id": str(dataset_id), "deleted": True}
+
+@router.get("/{dataset_id}/profile")
+async def get_dataset_profile(
+    dataset_id: uuid.UUID,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    tenant: Tenant = Depends(get_current_tenant)
+):
+    """
+    The dataset's profile, or only the comma-separated `fields` of it:
+    top-level parts (`distributions`) or single columns of a part
+    (`summary.Age`). Only the requested parts are decompressed.
+    """
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
+        Dataset.tenant_id == tenant.id
+    ))
+
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    if not dataset.meta_info:
+        raise HTTPException(status_code=400, detail="Dataset not analyzed yet")
+
+    try:
+        return await profile_store.load(db, dataset, profile_store.parse_fields(fields))
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Unknown profile field: {e.args[0]}")
+
+@router.get("/{dataset_id}/columns/{column}/distribution")
+async def get_column_distribution(
+    dataset_id: uuid.UUID,
+    column: str,
+    bins: Optional[int] = Query(None, ge=1, le=column_arrays.DISTRIBUTION_MAX_BINS),
+    value_range: Optional[str] = Query(None, alias="range"),
+    top: int = Query(profiling.TOP_K, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    tenant: Tenant = Depends(get_current_tenant)
+):
+    """
+    Histogram of a numeric column with `bins` bins over `range=min,max`
+    (default: adapted to the data, over all values), or the `top` most
+    frequent values of any other column. Computed over all rows, including
+    appended ones, from per-column arrays cached on first use.
+    """
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
+        Dataset.tenant_id == tenant.id
+    ))
+
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    if dataset.status != jobs.READY or not dataset.meta_info:
+        raise HTTPException(status_code=400, detail="Dataset not analyzed yet")
+
+    schema = (await profile_store.load(db, dataset, ["schema"])).get("schema") or {}
+    if column not in schema:
+        raise HTTPException(status_code=404, detail="Column not found")
+
+    appended = (await db.execute(select(DatasetChunk.file_path).where(
+        DatasetChunk.dataset_id == dataset_id,
+        DatasetChunk.status == jobs.READY
+    ).order_by(DatasetChunk.seq))).scalars().all()
+    file_paths = [dataset.columnar_path or dataset.file_path, *appended]
+
+    try:
+        parsed_range = column_arrays.parse_range(value_range)
+        return await run_in_threadpool(column_arrays.distribution, file_paths, column, bins, parsed_range, top)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{dataset_id}/columns/{column}/correlations")
+async def get_column_correlations(
+    dataset_id: uuid.UUID,
+    column: str,
+    top: int = Query(20, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    tenant: Tenant = Depends(get_current_tenant)
+):
+    """
+    The `top` strongest correlations of a numeric column with the others,
+    strongest |r| first. Wide tables only keep the strongest pairs in the
+    profile; this reads the column's row of their stored matrix.
+    """
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
+        Dataset.tenant_id == tenant.id
+    ))
+
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    if dataset.status != jobs.READY or not dataset.meta_info:
+        raise HTTPException(status_code=400, detail="Dataset not analyzed yet")
+
+    try:
+        profile = await profile_store.load(db, dataset, ["correlation_info", f"correlation.{column}"])
+    except KeyError:
+        profile = {}
+    info = profile.get("correlation_info")
+    row = (profile.get("correlation") or {}).get(column)
+    correlations = await run_in_threadpool(correlation.column_correlations, info, row, column, top)
+    if correlations is None:
+        raise HTTPException(status_code=404, detail="No correlations for this column")
+    return {"column": column, "method": (info or {}).get("method"), "correlations": correlations}
+
+@router.get("/{dataset_id}/status")
+async def get_dataset_status(
+    dataset_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    tenant: Tenant = Depends(get_current_tenant)
+):
+    # Polled frequently, so avoid loading the profile blob unless it failed
+    status = await db.scalar(select(Dataset.status).where(
+        Dataset.id == dataset_id,
+        Dataset.tenant_id == tenant.id
+    ))
+
+    if not status:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    error = None
+    if status == jobs.FAILED:
+        meta_info = await db.scalar(select(Dataset.meta_info).where(Dataset.id == dataset_id)) or {}
+        error = meta_info.get("error")
+    pending_appends = await db.scalar(select(func.count(DatasetChunk.id)).where(
+        DatasetChunk.dataset_id == dataset_id,
+        DatasetChunk.status.in_([jobs.PENDING, jobs.RUNNING])
+    ))
+    return {"id": str(dataset_id), "status": status, "error": error, "pending_appends": pending_appends}
+
+@router.post("/{dataset_id}/append")
+async def append_dataset_rows(
+    dataset_id: uuid.UUID,
+    file: UploadFile = File(...),
+    upload_id: Optional[str] = Query(None, max_length=64),
+    db: AsyncSession = Depends(get_db),
+    tenant: Tenant = Depends(get_current_tenant)
+):
+    """
+    Stores a file of additional rows (same columns) as a new chunk of the
+    dataset. The profile is updated in the background by merging the new
+    rows into the dataset's persisted profile state.
+    """
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
+        Dataset.tenant_id == tenant.id
+    ))
+
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    if dataset.status != jobs.READY:
+        raise HTTPException(status_code=409, detail="Dataset analysis must finish before appending")
+
+    try:
+        with metrics.span("storage_write"), storage.track_upload(tenant.id, upload_id, file.size) as progress:
+            s3_path, content_hash = await run_in_threadpool(storage.upload_blob, file, str(tenant.id), progress)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Storage error: {str(e)}")
+
+    try:
+        await run_in_threadpool(appends.check_header, dataset.file_path, s3_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    last_seq = await db.scalar(select(func.max(DatasetChunk.seq)).where(DatasetChunk.dataset_id == dataset_id))
+    chunk = DatasetChunk(
+        dataset_id=dataset_id,
+        seq=(last_seq or 0) + 1,
+        file_path=s3_path,
+        content_hash=content_hash,
+        status=jobs.PENDING
+    )
+    db.add(chunk)
+    with metrics.span("db_commit"):
+        await db.commit()
+
+    jobs.submit_append(dataset_id)
+
+    return {"id": str(dataset_id), "chunk_id": str(chunk.id), "seq": chunk.seq, "status": chunk.status}
+
 @router.post("/{dataset_id}/insights")
 async def create_dataset_insights(
     dataset_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    no_cache: bool = False,
+    db: AsyncSession = Depends(get_db),
     tenant: Tenant = Depends(get_current_tenant)
 ):
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id, 
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
         Dataset.tenant_id == tenant.id
-    ).first()
+    ))
     
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
@@ -101,97 +466,191 @@ async def create_dataset_insights(
         raise HTTPException(status_code=400, detail="Dataset not analyzed yet")
 
     # Generate Insights
-    generated = await insights_agent.generate_insights(dataset.meta_info)
+    profile = await profile_store.load(db, dataset)
+    try:
+        generated = await insights_agent.generate_insights(profile, use_cache=not no_cache)
+    except llm_client.LLMError as e:
+        raise HTTPException(status_code=502, detail=f"LLM error: {e}")
     
     dataset.insights = generated
-    db.commit()
-    db.refresh(dataset)
+    with metrics.span("db_commit"):
+        await db.commit()
     
-    # Index Insights for RAG
-    try:
-        texts = [f"Insight: {i['title']}. {i['description']}" for i in generated]
-        metas = [{"source": "insight"} for _ in range(len(texts))]
-        rag.index_text(str(dataset.id), texts, metas)
-    except Exception as e:
-        print(f"Indexing failed: {e}")
+    await run_in_threadpool(_index_insights, str(dataset.id), generated)
 
     return generated
 
 @router.post("/{dataset_id}/story")
 async def create_dataset_story(
     dataset_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    no_cache: bool = False,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db),
     tenant: Tenant = Depends(get_current_tenant)
 ):
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id, 
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
         Dataset.tenant_id == tenant.id
-    ).first()
+    ))
     
     if not dataset or not dataset.insights:
         raise HTTPException(status_code=400, detail="Insights required before story generation")
 
+    if stream:
+        name, insights = dataset.name, dataset.insights
+
+        async def events():
+            parts = []
+            try:
+                async for token in storyteller.stream_story(name, insights, use_cache=not no_cache):
+                    parts.append(token)
+                    yield _sse({"token": token})
+            except llm_client.LLMError as e:
+                yield _sse({"error": f"LLM error: {e}"}, event="error")
+                return
+            # Persist and index once the stream completes
+            story = "".join(parts)
+            await _save_story(dataset_id, story)
+            await run_in_threadpool(_index_story, str(dataset_id), story)
+            yield _sse({"story": story}, event="done")
+
+        return _event_stream(events())
+
     # Generate Story
-    story = await storyteller.generate_story(dataset.name, dataset.insights)
+    try:
+        story = await storyteller.generate_story(dataset.name, dataset.insights, use_cache=not no_cache)
+    except llm_client.LLMError as e:
+        raise HTTPException(status_code=502, detail=f"LLM error: {e}")
     
     dataset.story = story
-    db.commit()
-    db.refresh(dataset)
+    with metrics.span("db_commit"):
+        await db.commit()
     
-    # Index Story for RAG
-    try:
-        # Split story by paragraphs approximately
-        paragraphs = [p for p in story.split('\n\n') if p.strip()]
-        metas = [{"source": "story"} for _ in range(len(paragraphs))]
-        rag.index_text(str(dataset.id), paragraphs, metas)
-    except Exception as e:
-         print(f"Indexing failed: {e}")
+    await run_in_threadpool(_index_story, str(dataset.id), story)
 
     return {"story": story}
 
-class ChatRequest(BaseModel):
-    message: str
-
-@router.post("/{dataset_id}/chat")
-async def chat_dataset(
+@router.post("/{dataset_id}/pipeline")
+async def run_dataset_pipeline(
     dataset_id: uuid.UUID,
-    req: ChatRequest,
-    db: Session = Depends(get_db),
+    no_cache: bool = False,
+    db: AsyncSession = Depends(get_db),
     tenant: Tenant = Depends(get_current_tenant)
 ):
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id, 
+    """
+    Insights then story in one request. Indexing the insights for RAG runs
+    in a worker thread while the story is generated, so wall time is about
+    the two LLM calls.
+    """
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
         Dataset.tenant_id == tenant.id
-    ).first()
-    
+    ))
+
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
-    
+
+    if not dataset.meta_info:
+        raise HTTPException(status_code=400, detail="Dataset not analyzed yet")
+
+    profile = await profile_store.load(db, dataset)
+    timings = {}
+    started = time.perf_counter()
+
+    def elapsed_ms(since: float) -> float:
+        return round((time.perf_counter() - since) * 1000, 1)
+
     try:
-        # RAG Retrieval
+        stage = time.perf_counter()
+        generated = await insights_agent.generate_insights(profile, use_cache=not no_cache)
+        timings["insights_ms"] = elapsed_ms(stage)
+
+        stage = time.perf_counter()
+        indexing = asyncio.create_task(run_in_threadpool(_index_insights, str(dataset.id), generated))
         try:
-            context_docs = rag.search(str(dataset.id), req.message)
-            context_str = "\n---\n".join(context_docs)
-        except Exception as e:
-            print(f"RAG Search failed: {e}")
-            context_str = ""
-        
-        # LLM Generation
-        client = llm_client.get_llm_client()
-        
-        prompt = f"""
+            story = await storyteller.generate_story(dataset.name, generated, use_cache=not no_cache)
+        finally:
+            await indexing
+        timings["story_ms"] = elapsed_ms(stage)
+    except llm_client.LLMError as e:
+        raise HTTPException(status_code=502, detail=f"LLM error: {e}")
+
+    stage = time.perf_counter()
+    dataset.insights = generated
+    dataset.story = story
+    with metrics.span("db_commit"):
+        await db.commit()
+    await run_in_threadpool(_index_story, str(dataset.id), story)
+    timings["save_ms"] = elapsed_ms(stage)
+    timings["total_ms"] = elapsed_ms(started)
+
+    return {"insights": generated, "story": story, "timings": timings}
+
+class ChatRequest(BaseModel):
+    message: str
+
+CHAT_ERROR_MESSAGE = "I encountered an error processing your request. Please try again."
+
+def _chat_prompt(dataset_id: str, message: str) -> str:
+    # RAG Retrieval
+    try:
+        context_docs = rag.search(dataset_id, message)
+        context_str = "\n---\n".join(context_docs)
+    except Exception:
+        logger.exception("RAG search failed for dataset %s", dataset_id)
+        metrics.error("vector_search")
+        context_str = ""
+
+    return f"""
         You are an AI assistant helping a user understand a dataset.
         
         Relevant Context from analysis:
         {context_str}
         
-        User Question: {req.message}
+        User Question: {message}
         
         Answer the question based on the context provided. If the context doesn't have the answer, use your general knowledge but mention that the specific data wasn't found in the index.
         """
-        
-        answer = await client.generate(prompt)
+
+@router.post("/{dataset_id}/chat")
+async def chat_dataset(
+    dataset_id: uuid.UUID,
+    req: ChatRequest,
+    no_cache: bool = False,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db),
+    tenant: Tenant = Depends(get_current_tenant)
+):
+    dataset = await db.scalar(select(Dataset).where(
+        Dataset.id == dataset_id,
+        Dataset.tenant_id == tenant.id
+    ))
+    
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    # LLM Generation
+    client = llm_client.get_llm_client()
+
+    if stream:
+        async def events():
+            try:
+                prompt = await run_in_threadpool(_chat_prompt, str(dataset_id), req.message)
+                async for token in client.generate_stream(prompt, use_cache=not no_cache):
+                    yield _sse({"token": token})
+                yield _sse({}, event="done")
+            except Exception:
+                logger.exception("Chat stream failed for dataset %s", dataset_id)
+                metrics.error("chat")
+                yield _sse({"error": CHAT_ERROR_MESSAGE}, event="error")
+
+        return _event_stream(events())
+    
+    try:
+        prompt = await run_in_threadpool(_chat_prompt, str(dataset.id), req.message)
+        answer = await client.generate(prompt, use_cache=not no_cache)
         return {"response": answer}
-    except Exception as e:
-        print(f"Chat Endpoint Error: {e}")
-        return {"response": "I encountered an error processing your request. Please try again."}
+    except Exception:
+        logger.exception("Chat failed for dataset %s", dataset.id)
+        metrics.error("chat")
+        return {"response": CHAT_ERROR_MESSAGE}
@@ -1,9 +1,9 @@
 import uuid
-from .database import SessionLocal, engine, Base
+from .database import SessionLocal, upgrade_schema
 from .models import Tenant, User
 
 def seed():
-    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
     db = SessionLocal()
     
     try:
@@ -0,0 +1,101 @@
+import os
+import uuid
+import fcntl
+from contextlib import contextmanager
+from typing import Dict, List, Iterator, Optional
+import pandas as pd
+from . import profiling, sketches, columnar, eda, correlation, ingest
+
+STATE_SUFFIX = ".pkl"
+
+def _local(path: str) -> str:
+    if not path.startswith("file://"):
+        raise ValueError("Only local file paths supported in this mode")
+    return path.replace("file://", "")
+
+def state_path_for(file_path: str, dataset_id: uuid.UUID) -> str:
+    """Per-dataset state next to the tenant's blobs: {tenant_id}/profiles/{dataset_id}.pkl"""
+    tenant_dir = os.path.dirname(os.path.dirname(_local(file_path)))
+    return os.path.join(tenant_dir, "profiles", f"{dataset_id}{STATE_SUFFIX}")
+
+def read_header(file_path: str) -> List[str]:
+    path = _local(file_path)
+    if columnar.is_columnar(path):
+        return columnar.column_names(path)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def check_header(dataset_path: str, chunk_path: str):
+    """Cheap up-front check that appended rows have the dataset's columns, in order."""
+    expected, got = read_header(dataset_path), read_header(chunk_path)
+    if got != expected:
+        raise ValueError(f"Columns differ: expected {expected}, got {got}")
+
+def _iter_file(file_path: str, schema: Optional[Dict[str, str]] = None, dtype=None) -> Iterator[pd.DataFrame]:
+    return ingest.iter_chunks(_local(file_path), eda.EDA_CHUNK_SIZE, schema, dtype=dtype)
+
+@contextmanager
+def locked(state_path: str):
+    """Serializes appends to one dataset across worker processes."""
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    with open(state_path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def build_state(file_paths: List[str], approximate: bool = False,
+                schema: Optional[Dict[str, str]] = None) -> profiling.ProfileAccumulator:
+    """
+    Profiles already stored rows, for datasets analysed without saving
+    their state (e.g. re-uploads that reused a cached profile). Sketches
+    for approximate-mode datasets, so their profile keeps its extra fields.
+    Date columns of the ingest `schema` are parsed, as in the analysis.
+    """
+    state = sketches.SketchProfileAccumulator() if approximate else profiling.ProfileAccumulator()
+    for file_path in file_paths:
+        for chunk in _iter_file(file_path, schema):
+            state.update(chunk)
+    return state
+
+def profile_rows(state: profiling.ProfileAccumulator, file_path: str) -> profiling.ProfileAccumulator:
+    """
+    Profiles the rows of an appended file so they can be merged into `state`.
+    Text columns are read as text, so categories keep matching; numeric
+    columns must stay numeric (ValueError otherwise).
+    """
+    text_columns = {col: object for col in state.columns if state.dtypes.get(col) == "object"}
+    date_columns = [col for col in state.columns if str(state.dtypes.get(col)).startswith("datetime64")]
+    numeric_columns = state.numeric_columns()
+    # Same accumulator type as the state (exact or sketches), so they merge
+    rows = type(state)()
+    for chunk in _iter_file(file_path, dtype=text_columns or None):
+        if list(chunk.columns) != state.columns:
+            raise ValueError(f"Columns differ: expected {state.columns}, got {list(chunk.columns)}")
+        for col in date_columns:
+            # Dates parsed at ingest must keep matching the stored values
+            chunk[col] = pd.to_datetime(chunk[col], errors="coerce", format="ISO8601")
+        for col in numeric_columns:
+            series = chunk[col]
+            if not profiling.is_numeric_column(series) and not series.isnull().all():
+                raise ValueError(f"Column '{col}' is numeric but the new rows contain non-numeric values")
+        rows.update(chunk)
+    return rows
+
+def matrix_path_for(file_path: str, dataset_id: uuid.UUID) -> str:
+    """
+    Wide correlation matrices of appended datasets go next to their state:
+    the one next to the upload may be shared with re-uploads of the file.
+    """
+    return os.path.splitext(state_path_for(file_path, dataset_id))[0] + correlation.MATRIX_SUFFIX
+
+def dataset_files(file_path: str, dataset_id: uuid.UUID) -> List[str]:
+    """Files written for one dataset: its profile state, the state's lock and its own matrix. Uploads are shared, so not included."""
+    if not file_path.startswith("file://"):
+        return []
+    state_path = state_path_for(file_path, dataset_id)
+    return [state_path, state_path + ".lock", matrix_path_for(file_path, dataset_id)]
+
+def finalize(state: profiling.ProfileAccumulator, file_path: str, dataset_id: uuid.UUID) -> dict:
+    """The profile of all rows merged into `state`, writing its correlation matrix like eda.analyze_dataset."""
+    return state.finalize(matrix_path_for(file_path, dataset_id))
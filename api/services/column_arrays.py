@@ -0,0 +1,232 @@
+import os
+import json
+import uuid
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from . import columnar, metrics, profiling
+
+# Memoized distribution results (one per dataset files/column/parameters)
+DISTRIBUTION_CACHE_SIZE = int(os.getenv("DISTRIBUTION_CACHE_SIZE", "1024"))
+# Upper bound for an explicit `bins`
+DISTRIBUTION_MAX_BINS = int(os.getenv("DISTRIBUTION_MAX_BINS", "1000"))
+# Upper bound for the bin count picked when no `bins` is given
+DISTRIBUTION_AUTO_MAX_BINS = int(os.getenv("DISTRIBUTION_AUTO_MAX_BINS", "100"))
+# Values sampled to estimate the spread for adaptive binning
+DISTRIBUTION_AUTO_SAMPLE = 100000
+
+ARRAYS_SUFFIX = ".columns"
+
+# Column kinds, as in the profile's distributions
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+
+def arrays_dir_for(data_path: str) -> str:
+    """Column arrays live next to the (content-addressed) data: {tenant_id}/blobs/{hash}.columns/"""
+    return os.path.splitext(data_path)[0] + ARRAYS_SUFFIX
+
+def _column_names(path: str) -> List[str]:
+    if columnar.is_columnar(path):
+        return columnar.column_names(path)
+    return [str(c) for c in pd.read_csv(path, nrows=0).columns]
+
+def _read_column(path: str, column: str) -> pd.Series:
+    if columnar.is_columnar(path):
+        return columnar.read_columns(path, [column])[column]
+    return pd.read_csv(path, usecols=[column], low_memory=False)[column]
+
+def _save(target: str, write, mode: str = "wb"):
+    tmp = f"{target}.tmp-{uuid.uuid4()}"
+    try:
+        with open(tmp, mode) as f:
+            write(f)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _values_path(base: str, kind: str) -> str:
+    return f"{base}.{kind}.npy"
+
+def _write(path: str, column: str, kind: Optional[str], base: str) -> str:
+    series = _read_column(path, column)
+    if kind is None:
+        numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        kind = NUMERIC if numeric else CATEGORICAL
+    if kind == NUMERIC:
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        _save(_values_path(base, kind), lambda f: np.save(f, values))
+        return kind
+    # Codes into the distinct values; -1 is missing
+    codes, uniques = pd.factorize(series)
+    categories = [str(u) for u in uniques]
+    # Categories first: the codes file marks the column as complete
+    _save(f"{base}.categories.json", lambda f: json.dump(categories, f), mode="w")
+    _save(_values_path(base, kind), lambda f: np.save(f, codes.astype(np.int32)))
+    return kind
+
+def column_array(file_path: str, column: str, kind: Optional[str] = None) -> Tuple[str, np.ndarray, Optional[List[str]]]:
+    """
+    (kind, values, categories) of one column of a data file. Values are
+    float64 (NaN = missing) for numeric columns and int32 codes into
+    `categories` (-1 = missing) otherwise, memory-mapped from a .npy
+    written on first use; later calls never parse the file again. `kind`
+    forces how the column is read, e.g. for appended files.
+    """
+    if not file_path.startswith("file://"):
+        raise ValueError("Only local file paths supported in this mode")
+    path = file_path.replace("file://", "")
+    names = _column_names(path)
+    if column not in names:
+        raise ValueError(f"Column '{column}' not found in {os.path.basename(path)}")
+
+    directory = arrays_dir_for(path)
+    base = os.path.join(directory, str(names.index(column)))
+    if kind is None:
+        kind = next((k for k in (NUMERIC, CATEGORICAL) if os.path.exists(_values_path(base, k))), None)
+    if kind is None or not os.path.exists(_values_path(base, kind)):
+        os.makedirs(directory, exist_ok=True)
+        with metrics.span("column_array_write"):
+            kind = _write(path, column, kind, base)
+
+    values = np.load(_values_path(base, kind), mmap_mode="r")
+    categories = None
+    if kind == CATEGORICAL:
+        with open(f"{base}.categories.json") as f:
+            categories = json.load(f)
+    return kind, values, categories
+
+def parse_range(value_range: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Parses a `range` parameter ("min,max") for numeric columns."""
+    if not value_range:
+        return None
+    try:
+        lo, hi = (float(v) for v in value_range.split(","))
+    except ValueError:
+        raise ValueError("range must be two numbers: min,max")
+    if not (np.isfinite(lo) and np.isfinite(hi) and lo < hi):
+        raise ValueError("range must be finite with min < max")
+    return lo, hi
+
+def _finite_bounds(arrays: List[np.ndarray]) -> Optional[Tuple[float, float]]:
+    lows, highs = [], []
+    for values in arrays:
+        if len(values) == 0:
+            continue
+        with np.errstate(invalid="ignore"):
+            lo, hi = np.fmin.reduce(values), np.fmax.reduce(values)
+        if not (np.isfinite(lo) and np.isfinite(hi)):
+            finite = values[np.isfinite(values)]
+            if len(finite) == 0:
+                continue
+            lo, hi = finite.min(), finite.max()
+        lows.append(lo)
+        highs.append(hi)
+    return (float(min(lows)), float(max(highs))) if lows else None
+
+def _auto_bins(arrays: List[np.ndarray], lo: float, hi: float) -> int:
+    """
+    numpy's "auto" rule (the larger of the Freedman-Diaconis and Sturges bin
+    counts) for the values in [lo, hi], estimated from a fixed-size sample
+    so it costs the same whatever the row count.
+    """
+    total = sum(len(values) for values in arrays)
+    fraction = min(1.0, DISTRIBUTION_AUTO_SAMPLE / total) if total else 1.0
+    # Random rather than strided rows, which could follow a pattern in the file
+    rng = np.random.default_rng(0)
+    sample = np.concatenate([
+        np.asarray(values[np.sort(rng.integers(0, len(values), int(len(values) * fraction)))])
+        if fraction < 1 else np.asarray(values)
+        for values in arrays
+    ])
+    sample = sample[(sample >= lo) & (sample <= hi)]
+    if len(sample) < 2 or lo == hi:
+        return 1
+    n = len(sample) / fraction
+    q25, q75 = np.percentile(sample, [25, 75])
+    sturges = np.log2(n) + 1
+    fd = (hi - lo) * n ** (1 / 3) / (2 * (q75 - q25)) if q75 > q25 else 0
+    return int(min(max(np.ceil(max(sturges, fd)), 1), DISTRIBUTION_AUTO_MAX_BINS))
+
+def _numeric(arrays: List[np.ndarray], bins: Optional[int], value_range: Optional[Tuple[float, float]]) -> Dict[str, Any]:
+    missing = sum(int(np.count_nonzero(np.isnan(values))) for values in arrays)
+    bounds = value_range or _finite_bounds(arrays)
+    if bounds is None:
+        return {"type": NUMERIC, "bins": [], "edges": [], "range": None, "count": 0, "missing": missing}
+    lo, hi = bounds
+    bins = bins or _auto_bins(arrays, lo, hi)
+    # Fixed edges, so the per-file histograms add up
+    hist = np.zeros(bins, dtype=np.int64)
+    edges = None
+    for values in arrays:
+        counts, edges = np.histogram(values, bins=bins, range=(lo, hi))
+        hist += counts
+    return {
+        "type": NUMERIC,
+        "bins": profiling.format_bins(hist, edges),
+        "edges": [float(e) for e in edges],
+        "range": [lo, hi],
+        "count": int(hist.sum()),
+        "missing": missing
+    }
+
+def _categorical(arrays: List[np.ndarray], categories: List[List[str]], top: int) -> Dict[str, Any]:
+    totals = None
+    missing = 0
+    for codes, names in zip(arrays, categories):
+        present = codes[codes >= 0]
+        missing += len(codes) - len(present)
+        counts = pd.Series(np.bincount(present, minlength=len(names)), index=names)
+        totals = counts if totals is None else totals.add(counts, fill_value=0)
+    totals = totals[totals > 0].astype(np.int64)
+    shown = totals.nlargest(top)
+    return {
+        "type": CATEGORICAL,
+        "counts": [{"name": str(k), "value": int(v)} for k, v in shown.items()],
+        "distinct": len(totals),
+        "other": int(totals.sum() - shown.sum()),
+        "missing": missing
+    }
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+def distribution(file_paths: List[str], column: str, bins: Optional[int] = None,
+                 value_range: Optional[Tuple[float, float]] = None, top: int = profiling.TOP_K) -> Dict[str, Any]:
+    """
+    Histogram (numeric columns) or top category counts of `column` over the
+    rows of all `file_paths` (a dataset's upload and its appended files).
+    Numeric columns get `bins` equal-width bins over `value_range` (default:
+    the column's finite min and max); without `bins` the count adapts to the
+    data (see _auto_bins). Categorical columns get the `top` most frequent
+    values. Results are memoized per files and parameters; the files are
+    content-addressed, so entries never go stale.
+    """
+    key = (tuple(file_paths), column, bins, value_range, top)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            metrics.cache("distribution", "hit")
+            return _memo[key]
+    metrics.cache("distribution", "miss")
+
+    with metrics.span("distribution"):
+        kind, values, names = column_array(file_paths[0], column)
+        arrays, categories = [values], [names]
+        for file_path in file_paths[1:]:
+            _, values, names = column_array(file_path, column, kind)
+            arrays.append(values)
+            categories.append(names)
+        if kind == NUMERIC:
+            result = _numeric(arrays, bins, value_range)
+        else:
+            result = _categorical(arrays, categories, top)
+    result = {"column": column, **result}
+
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > DISTRIBUTION_CACHE_SIZE:
+            _memo.popitem(last=False)
+    return result
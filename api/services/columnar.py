@@ -0,0 +1,85 @@
+import logging
+import os
+import uuid
+from typing import List, Optional, Iterator
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# pyarrow is optional: without it datasets are only kept as CSV
+try:
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    HAS_ARROW = True
+except ImportError as e:
+    logger.warning("pyarrow missing: %s. Columnar storage disabled.", e)
+    HAS_ARROW = False
+
+COLUMNAR_SUFFIX = ".parquet"
+# Bytes of CSV parsed per block while converting
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
+def is_columnar(path: str) -> bool:
+    return path.endswith(COLUMNAR_SUFFIX)
+
+def columnar_path_for(file_path: str) -> str:
+    """The Parquet copy lives next to the CSV: {tenant_id}/blobs/{hash}.parquet"""
+    root, _ = os.path.splitext(file_path)
+    return root + COLUMNAR_SUFFIX
+
+def write_columnar(file_path: str) -> Optional[str]:
+    """
+    Streams the CSV at `file_path` into a typed Parquet file next to it and
+    returns its path, or None if the copy cannot be made. Blobs are
+    content-addressed, so an existing copy is reused as-is.
+    """
+    if not HAS_ARROW or not file_path.startswith("file://"):
+        return None
+
+    source = file_path.replace("file://", "")
+    target_path = columnar_path_for(file_path)
+    target = target_path.replace("file://", "")
+    if os.path.exists(target):
+        return target_path
+
+    tmp = f"{target}.tmp-{uuid.uuid4()}"
+    try:
+        reader = pacsv.open_csv(
+            source,
+            read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+            # Empty fields are missing values, as in pd.read_csv
+            convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+        )
+        with pq.ParquetWriter(tmp, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        os.replace(tmp, target)
+        return target_path
+    except Exception:
+        # e.g. a column whose type changes after the first block
+        logger.exception("Columnar conversion failed")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return None
+
+def uncompressed_size(path: str) -> int:
+    """In-memory footprint estimate of a Parquet file, from its row group metadata."""
+    meta = pq.ParquetFile(path).metadata
+    return sum(meta.row_group(i).total_byte_size for i in range(meta.num_row_groups))
+
+def column_names(path: str) -> List[str]:
+    return pq.ParquetFile(path).schema_arrow.names
+
+def read_table(path: str, columns: Optional[List[str]] = None, read_dictionary: Optional[List[str]] = None):
+    """Arrow table of `columns` (all if None); `read_dictionary` columns are read dictionary-encoded."""
+    return pq.read_table(path, columns=columns, memory_map=True, read_dictionary=read_dictionary or None)
+
+def read_columns(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Loads only `columns` (all if None), memory-mapping the file."""
+    return read_table(path, columns).to_pandas()
+
+def iter_chunks(path: str, chunksize: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Yields DataFrames of at most `chunksize` rows."""
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
@@ -0,0 +1,231 @@
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+from . import storage
+
+PEARSON = "pearson"
+SPEARMAN = "spearman"
+
+# "pearson", or "spearman" (Pearson on ranks; in-memory profiles only)
+CORRELATION_METHOD = os.getenv("CORRELATION_METHOD", PEARSON)
+# Strongest pairs kept in the profile
+CORRELATION_TOP_K = int(os.getenv("CORRELATION_TOP_K", "200"))
+# Up to this many numeric columns the full matrix is also kept as nested dicts
+CORRELATION_MATRIX_MAX_COLUMNS = int(os.getenv("CORRELATION_MATRIX_MAX_COLUMNS", "50"))
+# Wider matrices are written as a float16 .npy next to the data instead
+CORRELATION_STORE_MATRIX = os.getenv("CORRELATION_STORE_MATRIX", "True")
+# Columns per block of the blocked matrix product
+CORRELATION_BLOCK_SIZE = int(os.getenv("CORRELATION_BLOCK_SIZE", "256"))
+# Rows used at most; larger frames are sampled (r's standard error is ~1/sqrt(rows))
+CORRELATION_MAX_ROWS = int(os.getenv("CORRELATION_MAX_ROWS", "500000"))
+# Numeric columns correlated at most, in column order
+CORRELATION_MAX_COLUMNS = int(os.getenv("CORRELATION_MAX_COLUMNS", "5000"))
+# Streamed profiles keep four p x p float64 co-moment arrays per profile
+# state, so they track fewer columns (never more than CORRELATION_MAX_COLUMNS)
+CORRELATION_STREAMING_MAX_COLUMNS = min(int(os.getenv("CORRELATION_STREAMING_MAX_COLUMNS", "1000")),
+                                        CORRELATION_MAX_COLUMNS)
+
+MATRIX_SUFFIX = ".corr.npy"
+
+Block = Tuple[int, int, np.ndarray]
+
+
+def matrix_path_for(data_path: str) -> str:
+    """The matrix lives next to the (content-addressed) data it was computed from."""
+    return os.path.splitext(data_path)[0] + MATRIX_SUFFIX
+
+
+def _standardize(values: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Centered, unit-scale float32 copy with missing values zeroed, plus the
+    float32 observation mask (None if nothing is missing). Scaling first
+    keeps the float32 products well conditioned.
+    """
+    mask = ~np.isnan(values)
+    counts = np.maximum(mask.sum(axis=0), 1)
+    z = np.where(mask, values, 0.0)
+    z -= z.sum(axis=0) / counts
+    z[~mask] = 0.0
+    scale = np.sqrt((z * z).sum(axis=0) / counts)
+    scale[scale == 0] = 1.0
+    z /= scale
+    return z.astype(np.float32), (None if mask.all() else mask.astype(np.float32))
+
+
+def _block(z: np.ndarray, m: Optional[np.ndarray], a: slice, b: slice) -> np.ndarray:
+    """Pearson r between the column blocks `a` and `b`, pairwise-complete like DataFrame.corr()."""
+    za, zb = z[:, a], z[:, b]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if m is None:
+            n = np.float32(len(z))
+            norm_a = np.sqrt((za * za).sum(axis=0))
+            norm_b = np.sqrt((zb * zb).sum(axis=0))
+            r = (za.T @ zb) / np.outer(norm_a, norm_b)
+            n_ok = n >= 2
+        else:
+            ma, mb = m[:, a], m[:, b]
+            n = ma.T @ mb
+            sx, sy = za.T @ mb, ma.T @ zb
+            sxx, syy = (za * za).T @ mb, ma.T @ (zb * zb)
+            cov = n * (za.T @ zb) - sx * sy
+            r = cov / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+            n_ok = n >= 2
+    r = np.where(n_ok & np.isfinite(r), r, np.nan)
+    return np.clip(r, -1.0, 1.0)
+
+
+def iter_blocks(values: np.ndarray, block_size: int = CORRELATION_BLOCK_SIZE) -> Iterator[Block]:
+    """
+    Upper-triangle blocks (i0, j0, r) of the correlation matrix of the
+    columns of `values` (NaN = missing), computed in float32 so peak memory
+    is the standardized data plus one block_size x block_size block.
+    """
+    z, m = _standardize(values)
+    p = z.shape[1]
+    for i0 in range(0, p, block_size):
+        a = slice(i0, min(i0 + block_size, p))
+        for j0 in range(i0, p, block_size):
+            b = slice(j0, min(j0 + block_size, p))
+            r = _block(z, m, a, b)
+            if i0 == j0:
+                # Constant or empty columns stay NaN on the diagonal, as in pandas
+                diag = np.diag(r)
+                np.fill_diagonal(r, np.where(np.isnan(diag), np.nan, 1.0))
+            yield i0, j0, r
+
+
+def _top_pairs(blocks: Iterator[Block], p: int, k: int, matrix: Optional[np.ndarray]) -> List[Tuple[int, int, float]]:
+    """The k strongest (i, j, r) with i < j; fills `matrix` (both triangles) on the way if given."""
+    best_i = np.empty(0, dtype=np.int64)
+    best_j = np.empty(0, dtype=np.int64)
+    best_r = np.empty(0, dtype=np.float32)
+    for i0, j0, r in blocks:
+        if matrix is not None:
+            rows, cols = r.shape
+            matrix[i0:i0 + rows, j0:j0 + cols] = r
+            matrix[j0:j0 + cols, i0:i0 + rows] = r.T
+        if k <= 0:
+            continue
+        ii, jj = np.indices(r.shape)
+        ii, jj = ii + i0, jj + j0
+        keep = (jj > ii) & ~np.isnan(r)
+        ii, jj, rr = ii[keep], jj[keep], r[keep]
+        best_i = np.concatenate([best_i, ii])
+        best_j = np.concatenate([best_j, jj])
+        best_r = np.concatenate([best_r, rr])
+        if len(best_r) > k:
+            top = np.argpartition(-np.abs(best_r), k - 1)[:k]
+            best_i, best_j, best_r = best_i[top], best_j[top], best_r[top]
+    # Strongest first; ties in column order
+    order = np.lexsort((best_j, best_i, -np.abs(best_r)))
+    return [(int(best_i[o]), int(best_j[o]), float(best_r[o])) for o in order]
+
+
+def summarize(blocks: Iterator[Block], columns: List[str], method: str = PEARSON,
+              rows: Optional[int] = None, matrix_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Profile fields for a correlation matrix given as blocks:
+    - correlation: nested dicts, only up to CORRELATION_MATRIX_MAX_COLUMNS columns
+    - correlation_pairs: the CORRELATION_TOP_K strongest pairs, strongest |r| first
+    - correlation_info: method, size, and the storage key of the full float16
+      matrix written for wider tables (with `matrix_path` under local storage
+      and CORRELATION_STORE_MATRIX); see load_matrix
+    """
+    p = len(columns)
+    small = p <= CORRELATION_MATRIX_MAX_COLUMNS
+    # The profile is served to clients, so it names the matrix by key, never by path
+    key = storage.local_key(matrix_path) if matrix_path is not None else None
+    store = not small and key is not None and CORRELATION_STORE_MATRIX == "True"
+    matrix = np.full((p, p), np.nan, dtype=np.float32 if small else np.float16) if small or store else None
+
+    pairs = _top_pairs(blocks, p, CORRELATION_TOP_K, matrix)
+
+    corr = {}
+    if small:
+        corr = {
+            cj: {ci: (None if np.isnan(matrix[i, j]) else float(matrix[i, j])) for i, ci in enumerate(columns)}
+            for j, cj in enumerate(columns)
+        }
+
+    stored = None
+    if store:
+        tmp = f"{matrix_path}.tmp-{uuid.uuid4()}.npy"
+        np.save(tmp, matrix)
+        os.replace(tmp, matrix_path)
+        stored = {"key": key, "dtype": "float16", "columns": columns}
+
+    return {
+        "correlation": corr,
+        "correlation_pairs": [{"a": columns[i], "b": columns[j], "r": round(r, 4)} for i, j, r in pairs],
+        "correlation_info": {
+            "method": method,
+            "columns": p,
+            "rows": rows,
+            "pairs_kept": len(pairs),
+            "matrix": stored
+        }
+    }
+
+
+def load_matrix(info: Dict[str, Any]) -> Optional[Tuple[np.ndarray, List[str]]]:
+    """The stored matrix (memory-mapped) and its columns for a profile's correlation_info, if one was written."""
+    stored = (info or {}).get("matrix")
+    if not stored:
+        return None
+    return np.load(storage.local_path(stored["key"]), mmap_mode="r"), stored["columns"]
+
+
+def column_correlations(info: Optional[Dict[str, Any]], row: Optional[Dict[str, Any]], column: str,
+                        top: int = CORRELATION_TOP_K) -> Optional[List[Dict[str, Any]]]:
+    """
+    The `top` strongest correlations of `column` with the other columns,
+    read from the stored matrix of a wide table or from `row` (the column's
+    entry of the nested `correlation`) otherwise. None if the column was
+    not correlated.
+    """
+    loaded = load_matrix(info)
+    if loaded is not None:
+        matrix, columns = loaded
+        if column not in columns:
+            return None
+        row = dict(zip(columns, np.asarray(matrix[columns.index(column)], dtype=np.float64)))
+    if not row:
+        return None
+    values = [(c, float(r)) for c, r in row.items() if c != column and r is not None and not np.isnan(r)]
+    values.sort(key=lambda item: -abs(item[1]))
+    return [{"column": c, "r": round(r, 4)} for c, r in values[:top]]
+
+
+def empty() -> Dict[str, Any]:
+    return {"correlation": {}, "correlation_pairs": [], "correlation_info": None}
+
+
+def compute(numeric_df: pd.DataFrame, method: str = CORRELATION_METHOD,
+            matrix_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Correlation fields of the profile for the numeric columns of an
+    in-memory frame. At most CORRELATION_MAX_COLUMNS columns and
+    CORRELATION_MAX_ROWS (uniformly sampled) rows are used, bounding both
+    compute time and the stored size. Spearman ranks each column over its
+    non-missing values, rather than per pair as pandas does.
+    """
+    if numeric_df.shape[1] < 2:
+        return empty()
+    numeric_df = numeric_df.iloc[:, :CORRELATION_MAX_COLUMNS]
+    if CORRELATION_MAX_ROWS and len(numeric_df) > CORRELATION_MAX_ROWS:
+        numeric_df = numeric_df.sample(n=CORRELATION_MAX_ROWS, random_state=0)
+    if method == SPEARMAN:
+        numeric_df = numeric_df.rank()
+    values = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+    return summarize(iter_blocks(values), [str(c) for c in numeric_df.columns], method,
+                     rows=len(numeric_df), matrix_path=matrix_path)
+
+
+def from_matrix(r: np.ndarray, columns: List[str], rows: Optional[int] = None,
+                matrix_path: Optional[str] = None) -> Dict[str, Any]:
+    """Correlation fields for an already computed Pearson matrix (e.g. from streamed co-moments)."""
+    if len(columns) < 2:
+        return empty()
+    return summarize(iter([(0, 0, r.astype(np.float32))]), columns, PEARSON, rows=rows, matrix_path=matrix_path)
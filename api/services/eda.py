@@ -1,96 +1,194 @@
+import logging
+import os
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from . import profiling, columnar, sketches, metrics, correlation, ingest
 
-def analyze_dataset(file_path: str) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+# Rows per chunk when profiling in streaming mode
+EDA_CHUNK_SIZE = int(os.getenv("EDA_CHUNK_SIZE", "100000"))
+# Files larger than this are profiled in chunks instead of loaded whole
+EDA_STREAMING_THRESHOLD_MB = int(os.getenv("EDA_STREAMING_THRESHOLD_MB", "512"))
+# Processes used to profile columns in parallel (1 = serial)
+EDA_WORKERS = int(os.getenv("EDA_WORKERS", "1"))
+# Rows read at most by the approximate profile (0 = all rows)
+EDA_APPROX_MAX_ROWS = int(os.getenv("EDA_APPROX_MAX_ROWS", "0"))
+
+# Profile modes, selectable per upload
+EXACT = "exact"
+APPROXIMATE = "approximate"
+
+def analyze_dataset(file_path: str, chunksize: Optional[int] = None, workers: Optional[int] = None,
+                    mode: str = EXACT, max_rows: Optional[int] = None,
+                    schema: Optional[Dict[str, str]] = None, state_path: Optional[str] = None) -> Dict[str, Any]:
     """
-    Reads a CSV file and returns a profile including:
+    Reads a CSV (or its Parquet copy) and returns a profile including:
     - schema: column names and types
     - summary: basic stats
-    - correlation: correlation matrix
+    - correlation: correlation matrix (narrow tables only), correlation_pairs
+      (the strongest pairs) and correlation_info (see correlation.summarize)
     - distributions: histograms and value counts for visualization
+
+    With `chunksize` (or for files above EDA_STREAMING_THRESHOLD_MB) the CSV is
+    read in chunks of that many rows and fed into mergeable accumulators, so
+    peak memory does not grow with the file size. Quantiles and histogram bins
+    are then approximated from a fine-grained streaming histogram.
+
+    With `workers` > 1 (default EDA_WORKERS) the per-column statistics of the
+    in-memory path are computed on a process pool, one group of columns per
+    worker.
+
+    With `mode="approximate"` the file is streamed through fixed-size
+    sketches (KLL quantiles, HyperLogLog distinct counts, Misra-Gries top
+    categories, a reservoir-sampled preview), so memory stays bounded
+    whatever the row count or cardinality. The profile is flagged
+    `approximate` and carries `error_bounds`. `max_rows` (default
+    EDA_APPROX_MAX_ROWS) stops reading after that many rows.
+
+    `schema` (see ingest.infer_schema) makes the in-memory path load with
+    compact dtypes: categoricals, narrowed integers, lossless float32 and
+    parsed dates. The profile's schema still reports the logical dtypes.
+    Chunked reads are already memory-bounded and only use it to parse
+    dates, so every path reports the same schema.
+
+    With `state_path`, the mergeable accumulator state of the rows (see
+    profiling.save_state) is written there too, so rows appended later are
+    merged without reading these rows again.
     """
     try:
         # file_view is file://... for local
         if file_path.startswith("file://"):
             actual_path = file_path.replace("file://", "")
-            df = pd.read_csv(actual_path)
         else:
             raise ValueError("Only local file paths supported in this mode")
 
+        # Parquet copies written at ingest skip CSV parsing entirely
+        is_columnar = columnar.is_columnar(actual_path)
+        size = columnar.uncompressed_size(actual_path) if is_columnar else os.path.getsize(actual_path)
+
+        matrix_path = correlation.matrix_path_for(actual_path)
+        approximate = mode == APPROXIMATE
+        if chunksize is None and (approximate or size > EDA_STREAMING_THRESHOLD_MB * 1024 * 1024):
+            chunksize = EDA_CHUNK_SIZE
+
+        if chunksize:
+            chunks = ingest.iter_chunks(actual_path, chunksize, schema)
+            if approximate:
+                state = sketches.accumulate_approx(chunks, max_rows or EDA_APPROX_MAX_ROWS)
+            else:
+                state = profiling.accumulate(chunks)
+            if state_path:
+                profiling.save_state(state, state_path)
+            return state.finalize(matrix_path)
+
+        with metrics.span("load"):
+            if is_columnar:
+                df = ingest.read_columnar(actual_path, schema)
+            else:
+                df = ingest.read_csv(actual_path, schema)
+        workers = EDA_WORKERS if workers is None else workers
+
         # 1. Schema
         schema = {}
         for col in df.columns:
-            schema[col] = str(df[col].dtype)
+            schema[col] = ingest.logical_dtype(df[col])
 
         # 2. Summary & Distributions
-        summary = df.describe(include='all').to_dict()
-        missing_counts = df.isnull().sum().to_dict()
-        
-        distributions = {}
-
-        for col in df.columns:
-            # Ensure missing count is in summary
-            if col not in summary: summary[col] = {}
-            summary[col]['missing_count'] = missing_counts.get(col, 0)
-
-            # Distributions
-            if pd.api.types.is_numeric_dtype(df[col]):
-                # Histogram for numeric
-                # Drop NaNs for histogram calculation
-                series = df[col].dropna()
-                if not series.empty:
-                    hist, bin_edges = np.histogram(series, bins=10)
-                    distributions[col] = {
-                        "type": "numeric",
-                        "bins": [
-                            {"range": f"{bin_edges[i]:.2f}-{bin_edges[i+1]:.2f}", "count": int(hist[i])}
-                            for i in range(len(hist))
-                        ]
-                    }
-                else:
-                    distributions[col] = {"type": "numeric", "bins": []}
-            else:
-                # Value Counts for categorical (Top 10)
-                counts = df[col].value_counts().head(10).to_dict()
-                distributions[col] = {
-                    "type": "categorical",
-                    "counts": [{"name": str(k), "value": int(v)} for k, v in counts.items()]
-                }
-
-        # Clean NaNs
-        def clean_nans(d):
-            new_d = {}
-            for k, v in d.items():
-                if isinstance(v, dict):
-                    new_d[k] = clean_nans(v)
-                elif isinstance(v, list):
-                    new_d[k] = [clean_nans(i) if isinstance(i, dict) else i for i in v]
-                elif isinstance(v, (float, np.floating)) and np.isnan(v):
-                    new_d[k] = None
-                else:
-                    new_d[k] = v
-            return new_d
-            
-        summary = clean_nans(summary)
-        distributions = clean_nans(distributions)
+        if workers > 1 and len(df.columns) > workers:
+            summary, distributions = _profile_columns_parallel(df, workers)
+        else:
+            summary, distributions = _profile_columns(df)
 
         # 3. Correlation (Numeric only)
         numeric_df = df.select_dtypes(include=[np.number])
-        if not numeric_df.empty and numeric_df.shape[1] > 1:
-            corr = numeric_df.corr().replace({np.nan: None}).to_dict()
-        else:
-            corr = {}
+        corr = correlation.compute(numeric_df, matrix_path=matrix_path)
+
+        if state_path:
+            with metrics.span("profile_state"):
+                state = profiling.ProfileAccumulator()
+                for start in range(0, len(df), EDA_CHUNK_SIZE):
+                    state.update(df.iloc[start:start + EDA_CHUNK_SIZE])
+                profiling.save_state(state, state_path)
 
         return {
             "schema": schema,
             "summary": summary,
-            "correlation": corr,
+            **corr,
             "distributions": distributions,
             "row_count": len(df),
             "column_count": len(df.columns)
         }
 
     except Exception as e:
-        print(f"Error analyzing dataset: {e}")
+        logger.exception("Error analyzing dataset %s", file_path)
+        metrics.error("profile")
         return {"error": str(e)}
+
+def _profile_columns(df: pd.DataFrame) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Summary stats and distributions for every column of `df`."""
+    # Reductions of float32 columns (see ingest) return float32, so compute
+    # their stats in float64 like for a default load
+    narrowed = [col for col in df.columns if df[col].dtype == np.float32]
+    if narrowed:
+        df = df.copy(deep=False)
+        for col in narrowed:
+            df[col] = df[col].astype(np.float64)
+    summary = df.describe(include='all').to_dict()
+    missing_counts = df.isnull().sum().to_dict()
+    
+    distributions = {}
+
+    for col in df.columns:
+        # Ensure missing count is in summary
+        if col not in summary: summary[col] = {}
+        summary[col]['missing_count'] = missing_counts.get(col, 0)
+
+        # Distributions
+        if profiling.is_numeric_column(df[col]):
+            # Histogram for numeric
+            # Drop NaNs for histogram calculation
+            series = df[col].dropna()
+            if not series.empty:
+                hist, bin_edges = np.histogram(series, bins=profiling.HISTOGRAM_BINS)
+                distributions[col] = {
+                    "type": "numeric",
+                    "bins": profiling.format_bins(hist, bin_edges)
+                }
+            else:
+                distributions[col] = {"type": "numeric", "bins": []}
+        else:
+            # Value Counts for categorical (Top 10)
+            counts = df[col].value_counts().head(profiling.TOP_K).to_dict()
+            distributions[col] = {
+                "type": "categorical",
+                "counts": [{"name": str(k), "value": int(v)} for k, v in counts.items()]
+            }
+
+    # NaN stats become null when the profile is stored (profile_store.encode)
+    return summary, distributions
+
+def _profile_columns_parallel(df: pd.DataFrame, workers: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Runs _profile_columns on interleaved column groups in a process pool and
+    merges the results back into the column order of `df`.
+    """
+    groups = [list(df.columns[i::workers]) for i in range(workers)]
+
+    summary, distributions = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part_summary, part_distributions in pool.map(_profile_columns, [df[g] for g in groups]):
+            summary.update(part_summary)
+            distributions.update(part_distributions)
+
+    # describe(include='all') fills every stat for every column; each group
+    # only has the stats of its own dtypes, so realign them
+    keys = [k for k in profiling.DESCRIBE_KEYS if any(k in stats for stats in summary.values())]
+    summary = {
+        col: {**{k: summary[col].get(k) for k in keys}, "missing_count": summary[col]["missing_count"]}
+        for col in df.columns
+    }
+    distributions = {col: distributions[col] for col in df.columns}
+    return summary, distributions
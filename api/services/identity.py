@@ -0,0 +1,147 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from ..models import User, Tenant
+from . import metrics
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+# Seconds a cached identity is trusted; also bounds staleness across API processes
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "60"))
+
+@dataclass(frozen=True)
+class TenantSnapshot:
+    id: uuid.UUID
+    name: str
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Immutable copy of a User and its Tenant, safe to share between requests."""
+    id: uuid.UUID
+    email: str
+    full_name: Optional[str]
+    role: str
+    tenant_id: Optional[uuid.UUID]
+    tenant: Optional[TenantSnapshot]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        tenant = TenantSnapshot(id=user.tenant.id, name=user.tenant.name) if user.tenant else None
+        return cls(id=user.id, email=user.email, full_name=user.full_name, role=user.role,
+                   tenant_id=user.tenant_id, tenant=tenant)
+
+class IdentityCache:
+    """
+    TTL-bounded LRU of email -> UserSnapshot. Entries are dropped when the
+    User or its Tenant is updated or deleted through the ORM in this
+    process, both at flush and once the change commits; other processes
+    see the change once the TTL expires.
+    """
+
+    def __init__(self, max_entries: int = IDENTITY_CACHE_SIZE, ttl: float = IDENTITY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._by_user: Dict[uuid.UUID, str] = {}
+        self._by_tenant: Dict[uuid.UUID, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, email: str) -> Optional[UserSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(email)
+                self.hits += 1
+                metrics.cache("identity", "hit")
+                return entry[0]
+            if entry is not None:
+                self._drop(email)
+            self.misses += 1
+            metrics.cache("identity", "miss")
+            return None
+
+    def put(self, snapshot: UserSnapshot):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._drop(snapshot.email)
+            self._entries[snapshot.email] = (snapshot, time.monotonic() + self.ttl)
+            self._by_user[snapshot.id] = snapshot.email
+            if snapshot.tenant_id is not None:
+                self._by_tenant.setdefault(snapshot.tenant_id, set()).add(snapshot.email)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, email: str):
+        entry = self._entries.pop(email, None)
+        if entry is None:
+            return
+        snapshot = entry[0]
+        self._by_user.pop(snapshot.id, None)
+        emails = self._by_tenant.get(snapshot.tenant_id)
+        if emails is not None:
+            emails.discard(email)
+            if not emails:
+                del self._by_tenant[snapshot.tenant_id]
+
+    def invalidate_user(self, user_id: uuid.UUID):
+        with self._lock:
+            email = self._by_user.get(user_id)
+            if email is not None:
+                self._drop(email)
+
+    def invalidate_tenant(self, tenant_id: uuid.UUID):
+        with self._lock:
+            for email in list(self._by_tenant.get(tenant_id, ())):
+                self._drop(email)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._by_tenant.clear()
+
+_cache = IdentityCache()
+
+def get_identity_cache() -> IdentityCache:
+    return _cache
+
+# Session.info key of the users and tenants changed in the open transaction
+_CHANGED = "identity_changed"
+
+def _invalidate(kind: str, key: uuid.UUID):
+    if kind == "user":
+        _cache.invalidate_user(key)
+    else:
+        _cache.invalidate_tenant(key)
+
+def _changed(kind: str, target):
+    # Requests running before the commit can still read the old row and
+    # cache it again, so the entry is dropped once more after the commit
+    _invalidate(kind, target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED, set()).add((kind, target.id))
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    _changed("user", target)
+
+@event.listens_for(Tenant, "after_update")
+@event.listens_for(Tenant, "after_delete")
+def _tenant_changed(mapper, connection, target):
+    _changed("tenant", target)
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    for kind, key in session.info.pop(_CHANGED, ()):
+        _invalidate(kind, key)
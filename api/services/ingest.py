@@ -0,0 +1,220 @@
+import logging
+import os
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Iterator
+from . import columnar, metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+# Rows read to infer the ingest schema
+INGEST_SAMPLE_ROWS = int(os.getenv("INGEST_SAMPLE_ROWS", "10000"))
+# Text columns become categorical up to this many distinct values in the sample...
+INGEST_CATEGORY_MAX_UNIQUE = int(os.getenv("INGEST_CATEGORY_MAX_UNIQUE", "1000"))
+# ...and this ratio of distinct to non-missing values
+INGEST_CATEGORY_MAX_RATIO = float(os.getenv("INGEST_CATEGORY_MAX_RATIO", "0.5"))
+# float64 -> float32, only for columns whose every value survives the round trip
+INGEST_DOWNCAST_FLOATS = os.getenv("INGEST_DOWNCAST_FLOATS", "True")
+
+# Column kinds of the ingest schema
+INTEGER = "integer"
+FLOAT = "float"
+BOOLEAN = "boolean"
+DATETIME = "datetime"
+CATEGORY = "category"
+TEXT = "text"
+
+# Only unambiguous ISO dates are parsed; anything else stays text
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$")
+
+def _kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return BOOLEAN
+    if pd.api.types.is_integer_dtype(series):
+        return INTEGER
+    if pd.api.types.is_numeric_dtype(series):
+        # Integers with missing values are read as floats
+        return FLOAT
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return DATETIME
+    values = series.dropna()
+    if values.empty:
+        return TEXT
+    values = values.astype(str)
+    if values.str.match(_ISO_DATE).all():
+        return DATETIME
+    unique = values.nunique()
+    if unique <= INGEST_CATEGORY_MAX_UNIQUE and unique <= INGEST_CATEGORY_MAX_RATIO * len(values):
+        return CATEGORY
+    return TEXT
+
+def _sample(path: str, rows: int) -> pd.DataFrame:
+    if columnar.is_columnar(path):
+        batch = next(columnar.iter_chunks(path, rows), None)
+        return batch if batch is not None else pd.DataFrame(columns=columnar.column_names(path))
+    return pd.read_csv(path, nrows=rows, low_memory=False)
+
+def infer_schema(file_path: str, sample_rows: int = INGEST_SAMPLE_ROWS) -> Dict[str, str]:
+    """
+    Column kinds (integer, float, boolean, datetime, category, text) inferred
+    from the first `sample_rows` rows. Only used to pick compact dtypes:
+    loading never trusts the sample for value ranges.
+    """
+    path = file_path.replace("file://", "")
+    return {str(col): _kind(series) for col, series in _sample(path, sample_rows).items()}
+
+def _narrowest_int(column) -> Optional["pa.DataType"]:
+    """The smallest signed integer type holding every value of an arrow integer column."""
+    bounds = pc.min_max(column)
+    lo, hi = bounds["min"].as_py(), bounds["max"].as_py()
+    if lo is None:
+        return None
+    for dtype, arrow_type in ((np.int8, pa.int8()), (np.int16, pa.int16()), (np.int32, pa.int32())):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return arrow_type
+    return None
+
+def logical_dtype(series: pd.Series) -> str:
+    """
+    The dtype pandas' default inference would give, whatever compact type
+    the column is stored as. Parsed dates are datetime64[ns] whichever
+    reader (arrow, pandas, Parquet) produced them and in what unit.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        tz = getattr(series.dtype, "tz", None)
+        return f"datetime64[ns, {tz}]" if tz is not None else "datetime64[ns]"
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return "object"
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "int64"
+    if pd.api.types.is_float_dtype(series):
+        return "float64"
+    return str(series.dtype)
+
+def _float32_exact(column) -> bool:
+    """True if every value of an arrow float64 column is exactly representable as float32."""
+    round_trip = column.cast(pa.float32()).cast(pa.float64())
+    return column.null_count == len(column) or pc.all(pc.equal(round_trip, column)).as_py()
+
+def optimize_table(table: "pa.Table", schema: Dict[str, str]) -> "pa.Table":
+    """
+    Casts an arrow table to compact types before conversion to pandas:
+    integers to the narrowest type their actual range fits, floats to
+    float32 where that loses nothing, category columns to dictionaries and
+    date columns to timestamps. Numeric and category stats are unchanged.
+    Date columns, which a default load keeps as text, become datetimes:
+    their stats are datetime min, max and quartiles, and their distribution
+    counts timestamps rather than strings.
+    """
+    for i, field in enumerate(table.schema):
+        kind, column, target = schema.get(field.name), table.column(i), None
+        try:
+            if pa.types.is_integer(field.type) and column.null_count == 0:
+                target = _narrowest_int(column)
+            elif pa.types.is_float64(field.type) and INGEST_DOWNCAST_FLOATS == "True" and _float32_exact(column):
+                target = pa.float32()
+            elif kind == CATEGORY and (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+                table = table.set_column(i, field.name, column.dictionary_encode())
+            elif kind == DATETIME and (pa.types.is_string(field.type) or pa.types.is_date(field.type)):
+                target = pa.timestamp("ns")
+            if target is not None:
+                table = table.set_column(i, field.name, column.cast(target))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            # e.g. a value past the sample that isn't a date; keep the column as read
+            logger.warning("Keeping column '%s' as %s: %s", field.name, field.type, e)
+    return table
+
+def to_pandas(table: "pa.Table") -> pd.DataFrame:
+    # Releases arrow buffers column by column as they are converted
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def _read_csv_arrow(path: str, schema: Dict[str, str]) -> pd.DataFrame:
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    table = pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=columnar.CSV_BLOCK_SIZE),
+        convert_options=pacsv.ConvertOptions(
+            # Empty fields are missing values, as in pd.read_csv
+            strings_can_be_null=True,
+            column_types={col: dictionary for col, kind in schema.items() if kind == CATEGORY}
+        )
+    )
+    return to_pandas(optimize_table(table, schema))
+
+def _read_csv_pandas(path: str, schema: Dict[str, str]) -> pd.DataFrame:
+    dtype = {col: "category" for col, kind in schema.items() if kind == CATEGORY}
+    df = pd.read_csv(path, dtype=dtype, low_memory=False)
+    for col, kind in schema.items():
+        if kind == FLOAT and INGEST_DOWNCAST_FLOATS == "True" and df[col].dtype == np.float64:
+            narrowed = df[col].astype(np.float32)
+            if np.array_equal(narrowed.to_numpy(np.float64), df[col].to_numpy(), equal_nan=True):
+                df[col] = narrowed
+        elif kind == INTEGER and pd.api.types.is_integer_dtype(df[col]):
+            # Integer widths come from the loaded values, never from the sample
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif kind == DATETIME:
+            df[col] = _parse_dates(df[col])
+    return df
+
+def _parse_dates(series: pd.Series) -> pd.Series:
+    if series.dtype != object:
+        return series
+    # Several times faster than parse_dates in read_csv
+    try:
+        return pd.to_datetime(series, format="ISO8601")
+    except (ValueError, TypeError) as e:
+        logger.warning("Keeping column '%s' as text: %s", series.name, e)
+        return series
+
+def iter_chunks(path: str, chunksize: int, schema: Optional[Dict[str, str]] = None, dtype=None) -> Iterator[pd.DataFrame]:
+    """
+    Chunks of a CSV (read with `dtype`) or of its Parquet copy, with the
+    date columns of `schema` parsed like a full load does.
+    """
+    if columnar.is_columnar(path):
+        chunks = columnar.iter_chunks(path, chunksize)
+    else:
+        chunks = pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+    dates = [col for col, kind in (schema or {}).items() if kind == DATETIME]
+    for chunk in chunks:
+        for col in dates:
+            if col in chunk:
+                chunk[col] = _parse_dates(chunk[col])
+        yield chunk
+
+def read_csv(path: str, schema: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """
+    Loads a whole CSV with compact dtypes for `schema`, with the pyarrow
+    parser where available. If the schema doesn't fit the file, it is read
+    again with pandas' default inference.
+    """
+    if not schema:
+        return pd.read_csv(path)
+    try:
+        if HAS_ARROW:
+            return _read_csv_arrow(path, schema)
+        return _read_csv_pandas(path, schema)
+    except (ValueError, TypeError, OverflowError) as e:
+        logger.warning("Optimized CSV load failed, using default inference: %s", e)
+        metrics.error("csv_parse")
+        return pd.read_csv(path)
+
+def read_columnar(path: str, schema: Optional[Dict[str, str]], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Loads the Parquet copy with compact dtypes for `schema`."""
+    if not schema:
+        return columnar.read_columns(path, columns)
+    categories = [col for col, kind in schema.items() if kind == CATEGORY and (columns is None or col in columns)]
+    table = columnar.read_table(path, columns, read_dictionary=categories)
+    return to_pandas(optimize_table(table, schema))
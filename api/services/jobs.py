@@ -0,0 +1,174 @@
+import logging
+import os
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from ..database import SessionLocal, engine
+from ..models import Dataset, DatasetChunk
+from . import eda, columnar, appends, metrics, ingest, profile_store, profiling
+
+logger = logging.getLogger(__name__)
+
+# Dataset analysis states
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+# "process" keeps CPU-heavy profiling off the API process' GIL; "thread" is
+# handy for debugging and for platforms without fork
+ANALYSIS_EXECUTOR = os.getenv("ANALYSIS_EXECUTOR", "process")
+# Save the mergeable profile state at analysis, so the first append only
+# reads its own rows; costs one extra accumulator pass for in-memory profiles
+ANALYSIS_SAVE_PROFILE_STATE = os.getenv("ANALYSIS_SAVE_PROFILE_STATE", "True")
+
+_executor: Optional[Executor] = None
+
+def _init_worker():
+    # Forked workers must not reuse the parent's pooled DB connections
+    engine.dispose(close=False)
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if ANALYSIS_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+        else:
+            _executor = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS, initializer=_init_worker)
+    return _executor
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _update(db, dataset_id: uuid.UUID, **values):
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        return
+    for key, value in values.items():
+        setattr(dataset, key, value)
+    with metrics.span("db_commit"):
+        db.commit()
+
+def run_analysis(dataset_id: uuid.UUID, file_path: str, mode: str = eda.EXACT):
+    """
+    Writes the columnar copy of the stored file, sniffs its ingest schema,
+    profiles it and saves the result on the Dataset row (see
+    profile_store). Runs inside the worker pool, so it opens its own DB
+    session. Returns the stage timings, for the API process' metrics.
+    """
+    db = SessionLocal()
+    with metrics.recording(deferred=True) as timings:
+        try:
+            _update(db, dataset_id, status=RUNNING)
+            state_path = None
+            try:
+                with metrics.span("csv_parse"):
+                    columnar_path = columnar.write_columnar(file_path)
+                with metrics.span("schema_inference"):
+                    schema = ingest.infer_schema(file_path)
+                _update(db, dataset_id, columnar_path=columnar_path, ingest_schema=schema)
+                if ANALYSIS_SAVE_PROFILE_STATE == "True":
+                    state_path = appends.state_path_for(file_path, dataset_id)
+                with metrics.span("profile"):
+                    result = eda.analyze_dataset(columnar_path or file_path, mode=mode, schema=schema,
+                                                 state_path=state_path)
+                overview, sections = profile_store.split(result)
+                profile_store.save(db, dataset_id, sections)
+                failed = "error" in result
+                _update(db, dataset_id, status=FAILED if failed else READY, meta_info=overview,
+                        profile_state_path=None if failed else state_path)
+            except Exception as e:
+                # Includes failures to encode or store the profile, so the dataset never stays running
+                db.rollback()
+                _update(db, dataset_id, status=FAILED, meta_info={"error": str(e)})
+        finally:
+            db.close()
+    return timings
+
+def run_append(dataset_id: uuid.UUID):
+    """
+    Merges the dataset's pending appended chunks into its persisted profile
+    state and refreshes meta_info. Only the new rows are read: the state is
+    saved at analysis, or built once on the first append for datasets
+    analysed without it. Returns the stage timings, like run_analysis.
+    """
+    with metrics.recording(deferred=True) as timings:
+        _append(dataset_id)
+    return timings
+
+def _append(dataset_id: uuid.UUID):
+    db = SessionLocal()
+    try:
+        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+        if not dataset:
+            return
+        state_path = dataset.profile_state_path or appends.state_path_for(dataset.file_path, dataset.id)
+        with appends.locked(state_path):
+            chunks = db.query(DatasetChunk).filter(DatasetChunk.dataset_id == dataset_id).order_by(DatasetChunk.seq).all()
+            pending = [c for c in chunks if c.status in (PENDING, RUNNING)]
+            if not pending:
+                return
+
+            state = profiling.load_state(dataset.profile_state_path)
+            if state is None:
+                applied = [c.file_path for c in chunks if c.status == READY]
+                state = appends.build_state([dataset.columnar_path or dataset.file_path] + applied,
+                                            approximate=dataset.profile_mode == eda.APPROXIMATE,
+                                            schema=dataset.ingest_schema)
+
+            for chunk in pending:
+                try:
+                    with metrics.span("profile"):
+                        rows = appends.profile_rows(state, chunk.file_path)
+                        state.merge(rows)
+                    chunk.row_count, chunk.status = rows.row_count, READY
+                except Exception as e:
+                    chunk.status, chunk.error = FAILED, str(e)
+
+            profiling.save_state(state, state_path)
+            dataset.profile_state_path = state_path
+            dataset.meta_info, sections = profile_store.split(appends.finalize(state, dataset.file_path, dataset.id))
+            profile_store.save(db, dataset.id, sections)
+            with metrics.span("db_commit"):
+                db.commit()
+    finally:
+        db.close()
+
+def _job_done(future):
+    e = future.exception()
+    if e is not None:
+        logger.error("Analysis job failed", exc_info=e)
+        metrics.error("job")
+    else:
+        metrics.replay(future.result())
+
+def submit_analysis(dataset_id: uuid.UUID, file_path: str, mode: str = eda.EXACT):
+    future = get_executor().submit(run_analysis, dataset_id, file_path, mode)
+    future.add_done_callback(_job_done)
+    return future
+
+def submit_append(dataset_id: uuid.UUID):
+    future = get_executor().submit(run_append, dataset_id)
+    future.add_done_callback(_job_done)
+    return future
+
+def resume_pending():
+    """Re-enqueues jobs that were still queued or running when the API stopped."""
+    db = SessionLocal()
+    try:
+        stale = db.query(Dataset.id, Dataset.file_path, Dataset.profile_mode).filter(
+            Dataset.status.in_([PENDING, RUNNING])
+        ).all()
+        appending = db.query(DatasetChunk.dataset_id).filter(
+            DatasetChunk.status.in_([PENDING, RUNNING])
+        ).distinct().all()
+    finally:
+        db.close()
+    for dataset_id, file_path, mode in stale:
+        submit_analysis(dataset_id, file_path, mode or eda.EXACT)
+    for (dataset_id,) in appending:
+        submit_append(dataset_id)
@@ -0,0 +1,113 @@
+import os
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator
+from .llm_client import LLMClient, LLMRequestError
+
+# How long the first queued prompt waits for others to join its batch
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "10"))
+# Prompts per upstream request; a full batch is sent without waiting
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "16"))
+
+class BatchingLLMClient(LLMClient):
+    """
+    Wraps another LLMClient and coalesces concurrent generate() calls: prompts
+    queued within a short window (or until the batch is full) go upstream as
+    one generate_batch() request and each caller gets its own choice back.
+    If the backend rejects a batch (LLMRequestError, e.g. one prompt is too
+    long), its prompts are resent one by one so only the bad prompt fails.
+    Any other failure (timeouts, connection errors, 5xx) was already
+    retried by the inner client and fails every caller in the batch, so an
+    outage doesn't multiply the requests. Streaming calls are passed
+    through unbatched.
+    """
+
+    def __init__(self, inner: LLMClient, window_ms: float = LLM_BATCH_WINDOW_MS,
+                 max_batch: int = LLM_BATCH_MAX_SIZE):
+        self.inner = inner
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.prompts = 0
+        self._pending = []
+        self._timer = None
+        self._loop = None
+        # In-flight sends; the loop only keeps weak references to tasks
+        self._tasks = set()
+
+    def cache_identity(self) -> Dict[str, Any]:
+        return self.inner.cache_identity()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            self.prompts += len(batch)
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list):
+        prompts = [prompt for prompt, _, _ in batch]
+        # The batch is as patient as its most patient caller
+        timeouts = [t for _, t, _ in batch if t is not None]
+        try:
+            texts = await self.inner.generate_batch(prompts, timeout=max(timeouts) if timeouts else None)
+        except Exception as e:
+            if isinstance(e, LLMRequestError) and len(batch) > 1:
+                # Find out which prompts the backend rejects instead of failing them all
+                await asyncio.gather(*(self._send_one(item) for item in batch))
+            else:
+                self._fail(batch, e)
+            return
+        for (_, _, future), text in zip(batch, texts):
+            if not future.done():
+                future.set_result(text)
+
+    @staticmethod
+    def _fail(batch: list, error: Exception):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _send_one(self, item: tuple):
+        prompt, timeout, future = item
+        try:
+            text = await self.inner.generate(prompt, timeout=timeout)
+        except Exception as e:
+            self._fail([item], e)
+            return
+        if not future.done():
+            future.set_result(text)
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None, use_cache: bool = True) -> str:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queued futures belong to the loop that created them
+            self._loop, self._pending, self._timer = loop, [], None
+        future = loop.create_future()
+        self._pending.append((prompt, timeout, future))
+        if len(self._pending) >= self.max_batch or self.window <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    async def generate_batch(self, prompts: List[str], timeout: Optional[float] = None) -> List[str]:
+        return await self.inner.generate_batch(prompts, timeout=timeout)
+
+    async def generate_stream(self, prompt: str, timeout: Optional[float] = None,
+                              use_cache: bool = True) -> AsyncIterator[str]:
+        async for token in self.inner.generate_stream(prompt, timeout=timeout, use_cache=use_cache):
+            yield token
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "mean_batch_size": self.prompts / self.batches if self.batches else 0.0,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch
+        }
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, AsyncIterator
+from .llm_client import LLMClient
+from . import metrics
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+# Seconds before a cached completion expires; 0 keeps entries until evicted
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+# SQLite file for the persistent tier; empty keeps the cache in memory only
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")
+
+class CachingLLMClient(LLMClient):
+    """
+    Wraps another LLMClient and caches completions keyed by a hash of the
+    backend identity (model, sampling parameters) and the prompt. Lookups go
+    to an in-memory LRU first, then to the optional SQLite tier.
+    """
+
+    def __init__(self, inner: LLMClient, max_entries: int = LLM_CACHE_SIZE,
+                 ttl: float = LLM_CACHE_TTL, db_path: str = LLM_CACHE_DB):
+        self.inner = inner
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+
+    def cache_identity(self) -> Dict[str, Any]:
+        return self.inner.cache_identity()
+
+    def _key(self, prompt: str) -> str:
+        material = json.dumps({**self.cache_identity(), "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _expires_at(self) -> float:
+        return time.time() + self.ttl if self.ttl > 0 else float("inf")
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _db_get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT value, expires_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _db_put(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO completions VALUES (?, ?, ?)", (key, value, expires_at))
+            self._db.commit()
+
+    async def _lookup(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                del self._entries[key]
+        if self._db is None:
+            return None
+        row = await asyncio.to_thread(self._db_get, key)
+        if row is None or row[1] <= now:
+            return None
+        self._remember(key, row[0], row[1])
+        return row[0]
+
+    async def _store(self, key: str, value: str):
+        expires_at = self._expires_at()
+        self._remember(key, value, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_put, key, value, expires_at)
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None, use_cache: bool = True) -> str:
+        if not use_cache:
+            self.bypasses += 1
+            metrics.cache("llm", "bypass")
+            return await self.inner.generate(prompt, timeout=timeout)
+
+        key = self._key(prompt)
+        cached = await self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            metrics.cache("llm", "hit")
+            return cached
+
+        self.misses += 1
+        metrics.cache("llm", "miss")
+        result = await self.inner.generate(prompt, timeout=timeout)
+        await self._store(key, result)
+        return result
+
+    async def generate_stream(self, prompt: str, timeout: Optional[float] = None,
+                              use_cache: bool = True) -> AsyncIterator[str]:
+        """A hit is replayed as one chunk; a miss is cached once the stream completes."""
+        if not use_cache:
+            self.bypasses += 1
+            metrics.cache("llm", "bypass")
+            async for token in self.inner.generate_stream(prompt, timeout=timeout):
+                yield token
+            return
+
+        key = self._key(prompt)
+        cached = await self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            metrics.cache("llm", "hit")
+            yield cached
+            return
+
+        self.misses += 1
+        metrics.cache("llm", "miss")
+        parts = []
+        async for token in self.inner.generate_stream(prompt, timeout=timeout):
+            parts.append(token)
+            yield token
+        await self._store(key, "".join(parts))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "persistent": self._db is not None
+        }
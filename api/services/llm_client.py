@@ -1,17 +1,116 @@
 import os
+import re
 import json
+import random
+import asyncio
 import httpx
+from . import metrics
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+LLM_MODEL = os.getenv("LLM_MODEL", "meta-llama/Llama-2-7b-chat-hf")
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "512"))
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+# Seconds; LLM_TIMEOUT is the default read timeout, overridable per call
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+# Connection pool shared by all LLM calls
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+# In-flight requests per backend
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Delay between tokens when MockLLMClient simulates streaming
+MOCK_TOKEN_DELAY_MS = float(os.getenv("MOCK_TOKEN_DELAY_MS", "10"))
+# Simulated completion latency of MockLLMClient (e.g. for benchmarks)
+MOCK_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "0"))
+
+class LLMError(Exception):
+    """The LLM backend could not produce a completion."""
+
+class LLMRequestError(LLMError):
+    """The backend rejected the request itself (a 4xx such as a prompt that is too long); retrying it won't help."""
+
+# Long-lived HTTP client, owned by the app lifespan (see api/main.py)
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client, _http_client_loop
+    # Pooled connections belong to the loop that opened them
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client_loop = loop
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        )
+    return _http_client
+
+async def startup():
+    get_http_client()
+
+async def shutdown():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 class LLMClient(ABC):
     @abstractmethod
-    async def generate(self, prompt: str) -> str:
+    async def generate(self, prompt: str, timeout: Optional[float] = None, use_cache: bool = True) -> str:
+        """`use_cache=False` asks caching layers to skip lookup and storage."""
         pass
 
+    async def generate_stream(self, prompt: str, timeout: Optional[float] = None,
+                              use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Yields the completion as it is generated. Clients without native
+        streaming yield the full completion as a single chunk.
+        """
+        yield await self.generate(prompt, timeout=timeout, use_cache=use_cache)
+
+    async def generate_batch(self, prompts: List[str], timeout: Optional[float] = None) -> List[str]:
+        """Completions for several prompts, in order. Defaults to concurrent single calls."""
+        return list(await asyncio.gather(*(self.generate(p, timeout=timeout) for p in prompts)))
+
+    def cache_identity(self) -> Dict[str, Any]:
+        """Everything besides the prompt that determines a completion."""
+        return {"client": type(self).__name__}
+
+
+async def simulate_stream(text: str, delay_ms: float = MOCK_TOKEN_DELAY_MS) -> AsyncIterator[str]:
+    """Replays `text` word by word, as a streaming backend would send it."""
+    for token in re.findall(r"\s*\S+\s*", text) or [text]:
+        await asyncio.sleep(delay_ms / 1000)
+        yield token
+
 
 class MockLLMClient(LLMClient):
-    async def generate(self, prompt: str) -> str:
+    def __init__(self, latency_ms: float = MOCK_LATENCY_MS, token_delay_ms: float = MOCK_TOKEN_DELAY_MS):
+        self.latency_ms = latency_ms
+        self.token_delay_ms = token_delay_ms
+
+    async def generate_stream(self, prompt: str, timeout: Optional[float] = None,
+                              use_cache: bool = True) -> AsyncIterator[str]:
+        async for token in simulate_stream(await self.generate(prompt), self.token_delay_ms):
+            yield token
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None, use_cache: bool = True) -> str:
+        if self.latency_ms:
+            with metrics.span("llm"):
+                await asyncio.sleep(self.latency_ms / 1000)
+
         # 1. Handle "Insight Generation" Task (JSON output)
         if "generate_insights" in prompt or "Analyze the following dataset" in prompt or "Analyze this dataset" in prompt:
             return """[
@@ -22,24 +121,26 @@ class MockLLMClient(LLMClient):
         
         # 2. Handle "Story/Report" Task (Markdown output)
         elif "Executive Summary" in prompt or "Chief Data Officer" in prompt:
-            return """# Executive Summary
-            
-## Overview
-The dataset reveals interesting patterns regarding passenger demographics and spending. Notably, we observe a strong relationship between age and fare price.
+            # A fixed story matching the mock insights, titled with the dataset name
+            name_match = re.search(r'dataset report: "(.*?)"', prompt)
+            dataset_name = name_match.group(1) if name_match else "Dataset"
+            return f"""
+# Executive Summary: {dataset_name}
 
 ## Key Findings
-- **Age vs Fare**: Older passengers pay more.
-- **Data Quality**: Cabin information is largely missing.
+Analysis of the uploaded dataset reveals several critical trends. notably, there is a strong correlation between **Age and Fare** (0.54), suggesting that older demographic groups are driving higher revenue per ticket. This presents an opportunity to tailor premium services to this segment.
+
+## Data Quality Concerns
+However, data quality remains a challenge. The **Cabin** column has significant missing values (77%), which limits our ability to analyze location-based preferences. We recommend improving data collection at the point of booking.
 
-## Recommendations
-We recommend segmenting marketing based on age groups to maximize revenue."""
+## Pricing Strategy
+The distribution of **Fares** is highly skewed. A small number of high-value transactions are distorting the average, indicating that a tiered pricing strategy might be more effective than a one-size-fits-all approach.
+        """
 
         # 3. Handle "Chat/RAG" Task (Dynamic Response based on Context)
         else:
             # Extract the context passed in the prompt
             # Prompt format in router: "Relevant Context from analysis:\n{context_str}\n\nUser Question: {req.message}"
-            import re
-            
             # Try to grab the user question
             question_match = re.search(r"User Question: (.*)", prompt, re.DOTALL)
             question = question_match.group(1).strip() if question_match else "your question"
@@ -55,32 +156,156 @@ We recommend segmenting marketing based on age groups to maximize revenue."""
     
 
 class VLLMClient(LLMClient):
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, model: str = LLM_MODEL, max_tokens: int = LLM_MAX_TOKENS,
+                 temperature: float = LLM_TEMPERATURE, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES):
         self.base_url = base_url
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
 
-    async def generate(self, prompt: str) -> str:
-        async with httpx.AsyncClient() as client:
+    async def _post(self, path: str, payload: dict, timeout: Optional[float] = None) -> dict:
+        """POST with the shared pooled client, retrying transient failures with backoff."""
+        client = get_http_client()
+        request_timeout = httpx.Timeout(timeout or LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Exponential backoff with jitter, outside the concurrency slot
+                await asyncio.sleep(LLM_RETRY_BACKOFF * 2 ** (attempt - 1) * (1 + random.random()))
             try:
-                # Standard OpenAI-compatible completion
-                res = await client.post(
-                    f"{self.base_url}/completions",
-                    json={
-                        "model": "meta-llama/Llama-2-7b-chat-hf", # example model
-                        "prompt": prompt,
-                        "max_tokens": 512,
-                        "temperature": 0.7
-                    },
-                    timeout=30.0
-                )
+                async with self._get_semaphore():
+                    with metrics.span("llm"):
+                        res = await client.post(f"{self.base_url}{path}", json=payload, timeout=request_timeout)
+                if res.status_code in RETRY_STATUSES:
+                    last_error = f"HTTP {res.status_code}"
+                    continue
                 res.raise_for_status()
-                data = res.json()
-                return data["choices"][0]["text"]
-            except Exception as e:
-                print(f"LLM Error: {e}")
-                return "[]"
+                return res.json()
+            except httpx.TransportError as e:
+                last_error = repr(e)
+            except httpx.HTTPStatusError as e:
+                if e.response.is_client_error:
+                    raise LLMRequestError(str(e)) from e
+                raise LLMError(str(e)) from e
+            except ValueError as e:
+                raise LLMError(str(e)) from e
+        raise LLMError(f"{self.base_url}{path} failed after {self.max_retries + 1} attempts: {last_error}")
+
+    def cache_identity(self) -> Dict[str, Any]:
+        return {
+            "client": type(self).__name__,
+            "base_url": self.base_url,
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None, use_cache: bool = True) -> str:
+        return (await self.generate_batch([prompt], timeout))[0]
+
+    async def generate_batch(self, prompts: List[str], timeout: Optional[float] = None) -> List[str]:
+        # Standard OpenAI-compatible completion; a list prompt returns one choice per prompt
+        data = await self._post("/completions", {
+            "model": self.model,
+            "prompt": prompts[0] if len(prompts) == 1 else prompts,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }, timeout)
+        try:
+            choices = sorted(data["choices"], key=lambda c: c.get("index", 0))
+            texts = [c["text"] for c in choices]
+        except (KeyError, TypeError) as e:
+            raise LLMError(f"Malformed completion response: {data}") from e
+        if len(texts) != len(prompts):
+            raise LLMError(f"Expected {len(prompts)} choices, got {len(texts)}")
+        usage = data.get("usage") or {}
+        metrics.tokens(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+        return texts
+
+    async def generate_stream(self, prompt: str, timeout: Optional[float] = None,
+                              use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Streams an OpenAI-compatible completion (stream=True, server-sent
+        events). Connecting is retried like _post; once tokens have been
+        received a failure raises LLMError.
+        """
+        client = get_http_client()
+        request_timeout = httpx.Timeout(timeout or LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": True
+        }
+        last_error = None
+        # Only retried until the first token: a retry would resend the tokens already yielded
+        received = False
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(LLM_RETRY_BACKOFF * 2 ** (attempt - 1) * (1 + random.random()))
+            try:
+                async with self._get_semaphore():
+                    async with client.stream("POST", f"{self.base_url}/completions", json=payload,
+                                             timeout=request_timeout) as res:
+                        if res.status_code in RETRY_STATUSES:
+                            last_error = f"HTTP {res.status_code}"
+                            continue
+                        res.raise_for_status()
+                        async for line in res.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                return
+                            text = json.loads(data)["choices"][0].get("text", "")
+                            if text:
+                                # One streamed chunk per generated token
+                                metrics.tokens(completion=1)
+                                received = True
+                                yield text
+                        return
+            except httpx.TransportError as e:
+                if received:
+                    raise LLMError(f"Stream interrupted: {e!r}") from e
+                last_error = repr(e)
+            except (httpx.HTTPStatusError, ValueError, KeyError, IndexError) as e:
+                raise LLMError(str(e)) from e
+        raise LLMError(f"{self.base_url}/completions failed after {self.max_retries + 1} attempts: {last_error}")
+
+_llm_client: Optional[LLMClient] = None
+
+def set_llm_client(client: Optional[LLMClient]):
+    """Overrides the shared client (None resets to the configured one)."""
+    global _llm_client
+    _llm_client = client
 
 def get_llm_client() -> LLMClient:
-    provider = os.getenv("LLM_PROVIDER", "mock")
-    if provider == "vllm":
-        return VLLMClient(base_url=os.getenv("LLM_BASE_URL", "http://localhost:8000/v1"))
-    return MockLLMClient()
+    global _llm_client
+    if _llm_client is None:
+        provider = os.getenv("LLM_PROVIDER", "mock")
+        if provider == "vllm":
+            client = VLLMClient(base_url=os.getenv("LLM_BASE_URL", "http://localhost:8000/v1"))
+        else:
+            client = MockLLMClient()
+        if provider == "vllm" and os.getenv("LLM_BATCH_ENABLED", "True") == "True":
+            from .llm_batch import BatchingLLMClient
+            client = BatchingLLMClient(client)
+        # The cache sits in front, so hits never wait for a batch window
+        if os.getenv("LLM_CACHE_ENABLED", "True") == "True":
+            from .llm_cache import CachingLLMClient
+            client = CachingLLMClient(client)
+        _llm_client = client
+    return _llm_client
@@ -0,0 +1,232 @@
+import os
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Iterable
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True")
+# Histogram upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames))
+        return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted((key, (list(e[0]), e[1], e[2])) for key, e in self._values.items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _fmt(bound)
+                labels = _labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {repr(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("app_stage_duration_seconds", "Time spent in each hot-path stage.", ["stage"])
+STAGE_ERRORS = Counter("app_stage_errors_total", "Failures per hot-path stage.", ["stage"])
+REQUEST_SECONDS = Histogram("app_http_request_duration_seconds", "HTTP request latency per route.",
+                            ["method", "route", "status"])
+CACHE_REQUESTS = Counter("app_cache_requests_total", "Cache lookups per cache and result (hit, miss, bypass).",
+                         ["cache", "result"])
+LLM_TOKENS = Counter("app_llm_tokens_total", "LLM tokens reported by the backend.", ["kind"])
+
+METRICS = [STAGE_SECONDS, STAGE_ERRORS, REQUEST_SECONDS, CACHE_REQUESTS, LLM_TOKENS]
+
+# Stage timings of the current request or job: a list of (stage, seconds, failed)
+_recording: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("metrics_recording", default=None)
+# Set while recording in a worker process: timings are shipped back instead of observed here
+_deferred: contextvars.ContextVar[bool] = contextvars.ContextVar("metrics_deferred", default=False)
+
+def enabled() -> bool:
+    return METRICS_ENABLED == "True"
+
+def _record(stage: str, seconds: Optional[float], failed: bool):
+    timings = _recording.get()
+    if timings is not None:
+        timings.append((stage, seconds, failed))
+    if _deferred.get():
+        return
+    if seconds is not None:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    if failed:
+        STAGE_ERRORS.inc(stage=stage)
+
+@contextmanager
+def span(stage: str):
+    """Times the block as `stage`; an exception escaping it also counts as a failure."""
+    if not enabled():
+        yield
+        return
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _record(stage, time.perf_counter() - start, failed)
+
+def error(stage: str):
+    """Counts a failure that was handled inside `stage` (logged and swallowed)."""
+    if enabled():
+        _record(stage, None, True)
+
+def cache(name: str, result: str, amount: int = 1):
+    if enabled() and amount:
+        CACHE_REQUESTS.inc(amount, cache=name, result=result)
+
+def tokens(prompt: int = 0, completion: int = 0):
+    if not enabled():
+        return
+    if prompt:
+        LLM_TOKENS.inc(prompt, kind="prompt")
+    if completion:
+        LLM_TOKENS.inc(completion, kind="completion")
+
+@contextmanager
+def recording(deferred: bool = False):
+    """
+    Collects the stage timings of the block into a list. With `deferred`
+    they are not observed here, for work run in a process pool whose
+    timings are returned to the API process and passed to `replay`.
+    """
+    timings = []
+    token = _recording.set(timings)
+    deferred_token = _deferred.set(deferred)
+    try:
+        yield timings
+    finally:
+        _deferred.reset(deferred_token)
+        _recording.reset(token)
+
+def replay(timings: List[Tuple[str, Optional[float], bool]]):
+    for stage, seconds, failed in timings or []:
+        _record(stage, seconds, failed)
+
+def server_timing(timings: List[Tuple[str, Optional[float], bool]], total: float) -> str:
+    """Server-Timing header value; repeated stages are summed."""
+    durations: Dict[str, float] = {}
+    for stage, seconds, _ in timings:
+        if seconds is not None:
+            durations[stage] = durations.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={1000 * seconds:.1f}" for stage, seconds in durations.items()]
+    parts.append(f"total;dur={1000 * total:.1f}")
+    return ", ".join(parts)
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and adding a Server-Timing
+    header with the stages timed while handling the request. Streamed
+    bodies only include the stages that ran before the headers were sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                value = server_timing(timings, time.perf_counter() - start)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", value.encode())]}
+            await send(message)
+
+        with recording() as timings:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                # Label by route template, not raw path, to keep cardinality bounded
+                route = getattr(scope.get("route"), "path", "unmatched")
+                REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"],
+                                        route=route, status=status)
@@ -0,0 +1,119 @@
+import os
+import zlib
+import datetime
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import select
+from ..models import ProfileSection
+import orjson
+from . import metrics
+
+# NaN is written as null and numpy values natively
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# zlib level for stored sections (1 = fastest, 9 = smallest)
+PROFILE_COMPRESSION_LEVEL = int(os.getenv("PROFILE_COMPRESSION_LEVEL", "6"))
+
+# Profile parts that grow with the column (or preview row) count. They are
+# stored compressed, one row each, and only decoded when asked for; only
+# the scalar metadata (row_count, approximate, ...) stays in Dataset.meta_info
+SECTIONS = [
+    "schema", "summary", "distributions", "distinct_counts", "error_bounds", "preview",
+    "correlation", "correlation_pairs", "correlation_info"
+]
+
+def _default(value):
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (datetime.date, datetime.time)):
+        # Stats of date columns
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def encode(value: Any) -> bytes:
+    """JSON bytes with NaN/NaT as null and numpy and date values converted."""
+    return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+
+def decode(data: bytes) -> Any:
+    return orjson.loads(data)
+
+def split(profile: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Tuple[bytes, int]]]:
+    """
+    The overview of a profile, for Dataset.meta_info, and its SECTIONS as
+    {name: (compressed JSON, uncompressed size)}. The overview lists the
+    stored sections with their sizes under "sections".
+    """
+    with metrics.span("profile_encode"):
+        sections = {}
+        for name in SECTIONS:
+            if name in profile:
+                raw = encode(profile[name])
+                sections[name] = (zlib.compress(raw, PROFILE_COMPRESSION_LEVEL), len(raw))
+        overview = decode(encode({k: v for k, v in profile.items() if k not in SECTIONS}))
+    if sections:
+        overview["sections"] = {name: size for name, (_, size) in sections.items()}
+    return overview, sections
+
+def save(db, dataset_id, sections: Dict[str, Tuple[bytes, int]]):
+    """Replaces the dataset's stored sections (sync session, for jobs). The caller commits."""
+    db.query(ProfileSection).filter(ProfileSection.dataset_id == dataset_id).delete()
+    db.add_all([
+        ProfileSection(dataset_id=dataset_id, name=name, data=data, size=size)
+        for name, (data, size) in sections.items()
+    ])
+
+async def copy(db, source_id, target_id):
+    """Stores the sections of `source_id` for `target_id` as well, e.g. for a re-uploaded file. The caller commits."""
+    rows = (await db.execute(select(
+        ProfileSection.name, ProfileSection.data, ProfileSection.size
+    ).where(ProfileSection.dataset_id == source_id))).all()
+    db.add_all([
+        ProfileSection(dataset_id=target_id, name=row.name, data=row.data, size=row.size)
+        for row in rows
+    ])
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Splits a comma-separated `fields` parameter; None (everything) if empty."""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+async def load(db, dataset, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    The dataset's profile, or only `fields` of it: top-level names
+    ("distributions") or one entry of a section ("summary.Age"; the key is
+    everything after the first dot). Only the sections asked for are read
+    and decompressed. Raises KeyError for an unknown top-level name.
+    """
+    overview = {k: v for k, v in (dataset.meta_info or {}).items() if k != "sections"}
+    stored = (dataset.meta_info or {}).get("sections", {})
+
+    wanted: Dict[str, Optional[set]] = {}
+    for field in fields if fields is not None else list(overview) + list(stored):
+        name, _, key = field.partition(".")
+        if name not in overview and name not in stored:
+            raise KeyError(name)
+        if not key:
+            wanted[name] = None
+        elif name not in wanted or wanted[name] is not None:
+            wanted.setdefault(name, set()).add(key)
+
+    # Profiles saved before sections were split off keep them in meta_info
+    profile = {name: overview[name] for name in wanted if name in overview}
+    to_read = [name for name in wanted if name in stored and name not in overview]
+    if to_read:
+        rows = (await db.execute(select(ProfileSection.name, ProfileSection.data).where(
+            ProfileSection.dataset_id == dataset.id,
+            ProfileSection.name.in_(to_read)
+        ))).all()
+        with metrics.span("profile_decode"):
+            for row in rows:
+                profile[row.name] = decode(zlib.decompress(row.data))
+
+    for name, keys in wanted.items():
+        if keys is not None and isinstance(profile.get(name), dict):
+            profile[name] = {k: profile[name][k] for k in keys if k in profile[name]}
+    return profile
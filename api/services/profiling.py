@@ -0,0 +1,504 @@
+import os
+import uuid
+import pickle
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+from . import correlation, ingest
+
+# Number of bins exposed in the profile (matches the in-memory path in eda.py)
+HISTOGRAM_BINS = 10
+# Internal resolution of the streaming histogram; must be even
+HISTOGRAM_RESOLUTION = 512
+# Top categories exposed in the profile
+TOP_K = 10
+# Max distinct categories tracked per column before pruning the tail
+CATEGORY_CAPACITY = 10000
+
+# Same key order as DataFrame.describe(include='all')
+DESCRIBE_KEYS = ["count", "unique", "top", "freq", "mean", "std", "min", "25%", "50%", "75%", "max"]
+CATEGORICAL_KEYS = ["count", "unique", "top", "freq"]
+NUMERIC_KEYS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+def is_numeric_column(series: pd.Series) -> bool:
+    """Booleans are profiled like categories, as describe() does."""
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def format_bins(hist, bin_edges) -> List[Dict[str, Any]]:
+    return [
+        {"range": f"{bin_edges[i]:.2f}-{bin_edges[i+1]:.2f}", "count": int(hist[i])}
+        for i in range(len(hist))
+    ]
+
+
+class StreamingHistogram:
+    """
+    Fixed-resolution histogram whose range grows by doubling the bin width.
+    Two histograms can be merged, so chunks can be profiled independently.
+    """
+
+    def __init__(self, resolution: int = HISTOGRAM_RESOLUTION):
+        self.resolution = resolution
+        self.lo = None
+        self.width = None
+        self.counts = np.zeros(resolution, dtype=np.int64)
+
+    @property
+    def hi(self) -> float:
+        return self.lo + self.width * self.resolution
+
+    def _grow(self, left: bool):
+        half = self.resolution // 2
+        pairs = self.counts.reshape(half, 2).sum(axis=1)
+        zeros = np.zeros(half, dtype=np.int64)
+        if left:
+            self.lo = self.lo - self.width * self.resolution
+            self.counts = np.concatenate([zeros, pairs])
+        else:
+            self.counts = np.concatenate([pairs, zeros])
+        self.width *= 2
+
+    def _cover(self, vmin: float, vmax: float):
+        if self.lo is None:
+            span = vmax - vmin
+            self.lo = vmin
+            self.width = span / self.resolution if span > 0 else (abs(vmin) or 1.0) / self.resolution
+        while vmin < self.lo:
+            self._grow(left=True)
+        while vmax > self.hi:
+            self._grow(left=False)
+
+    def _index(self, values: np.ndarray) -> np.ndarray:
+        idx = np.floor((values - self.lo) / self.width).astype(np.int64)
+        return np.clip(idx, 0, self.resolution - 1)
+
+    def update(self, values: np.ndarray):
+        if values.size == 0:
+            return
+        self._cover(float(values.min()), float(values.max()))
+        self.counts += np.bincount(self._index(values), minlength=self.resolution)
+
+    def merge(self, other: "StreamingHistogram"):
+        if other.lo is None:
+            return
+        if self.lo is None:
+            self.lo, self.width, self.counts = other.lo, other.width, other.counts.copy()
+            return
+        self._cover(other.lo, other.hi)
+        while self.width < other.width:
+            self._grow(left=False)
+        centers = other.lo + (np.arange(other.resolution) + 0.5) * other.width
+        np.add.at(self.counts, self._index(centers), other.counts)
+
+    def to_bins(self, vmin: float, vmax: float, bins: int = HISTOGRAM_BINS) -> List[Dict[str, Any]]:
+        """Re-bins into `bins` equal-width bins over [vmin, vmax], like np.histogram."""
+        total = int(self.counts.sum())
+        if total == 0:
+            return []
+        if vmin == vmax:
+            edges = np.linspace(vmin - 0.5, vmax + 0.5, bins + 1)
+            hist = np.zeros(bins, dtype=np.int64)
+            hist[bins // 2] = total
+            return format_bins(hist, edges)
+        edges = np.linspace(vmin, vmax, bins + 1)
+        # Interpolate the cumulative count at the output edges, assuming values
+        # are spread uniformly inside each internal bin
+        fine_edges = self.lo + np.arange(self.resolution + 1) * self.width
+        cum = np.concatenate([[0], np.cumsum(self.counts)])
+        at_edges = np.round(np.interp(edges, fine_edges, cum))
+        at_edges[0], at_edges[-1] = 0, total
+        hist = np.diff(at_edges).astype(np.int64)
+        return format_bins(hist, edges)
+
+    def quantile(self, q: float, vmin: float, vmax: float) -> Optional[float]:
+        """Interpolated quantile; error is bounded by one internal bin width."""
+        total = self.counts.sum()
+        if total == 0:
+            return None
+        cum = np.cumsum(self.counts)
+        target = q * total
+        i = int(np.searchsorted(cum, target, side="left"))
+        i = min(i, self.resolution - 1)
+        prev = cum[i - 1] if i > 0 else 0
+        frac = (target - prev) / self.counts[i] if self.counts[i] else 0.0
+        value = self.lo + (i + frac) * self.width
+        return float(min(max(value, vmin), vmax))
+
+
+class NumericAccumulator:
+    """Count, missing, min/max, running mean/variance (Chan et al.) and histogram."""
+
+    kind = "numeric"
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.hist = StreamingHistogram()
+
+    def _combine(self, n_b: int, mean_b: float, m2_b: float):
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.count = n
+
+    def update(self, series: pd.Series):
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        mask = np.isnan(values)
+        self.missing += int(mask.sum())
+        self.update_values(values[~mask])
+
+    def update_values(self, values: np.ndarray):
+        """Adds non-missing values."""
+        if values.size == 0:
+            return
+        vmin, vmax = float(values.min()), float(values.max())
+        self.min = vmin if self.min is None else min(self.min, vmin)
+        self.max = vmax if self.max is None else max(self.max, vmax)
+        mean_b = float(values.mean())
+        self._combine(values.size, mean_b, float(((values - mean_b) ** 2).sum()))
+        self.hist.update(values[np.isfinite(values)])
+
+    def merge(self, other: "NumericAccumulator"):
+        self.missing += other.missing
+        if other.count == 0:
+            return
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._combine(other.count, other.mean, other.m2)
+        self.hist.merge(other.hist)
+
+    def summary(self) -> Dict[str, Any]:
+        if self.count == 0:
+            return {"count": 0}
+        std = float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": std,
+            "min": self.min,
+            "25%": self.hist.quantile(0.25, self.min, self.max),
+            "50%": self.hist.quantile(0.50, self.min, self.max),
+            "75%": self.hist.quantile(0.75, self.min, self.max),
+            "max": self.max,
+        }
+
+    def distribution(self) -> Dict[str, Any]:
+        if self.count == 0:
+            return {"type": "numeric", "bins": []}
+        return {"type": "numeric", "bins": self.hist.to_bins(self.min, self.max)}
+
+
+class CategoricalAccumulator:
+    """
+    Value counts with a bounded number of tracked categories. Counts are exact
+    until a column exceeds CATEGORY_CAPACITY distinct values; after that the
+    tail is pruned and `unique` becomes a lower bound.
+    """
+
+    kind = "categorical"
+
+    def __init__(self, capacity: int = CATEGORY_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self.missing = 0
+        self.pruned = False
+        self.counts = pd.Series(dtype=np.int64)
+
+    def _add_counts(self, counts: pd.Series):
+        self.counts = self.counts.add(counts, fill_value=0).astype(np.int64)
+        if len(self.counts) > self.capacity:
+            self.counts = self.counts.nlargest(self.capacity)
+            self.pruned = True
+
+    def update(self, series: pd.Series):
+        missing = int(series.isnull().sum())
+        self.missing += missing
+        self.count += len(series) - missing
+        self._add_counts(series.value_counts())
+
+    def merge(self, other: "CategoricalAccumulator"):
+        self.missing += other.missing
+        self.count += other.count
+        self.pruned = self.pruned or other.pruned
+        self._add_counts(other.counts)
+
+    def top(self, k: int = TOP_K) -> pd.Series:
+        return self.counts.nlargest(k)
+
+    def summary(self) -> Dict[str, Any]:
+        if self.count == 0:
+            return {"count": 0, "unique": 0, "top": None, "freq": None}
+        top = self.top(1)
+        return {
+            "count": self.count,
+            "unique": len(self.counts),
+            "top": top.index[0],
+            "freq": int(top.iloc[0]),
+        }
+
+    def distribution(self) -> Dict[str, Any]:
+        return {
+            "type": "categorical",
+            "counts": [{"name": str(k), "value": int(v)} for k, v in self.top().items()]
+        }
+
+
+class CoMomentAccumulator:
+    """
+    Pairwise-complete co-moments for a Pearson correlation matrix, matching
+    DataFrame.corr(). Sums are taken around a fixed shift (the first chunk's
+    means) to limit cancellation error.
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.shift = None
+        self.n = np.zeros((p, p))
+        self.sx = np.zeros((p, p))
+        self.sxx = np.zeros((p, p))
+        self.sxy = np.zeros((p, p))
+
+    def update(self, values: np.ndarray):
+        mask = ~np.isnan(values)
+        if self.shift is None:
+            counts = mask.sum(axis=0)
+            sums = np.where(mask, values, 0.0).sum(axis=0)
+            self.shift = np.divide(sums, counts, out=np.zeros(len(counts)), where=counts > 0)
+        m = mask.astype(np.float64)
+        z = np.where(mask, values - self.shift, 0.0)
+        self.n += m.T @ m
+        self.sx += z.T @ m
+        self.sxx += (z * z).T @ m
+        self.sxy += z.T @ z
+
+    def reindex(self, columns: List[str]) -> "CoMomentAccumulator":
+        """The same moments over `columns`; columns not tracked here get no observations."""
+        aligned = CoMomentAccumulator(columns)
+        if self.shift is None:
+            return aligned
+        src = [self.columns.index(c) if c in self.columns else -1 for c in columns]
+        keep = np.array([i for i, j in enumerate(src) if j >= 0], dtype=np.int64)
+        idx = np.array([j for j in src if j >= 0], dtype=np.int64)
+        aligned.shift = np.zeros(len(columns))
+        aligned.shift[keep] = self.shift[idx]
+        for name in ("n", "sx", "sxx", "sxy"):
+            getattr(aligned, name)[np.ix_(keep, keep)] = getattr(self, name)[np.ix_(idx, idx)]
+        return aligned
+
+    def merge(self, other: "CoMomentAccumulator"):
+        if other.shift is None:
+            return
+        if other.columns != self.columns:
+            other = other.reindex(self.columns)
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        d = other.shift - self.shift
+        sx = other.sx + other.n * d[:, None]
+        self.sxx += other.sxx + 2 * other.sx * d[:, None] + other.n * (d * d)[:, None]
+        self.sxy += other.sxy + other.sx * d[None, :] + other.sx.T * d[:, None] + other.n * np.outer(d, d)
+        self.sx += sx
+        self.n += other.n
+
+    def corr(self) -> np.ndarray:
+        n, sx = self.n, self.sx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = n * self.sxy - sx * sx.T
+            var_i = n * self.sxx - sx * sx
+            r = cov / np.sqrt(var_i * var_i.T)
+        r[(n < 2) | ~np.isfinite(r)] = np.nan
+        diag = np.diag(r).copy()
+        np.fill_diagonal(r, np.where(np.isnan(diag), np.nan, 1.0))
+        return np.clip(r, -1.0, 1.0)
+
+
+class ProfileAccumulator:
+    """
+    Feeds DataFrame chunks into per-column accumulators and builds the same
+    profile structure as eda.analyze_dataset. Column kinds are fixed by the
+    first chunk in which a column has data.
+    """
+
+    # Accumulator types per column kind; the approximate profile swaps in sketches
+    numeric_accumulator = NumericAccumulator
+    categorical_accumulator = CategoricalAccumulator
+
+    def __init__(self):
+        self.columns = None
+        self.dtypes = {}
+        self.accumulators = {}
+        self.comoments = None
+        self.row_count = 0
+        # Missing counts for columns that have not had any data yet
+        self.pending_missing = {}
+
+    def _dtype(self, col: str, series: pd.Series):
+        # Logical dtypes, so compactly loaded frames merge with default-read chunks
+        self._merge_dtype(col, ingest.logical_dtype(series), bool(series.isnull().all()))
+
+    def _merge_dtype(self, col: str, dtype: str, all_null: bool):
+        seen = self.dtypes.get(col)
+        if seen is None or all_null:
+            self.dtypes[col] = seen or dtype
+            return
+        if seen != dtype:
+            try:
+                self.dtypes[col] = str(np.result_type(np.dtype(seen), np.dtype(dtype)))
+            except TypeError:
+                self.dtypes[col] = "object"
+
+    @staticmethod
+    def _correlated(numeric_cols: List[str]) -> List[str]:
+        """Columns whose co-moments are tracked; memory is quadratic in their number."""
+        return numeric_cols[:correlation.CORRELATION_STREAMING_MAX_COLUMNS]
+
+    def numeric_columns(self) -> List[str]:
+        return [c for c in self.columns if self.accumulators.get(c) and self.accumulators[c].kind == "numeric"]
+
+    def update(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        self.row_count += len(chunk)
+
+        for col in self.columns:
+            series = chunk[col]
+            self._dtype(col, series)
+            acc = self.accumulators.get(col)
+            if acc is None:
+                if series.isnull().all():
+                    # Kind unknown until the column has data; only track missing
+                    self.accumulators[col] = None
+                    self.pending_missing[col] = self.pending_missing.get(col, 0) + len(series)
+                    continue
+                acc = self.numeric_accumulator() if is_numeric_column(series) else self.categorical_accumulator()
+                acc.missing += self.pending_missing.pop(col, 0)
+                self.accumulators[col] = acc
+            acc.update(series)
+
+        # Correlation co-moments are only tracked once the numeric column set is known
+        numeric_cols = self.numeric_columns()
+        if self.comoments is None and numeric_cols:
+            self.comoments = CoMomentAccumulator(self._correlated(numeric_cols))
+        if self.comoments is not None:
+            block = chunk[self.comoments.columns].apply(pd.to_numeric, errors="coerce")
+            self.comoments.update(block.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def merge(self, other: "ProfileAccumulator"):
+        """
+        Adds the rows profiled by `other`, which must have the same columns.
+        A column's kind (numeric or categorical) must agree where both sides
+        have data; ValueError otherwise.
+        """
+        if other.columns is None:
+            return
+        if self.columns is None:
+            self.columns = list(other.columns)
+        if other.columns != self.columns:
+            raise ValueError(f"Columns differ: expected {self.columns}, got {other.columns}")
+
+        for col in self.columns:
+            mine, theirs = self.accumulators.get(col), other.accumulators.get(col)
+            if theirs is None:
+                missing = other.pending_missing.get(col, 0)
+                if mine is None:
+                    self.accumulators[col] = None
+                    self.pending_missing[col] = self.pending_missing.get(col, 0) + missing
+                else:
+                    mine.missing += missing
+            elif mine is None:
+                theirs.missing += self.pending_missing.pop(col, 0)
+                self.accumulators[col] = theirs
+            elif mine.kind != theirs.kind:
+                raise ValueError(f"Column '{col}' is {mine.kind} but the new rows are {theirs.kind}")
+            else:
+                mine.merge(theirs)
+            if col in other.dtypes:
+                self._merge_dtype(col, other.dtypes[col], theirs is None)
+        self.row_count += other.row_count
+
+        if other.comoments is not None:
+            if self.comoments is None:
+                self.comoments = CoMomentAccumulator(self._correlated(self.numeric_columns()))
+            self.comoments.merge(other.comoments)
+
+    def finalize(self, matrix_path: Optional[str] = None) -> Dict[str, Any]:
+        """`matrix_path` is where a wide correlation matrix may be written (see correlation.summarize)."""
+        schema = {col: self.dtypes.get(col, "object") for col in self.columns}
+        kinds = {acc.kind for acc in self.accumulators.values() if acc is not None}
+        keys = [k for k in DESCRIBE_KEYS if
+                ("categorical" in kinds and k in CATEGORICAL_KEYS) or
+                ("numeric" in kinds and k in NUMERIC_KEYS)]
+
+        summary, distributions = {}, {}
+        for col in self.columns:
+            acc = self.accumulators.get(col)
+            if acc is None:
+                stats = {"count": 0}
+                missing = self.pending_missing.get(col, 0)
+                distributions[col] = {"type": "numeric", "bins": []}
+            else:
+                stats = acc.summary()
+                missing = acc.missing
+                distributions[col] = acc.distribution()
+            summary[col] = {k: stats.get(k) for k in keys}
+            summary[col]["missing_count"] = missing
+
+        if self.comoments is not None:
+            corr = correlation.from_matrix(self.comoments.corr(), self.comoments.columns,
+                                           rows=self.row_count, matrix_path=matrix_path)
+        else:
+            corr = correlation.empty()
+
+        numeric = {col: acc for col, acc in self.accumulators.items() if acc is not None and acc.kind == "numeric"}
+        return {
+            "schema": schema,
+            "summary": summary,
+            **corr,
+            "distributions": distributions,
+            "row_count": self.row_count,
+            "column_count": len(self.columns),
+            # Counts, mean, std, min and max are exact; quartiles and bins are not
+            "error_bounds": {
+                "quantile_abs_error": {col: acc.hist.width for col, acc in numeric.items() if acc.count},
+                "histogram": "binned from a streaming histogram; counts are interpolated"
+            }
+        }
+
+
+def accumulate(chunks) -> ProfileAccumulator:
+    """Feeds an iterable of DataFrames into a ProfileAccumulator, with memory bounded by the chunk size."""
+    acc = ProfileAccumulator()
+    for chunk in chunks:
+        acc.update(chunk)
+    if acc.columns is None:
+        raise ValueError("No columns to parse from file")
+    return acc
+
+
+def profile_chunks(chunks, matrix_path: Optional[str] = None) -> Dict[str, Any]:
+    """Profiles an iterable of DataFrames with memory bounded by the chunk size."""
+    return accumulate(chunks).finalize(matrix_path)
+
+
+def load_state(state_path: Optional[str]) -> Optional[ProfileAccumulator]:
+    if not state_path or not os.path.exists(state_path):
+        return None
+    with open(state_path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_state(state: ProfileAccumulator, state_path: str):
+    """Persists an accumulator (pickled), so later appended rows can be merged into it."""
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp = f"{state_path}.tmp-{uuid.uuid4()}"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, state_path)
@@ -1,7 +1,19 @@
+import logging
 import os
-from typing import List, Dict, Any
+import re
+import time
 import uuid
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Dict, Optional
 import numpy as np
+from .vector_index import VectorStore, VECTOR_INDEX_DIR
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 # Try to import Qdrant and SentenceTransformers, fallback if failed
 # Try to import Qdrant and SentenceTransformers, fallback if failed
@@ -13,92 +25,259 @@ try:
     # HAS_DEPS = True
     raise ImportError("Forcing Mock Mode")
 except ImportError as e:
-    print(f"RAG Dependencies missing or broken: {e}. Using Mock Mode.")
+    logger.warning("RAG dependencies missing or broken: %s. Using mock mode.", e)
     HAS_DEPS = False
 
-# Global In-Memory Store
-_MOCK_STORAGE = {}
+_model = None
+_qdrant = None
+
+EMBEDDING_DIM = 384
+# "sentence-transformers" (needs the RAG deps) or "hashing" (offline, deterministic)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+# SQLite file for a persistent embedding cache; empty disables it
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+# How long the first caller waits to collect concurrent encode requests
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+
+class HashingEmbedder:
+    """
+    Deterministic offline embedder (signed feature hashing of word unigrams
+    and bigrams). Texts sharing words get similar vectors, which is enough
+    for tests and local dev without model downloads.
+    """
+    name = "hashing-384"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = re.findall(r"\w+", text.lower())
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts):
+        if isinstance(texts, str):
+            return self._embed(texts)
+        return np.stack([self._embed(t) for t in texts]) if texts else np.empty((0, self.dim), dtype=np.float32)
+
+class EmbeddingService:
+    """
+    Front for an encoder with a content-hash keyed LRU cache (optionally
+    backed by SQLite) and micro-batching: misses from concurrent callers are
+    collected for a short window and encoded in one model call.
+    """
+
+    def __init__(self, model, model_name: str, cache_size: int = EMBEDDING_CACHE_SIZE,
+                 cache_path: str = EMBEDDING_CACHE_PATH, batch_window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+                 max_batch: int = EMBEDDING_MAX_BATCH):
+        self.model = model
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = []
+        self._draining = False
+        self._db = None
+        if cache_path:
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                return vector
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        self._remember(key, vector, persist=False)
+        return vector
+
+    def _remember(self, key: str, vector: np.ndarray, persist: bool = True):
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            if persist and self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", (key, vector.tobytes()))
+                self._db.commit()
+
+    def _drain(self):
+        """
+        Encodes queued texts in batches until the queue is empty. Every
+        queued future is resolved or failed, whatever goes wrong.
+        """
+        batch = []
+        try:
+            while True:
+                with self._lock:
+                    batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+                    if not batch:
+                        self._draining = False
+                        return
+                waiting = {}
+                for text, future in batch:
+                    waiting.setdefault(text, []).append(future)
+                texts = list(waiting)
+                try:
+                    with metrics.span("embed"):
+                        vectors = np.asarray(self.model.encode(texts), dtype=np.float32)
+                    if len(vectors) != len(texts):
+                        raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+                except Exception as e:
+                    self._fail(batch, e)
+                    continue
+                for text, vector in zip(texts, vectors):
+                    try:
+                        self._remember(self._key(text), vector)
+                    except Exception:
+                        # The vector is still good; only caching it failed
+                        logger.exception("Caching embedding failed")
+                        metrics.error("embedding_cache")
+                    for future in waiting[text]:
+                        future.set_result(vector)
+        except BaseException as e:
+            with self._lock:
+                queued, self._queue = self._queue, []
+                self._draining = False
+            self._fail(batch + queued, e)
+            raise
+
+    @staticmethod
+    def _fail(items: list, error: BaseException):
+        for _, future in items:
+            if not future.done():
+                future.set_exception(error)
+
+    def _encode_missing(self, texts: List[str]) -> List[np.ndarray]:
+        futures = [Future() for _ in texts]
+        with self._lock:
+            self._queue.extend(zip(texts, futures))
+            leader = not self._draining
+            self._draining = True
+        if leader:
+            # The first caller waits briefly so concurrent requests join its batch
+            if self.batch_window > 0:
+                time.sleep(self.batch_window)
+            self._drain()
+        return [f.result() for f in futures]
 
-class MockEmbedder:
     def encode(self, texts):
-        # Return random vectors of size 384
-        count = len(texts) if isinstance(texts, list) else 1
-        return np.random.rand(count, 384)
+        """Same contract as SentenceTransformer.encode for a str or a list of str."""
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+
+        vectors = [self._lookup(self._key(t)) for t in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        metrics.cache("embedding", "hit", len(texts) - len(missing))
+        metrics.cache("embedding", "miss", len(missing))
+        if missing:
+            for i, vector in zip(missing, self._encode_missing([texts[i] for i in missing])):
+                vectors[i] = vector
+
+        if single:
+            return vectors[0]
+        return np.stack(vectors) if vectors else np.empty((0, EMBEDDING_DIM), dtype=np.float32)
 
 class MockQdrant:
-     def __init__(self, path=None): pass
+     """
+     Qdrant-shaped facade over the embedded NumPy VectorStore: one contiguous
+     float32 matrix per dataset, cosine top-k by vectorized dot products.
+     """
+     def __init__(self, path=None):
+         self.store = VectorStore(path)
      
      def get_collections(self): 
          class Cols: collections=[]
          return Cols()
          
      def create_collection(self, **kwargs): 
-         name = kwargs.get("collection_name")
-         if name not in _MOCK_STORAGE:
-             _MOCK_STORAGE[name] = []
+         pass
              
      def upsert(self, **kwargs): 
-         name = kwargs.get("collection_name")
          points = kwargs.get("points", [])
-         if name not in _MOCK_STORAGE:
-             _MOCK_STORAGE[name] = []
-         # Extend storage with new points
-         _MOCK_STORAGE[name].extend(points)
+         by_dataset = {}
+         for p in points:
+             by_dataset.setdefault(p.payload.get("dataset_id"), []).append(p)
+         for dataset_id, group in by_dataset.items():
+             self.store.add(dataset_id, [p.vector for p in group], [p.payload for p in group])
          
      def search(self, **kwargs): 
-         name = kwargs.get("collection_name")
          query_filter = kwargs.get("query_filter")
+         limit = kwargs.get("limit", 3)
          dataset_id = None
          
          # Extract dataset_id from filter logic if possible
          # We are cheating here for the specific structure of our app
          try:
              dataset_id = query_filter.must[0].match.value
-         except:
+         except (AttributeError, IndexError):
              pass
-             
-         collection = _MOCK_STORAGE.get(name, [])
-         
-         # Filter by dataset_id
-         hits = []
-         for p in collection:
-             if dataset_id and p.payload.get("dataset_id") != dataset_id:
-                 continue
-             # In a real mock we would compute cosine similarity
-             # But simply returning the last 3 items is often good enough for "context"
-             # matching the "latest" insights.
-             hits.append(p)
-             
-         # Return top 3 (reverse order to get latest)
-         return hits[-3:]
+
+         if dataset_id is None:
+             return []
+         hits = self.store.search(dataset_id, kwargs.get("query_vector"), limit)
+         return [models.ScoredPoint(score=score, payload=payload) for score, payload in hits]
+
+     def delete(self, **kwargs):
+         try:
+             dataset_id = kwargs.get("points_selector").filter.must[0].match.value
+         except (AttributeError, IndexError):
+             return
+         self.store.delete(dataset_id)
 
 if not 'models' in locals():
     class MockModels:
+        class _Struct:
+             def __init__(self, **kwargs): self.__dict__.update(kwargs)
         class VectorParams:
              def __init__(self, size, distance): pass
         class Distance:
              COSINE = "Cosine"
-        class PointStruct:
-             def __init__(self, **kwargs): pass
-        class Filter:
-             def __init__(self, **kwargs): pass
-        class FieldCondition:
-             def __init__(self, **kwargs): pass
-        class MatchValue:
-             def __init__(self, **kwargs): pass
+        class PointStruct(_Struct): pass
+        class ScoredPoint(_Struct): pass
+        class Filter(_Struct): pass
+        class FieldCondition(_Struct): pass
+        class MatchValue(_Struct): pass
+        class FilterSelector(_Struct): pass
     models = MockModels()
 
-def get_model():
+def get_model() -> EmbeddingService:
     global _model
     if _model is None:
-        if HAS_DEPS:
+        encoder = None
+        if HAS_DEPS and EMBEDDING_BACKEND == "sentence-transformers":
             try:
-                _model = SentenceTransformer('all-MiniLM-L6-v2')
-            except Exception as e:
-                print(f"Failed to load SentenceTransformer: {e}")
-                _model = MockEmbedder()
-        else:
-            _model = MockEmbedder()
+                encoder, name = SentenceTransformer('all-MiniLM-L6-v2'), 'all-MiniLM-L6-v2'
+            except Exception:
+                logger.exception("Failed to load SentenceTransformer")
+                metrics.error("embed")
+        if encoder is None:
+            encoder = HashingEmbedder()
+            name = encoder.name
+        _model = EmbeddingService(encoder, name)
     return _model
 
 def get_qdrant_client():
@@ -108,9 +287,9 @@ def get_qdrant_client():
             try:
                 _qdrant = QdrantClient(path="./qdrant_storage")
             except Exception:
-                 _qdrant = MockQdrant()
+                 _qdrant = MockQdrant(VECTOR_INDEX_DIR)
         else:
-            _qdrant = MockQdrant()
+            _qdrant = MockQdrant(VECTOR_INDEX_DIR)
     return _qdrant
 
 COLLECTION_NAME = "insights"
@@ -152,9 +331,20 @@ def index_text(dataset_id: str, texts: List[str], metadatas: List[Dict]):
             }
         ))
         
-    client.upsert(
-        collection_name=COLLECTION_NAME,
-        points=points
+    with metrics.span("vector_upsert"):
+        client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=points
+        )
+
+def _dataset_filter(dataset_id: str):
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="dataset_id",
+                match=models.MatchValue(value=str(dataset_id))
+            )
+        ]
     )
 
 def search(dataset_id: str, query: str, limit: int = 3) -> List[str]:
@@ -169,18 +359,21 @@ def search(dataset_id: str, query: str, limit: int = 3) -> List[str]:
     
     query_vector = model.encode(query).tolist()
     
-    hits = client.search(
-        collection_name=COLLECTION_NAME,
-        query_vector=query_vector,
-        query_filter=models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="dataset_id",
-                    match=models.MatchValue(value=str(dataset_id))
-                )
-            ]
-        ),
-        limit=limit
-    )
+    with metrics.span("vector_search"):
+        hits = client.search(
+            collection_name=COLLECTION_NAME,
+            query_vector=query_vector,
+            query_filter=_dataset_filter(dataset_id),
+            limit=limit
+        )
     
     return [hit.payload["text"] for hit in hits]
+
+def delete_index(dataset_id: str):
+    """Removes everything indexed for the dataset."""
+    client = get_qdrant_client()
+    init_collection()
+    client.delete(
+        collection_name=COLLECTION_NAME,
+        points_selector=models.FilterSelector(filter=_dataset_filter(dataset_id))
+    )
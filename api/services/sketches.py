@@ -0,0 +1,324 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+from .profiling import NumericAccumulator, CategoricalAccumulator, ProfileAccumulator
+
+# KLL accuracy parameter; normalized rank error is about 2.3 / k^0.97 (~1.3% at 200)
+KLL_K = int(os.getenv("SKETCH_KLL_K", "200"))
+# HyperLogLog uses 2^p one-byte registers; relative error is about 1.04 / sqrt(2^p)
+HLL_PRECISION = int(os.getenv("SKETCH_HLL_PRECISION", "14"))
+# Categories tracked by the Misra-Gries heavy-hitter summary
+TOP_K_CAPACITY = int(os.getenv("SKETCH_TOP_K_CAPACITY", "1000"))
+# Rows kept in the uniform preview sample
+PREVIEW_ROWS = int(os.getenv("SKETCH_PREVIEW_ROWS", "100"))
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Exact bit length of uint64 values, via two float-exact 32-bit halves."""
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide="ignore"):
+        hi_len = np.where(hi > 0, np.floor(np.log2(hi)) + 33, 0)
+        lo_len = np.where(lo > 0, np.floor(np.log2(lo)) + 1, 0)
+    return np.where(hi > 0, hi_len, lo_len).astype(np.int64)
+
+
+def hash_values(series: pd.Series) -> np.ndarray:
+    """64-bit hashes of the non-missing values; numbers hash by value, whatever their dtype."""
+    values = series.dropna()
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        values = values.astype(np.float64)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+class HyperLogLog:
+    """Distinct-count sketch with 2^p registers; mergeable by register-wise max."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, hashes: np.ndarray):
+        if hashes.size == 0:
+            return
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        rank = (64 - p) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class KLLSketch:
+    """
+    Quantile sketch (Karnin, Lang, Liberty): a stack of compactors whose
+    capacities shrink geometrically toward the bottom. Items at level i
+    stand for 2^i values. Memory is O(k log(n/k)).
+    """
+
+    def __init__(self, k: int = KLL_K, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self) -> float:
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            odd = len(items) % 2
+            # Keep one item back if odd; promote every other one of the rest
+            promoted = items[odd:][self._rng.integers(2)::2]
+            self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # A new top level shrinks the capacities below it
+            level = 0
+
+    def update(self, values: np.ndarray):
+        if values.size == 0:
+            return
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values.astype(np.float64)])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        self.n += other.n
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** i) for i, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cum = np.cumsum(weights[order])
+        i = int(np.searchsorted(cum, q * cum[-1], side="left"))
+        return float(items[order][min(i, len(items) - 1)])
+
+
+class ReservoirSample:
+    """Uniform sample of `size` rows (Algorithm R), applied a chunk at a time."""
+
+    def __init__(self, size: int = PREVIEW_ROWS, seed: Optional[int] = None):
+        self.size = size
+        self.seen = 0
+        self.rows: Optional[pd.DataFrame] = None
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame):
+        if self.size <= 0 or chunk.empty:
+            return
+        fill = 0
+        if self.rows is None or len(self.rows) < self.size:
+            fill = min(self.size - (0 if self.rows is None else len(self.rows)), len(chunk))
+            # Object columns, so rows from later chunks fit whatever their dtypes
+            head = chunk.iloc[:fill].astype(object).reset_index(drop=True)
+            self.rows = head if self.rows is None else pd.concat([self.rows, head], ignore_index=True)
+        rest = len(chunk) - fill
+        if rest > 0:
+            # Row i (0-based, overall) replaces a random slot with probability size / (i + 1)
+            positions = np.arange(self.seen + fill, self.seen + len(chunk))
+            slots = (self._rng.random(rest) * (positions + 1)).astype(np.int64)
+            accepted = np.flatnonzero(slots < self.size)
+            if accepted.size:
+                # When rows of one chunk hit the same slot, the later one wins
+                winners = pd.Series(fill + accepted, index=slots[accepted])
+                winners = winners[~winners.index.duplicated(keep="last")]
+                self.rows.iloc[winners.index.to_numpy()] = chunk.iloc[winners.to_numpy()].astype(object).to_numpy()
+        self.seen += len(chunk)
+
+    def merge(self, other: "ReservoirSample"):
+        """Uniform sample of the rows seen by both samples."""
+        if other.rows is None:
+            return
+        if self.rows is None:
+            self.rows, self.seen = other.rows.copy(), other.seen
+            return
+        k = min(self.size, len(self.rows) + len(other.rows))
+        # How many of the k rows come from each side follows the number of rows each has seen
+        mine = int(self._rng.hypergeometric(self.seen, other.seen, k))
+        mine = min(max(mine, k - len(other.rows)), len(self.rows))
+        self.rows = pd.concat([
+            self.rows.sample(n=mine, random_state=self._rng),
+            other.rows.sample(n=k - mine, random_state=self._rng)
+        ], ignore_index=True)
+        self.seen += other.seen
+
+    def records(self) -> List[Dict[str, Any]]:
+        if self.rows is None:
+            return []
+        return self.rows.where(self.rows.notnull(), None).to_dict(orient="records")
+
+
+class NumericSketch(NumericAccumulator):
+    """Exact count, missing, min/max and moments; KLL quantiles and HLL distinct count."""
+
+    def __init__(self):
+        super().__init__()
+        self.kll = KLLSketch()
+        self.hll = HyperLogLog()
+
+    def update_values(self, values: np.ndarray):
+        super().update_values(values)
+        self.kll.update(values[np.isfinite(values)])
+        self.hll.update(hash_values(pd.Series(values)))
+
+    def merge(self, other: "NumericSketch"):
+        super().merge(other)
+        self.kll.merge(other.kll)
+        self.hll.merge(other.hll)
+
+    def distinct(self) -> int:
+        return self.hll.estimate()
+
+    def summary(self) -> Dict[str, Any]:
+        stats = super().summary()
+        if self.count:
+            for key, q in (("25%", 0.25), ("50%", 0.5), ("75%", 0.75)):
+                stats[key] = self.kll.quantile(q)
+        return stats
+
+
+class CategoricalSketch(CategoricalAccumulator):
+    """
+    Misra-Gries heavy hitters (the mergeable form of space-saving) for the
+    top categories and HLL for the distinct count. Each tracked count is an
+    underestimate by at most `max_count_error`, which is <= n / (capacity + 1).
+    """
+
+    def __init__(self, capacity: int = TOP_K_CAPACITY):
+        super().__init__(capacity)
+        self.hll = HyperLogLog()
+        self.max_count_error = 0
+
+    def _add_counts(self, counts: pd.Series):
+        combined = self.counts.add(counts, fill_value=0).astype(np.int64)
+        if len(combined) > self.capacity:
+            cut = int(combined.nlargest(self.capacity + 1).iloc[-1])
+            combined = combined[combined > cut] - cut
+            self.max_count_error += cut
+            self.pruned = True
+        self.counts = combined
+
+    def update(self, series: pd.Series):
+        super().update(series)
+        self.hll.update(hash_values(series))
+
+    def merge(self, other: "CategoricalSketch"):
+        super().merge(other)
+        self.hll.merge(other.hll)
+        self.max_count_error += other.max_count_error
+
+    def distinct(self) -> int:
+        return self.hll.estimate()
+
+    def summary(self) -> Dict[str, Any]:
+        stats = super().summary()
+        if self.count:
+            stats["unique"] = self.distinct()
+        return stats
+
+
+class SketchProfileAccumulator(ProfileAccumulator):
+    """
+    ProfileAccumulator with fixed-size sketches per column, so memory does
+    not depend on row count or cardinality. Adds a uniform row preview and
+    the error bounds of the estimates to the profile.
+    """
+
+    numeric_accumulator = NumericSketch
+    categorical_accumulator = CategoricalSketch
+
+    def __init__(self):
+        super().__init__()
+        self.preview = ReservoirSample()
+        # Set when reading stopped at max_rows; the profile then describes only the rows read
+        self.truncated = False
+
+    def update(self, chunk: pd.DataFrame):
+        super().update(chunk)
+        self.preview.update(chunk)
+
+    def merge(self, other: "SketchProfileAccumulator"):
+        super().merge(other)
+        self.preview.merge(other.preview)
+        self.truncated = self.truncated or other.truncated
+
+    def finalize(self, matrix_path: Optional[str] = None) -> Dict[str, Any]:
+        profile = super().finalize(matrix_path)
+        sketches = {col: acc for col, acc in self.accumulators.items() if acc is not None}
+        profile["approximate"] = True
+        profile["distinct_counts"] = {col: acc.distinct() for col, acc in sketches.items()}
+        profile["error_bounds"] = {
+            # Quantiles (25%/50%/75%) are within this fraction of n in rank
+            "quantile_rank_error": KLLSketch(KLL_K).rank_error,
+            "distinct_relative_error": HyperLogLog(HLL_PRECISION).relative_error,
+            # Top category counts may be low by at most this many rows
+            "top_count_error": {
+                col: acc.max_count_error for col, acc in sketches.items() if acc.kind == "categorical"
+            },
+            "histogram": "binned from a streaming histogram; counts are interpolated"
+        }
+        profile["preview"] = self.preview.records()
+        profile["truncated"] = self.truncated
+        return profile
+
+
+def accumulate_approx(chunks, max_rows: Optional[int] = None) -> SketchProfileAccumulator:
+    """
+    Feeds an iterable of DataFrames into a SketchProfileAccumulator. With
+    `max_rows`, reading stops after that many rows, bounding runtime too;
+    the profile is then marked `truncated`.
+    """
+    acc = SketchProfileAccumulator()
+    for chunk in chunks:
+        if max_rows and acc.row_count + len(chunk) > max_rows:
+            chunk = chunk.iloc[:max_rows - acc.row_count]
+            acc.truncated = True
+        acc.update(chunk)
+        if acc.truncated:
+            break
+    if acc.columns is None:
+        raise ValueError("No columns to parse from file")
+    return acc
+
+
+def profile_chunks_approx(chunks, max_rows: Optional[int] = None,
+                          matrix_path: Optional[str] = None) -> Dict[str, Any]:
+    """Sketch-based profile of an iterable of DataFrames (see accumulate_approx)."""
+    return accumulate_approx(chunks, max_rows).finalize(matrix_path)
@@ -1,15 +1,35 @@
 import os
-import io
+import uuid
 import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
 from minio import Minio
+from minio.commonconfig import ComposeSource
+from minio.error import S3Error
 from fastapi import UploadFile
 
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "localhost:9000")
 MINIO_ACCESS_KEY = os.getenv("MINIO_ROOT_USER", "minioadmin")
 MINIO_SECRET_KEY = os.getenv("MINIO_ROOT_PASSWORD", "minioadmin")
-MINIO_BUCKET = "datasets"
+MINIO_BUCKET = os.getenv("MINIO_BUCKET", "datasets")
+MINIO_SECURE = os.getenv("MINIO_SECURE", "False")
 USE_LOCAL_STORAGE = os.getenv("USE_LOCAL_STORAGE", "True") # Default to True
+# Read size used when streaming uploads through the hasher
+CHUNK_SIZE = 1024 * 1024
+# Multipart part size for object storage uploads (S3 minimum is 5 MiB);
+# this bounds the memory held per upload
+PART_SIZE = int(os.getenv("MINIO_PART_SIZE_MB", "16")) * 1024 * 1024
+# Where local storage keeps objects; keys are relative to it
+LOCAL_ROOT = Path("uploads") / MINIO_BUCKET
+
+ProgressCallback = Callable[[int], None]
+
+# Bytes stored so far of the uploads in flight, by (tenant_id, upload_id)
+_upload_progress: Dict[Tuple[str, str], dict] = {}
+_progress_lock = threading.Lock()
 
 # Global client holder
 minio_client = None
@@ -21,40 +41,148 @@ def get_minio_client():
             MINIO_ENDPOINT,
             access_key=MINIO_ACCESS_KEY,
             secret_key=MINIO_SECRET_KEY,
-            secure=False
+            secure=MINIO_SECURE == "True"
         )
     return minio_client
 
-def upload_file(file: UploadFile, object_name: str) -> str:
+class HashingReader:
+    """
+    File-like wrapper that hashes and counts bytes as they are read, so an
+    upload can be checksummed while it streams to storage.
+    """
+
+    def __init__(self, raw, progress: Optional[ProgressCallback] = None):
+        self.raw = raw
+        self.progress = progress
+        self.hasher = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.raw.read(size)
+        if chunk:
+            self.hasher.update(chunk)
+            self.bytes_read += len(chunk)
+            if self.progress:
+                self.progress(self.bytes_read)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+def _ensure_bucket(client):
+    if not client.bucket_exists(MINIO_BUCKET):
+        client.make_bucket(MINIO_BUCKET)
+
+def _stream_to_object(client, object_name: str, reader, content_type: str):
+    # Unknown length: minio-py sends it as a multipart upload of PART_SIZE parts
+    client.put_object(
+        MINIO_BUCKET,
+        object_name,
+        reader,
+        length=-1,
+        part_size=PART_SIZE,
+        content_type=content_type or "application/octet-stream"
+    )
+
+@contextmanager
+def track_upload(tenant_id: str, upload_id: Optional[str], total_bytes: Optional[int] = None) -> Iterator[Optional[ProgressCallback]]:
+    """
+    Publishes the progress of one upload under a client-chosen id (see
+    upload_progress) while it is stored. Yields the callback to pass to
+    upload_blob, or None without an id.
+    """
+    if not upload_id:
+        yield None
+        return
+    key = (str(tenant_id), upload_id)
+    entry = {"upload_id": upload_id, "bytes_stored": 0, "total_bytes": total_bytes}
+
+    def progress(bytes_stored: int):
+        entry["bytes_stored"] = bytes_stored
+
+    with _progress_lock:
+        _upload_progress[key] = entry
+    try:
+        yield progress
+    finally:
+        with _progress_lock:
+            _upload_progress.pop(key, None)
+
+def upload_progress(tenant_id: str, upload_id: str) -> Optional[dict]:
+    """Bytes stored so far of an upload in flight, or None once it has finished."""
+    with _progress_lock:
+        entry = _upload_progress.get((str(tenant_id), upload_id))
+        return dict(entry) if entry else None
+
+def local_key(path: str) -> Optional[str]:
+    """The key of a file under local storage (e.g. "{tenant_id}/blobs/{hash}.corr.npy"), or None if it is elsewhere."""
+    try:
+        return Path(path).resolve().relative_to(LOCAL_ROOT.resolve()).as_posix()
+    except ValueError:
+        return None
+
+def local_path(key: str) -> str:
+    """The file for a local storage key; keys cannot point outside the storage root."""
+    root = LOCAL_ROOT.resolve()
+    path = (root / key).resolve()
+    if root not in path.parents:
+        raise ValueError(f"Invalid storage key: {key}")
+    return str(path)
+
+def blob_object_name(tenant_id: str, content_hash: str) -> str:
+    return f"{tenant_id}/blobs/{content_hash}.csv"
+
+def _object_exists(client, object_name: str) -> bool:
+    try:
+        client.stat_object(MINIO_BUCKET, object_name)
+        return True
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return False
+        raise
+
+def upload_blob(file: UploadFile, tenant_id: str, progress: Optional[ProgressCallback] = None) -> Tuple[str, str]:
+    """
+    Stores the upload content-addressed: the content is hashed (sha256) while
+    it is streamed in and kept once per tenant under its hash. Returns the
+    storage path and the hex digest. `progress` is called with the number of
+    bytes stored so far. A failed upload leaves nothing behind.
+    """
+    reader = HashingReader(file.file, progress)
+
     if USE_LOCAL_STORAGE == "True":
-        # Local Filesystem Fallback
-        base_dir = Path("uploads") / MINIO_BUCKET
-        base_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Determine local path
-        # object_name might be "tenant_id/file.csv"
-        file_path = base_dir / object_name
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        return f"file://{file_path.absolute()}"
-    
+        blob_dir = LOCAL_ROOT / str(tenant_id) / "blobs"
+        blob_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = blob_dir / f".tmp-{uuid.uuid4()}"
+        try:
+            with open(tmp_path, "wb") as buffer:
+                shutil.copyfileobj(reader, buffer, CHUNK_SIZE)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        content_hash = reader.hexdigest()
+        file_path = LOCAL_ROOT / blob_object_name(tenant_id, content_hash)
+        if file_path.exists():
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, file_path)
+        return f"file://{file_path.absolute()}", content_hash
+
     else:
-        # MinIO Upload
         client = get_minio_client()
-        if not client.bucket_exists(MINIO_BUCKET):
-            client.make_bucket(MINIO_BUCKET)
-            
-        content = file.file.read()
-        file.file.seek(0)
-        
-        client.put_object(
-            MINIO_BUCKET,
-            object_name,
-            io.BytesIO(content),
-            length=len(content),
-            content_type=file.content_type
-        )
-        return f"s3://{MINIO_BUCKET}/{object_name}"
+        _ensure_bucket(client)
+
+        # The final key depends on the hash, so stream to a temporary key
+        # first and move it server-side once the hash is known
+        tmp_name = f"{tenant_id}/uploads/{uuid.uuid4()}"
+        try:
+            _stream_to_object(client, tmp_name, reader, file.content_type)
+            content_hash = reader.hexdigest()
+            object_name = blob_object_name(tenant_id, content_hash)
+            if not _object_exists(client, object_name):
+                client.compose_object(MINIO_BUCKET, object_name, [ComposeSource(MINIO_BUCKET, tmp_name)])
+        finally:
+            client.remove_object(MINIO_BUCKET, tmp_name)
+        return f"s3://{MINIO_BUCKET}/{object_name}", content_hash
@@ -0,0 +1,161 @@
+import os
+import json
+import uuid
+import shutil
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "./vector_index")
+# Datasets whose index is kept loaded; older ones are reloaded from disk when needed
+VECTOR_INDEX_CACHE_SIZE = int(os.getenv("VECTOR_INDEX_CACHE_SIZE", "64"))
+
+# Rows and payloads are only ever appended; the manifest says how much of
+# each file is committed and is the one file replaced on save
+VECTORS_FILE = "vectors.f32"
+PAYLOADS_FILE = "payloads.jsonl"
+MANIFEST_FILE = "manifest.json"
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class VectorIndex:
+    """
+    Unit-normalized float32 vectors of one dataset in a contiguous matrix, so
+    cosine similarity is a single matrix-vector product.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.size = 0
+        self.matrix = np.empty((0, dim), dtype=np.float32)
+        self.payloads: List[Dict[str, Any]] = []
+        # Rows and payload bytes already on disk
+        self.saved = 0
+        self.saved_bytes = 0
+
+    def add(self, vectors, payloads: List[Dict[str, Any]]):
+        vectors = normalize(vectors)
+        n = len(vectors)
+        if self.size + n > len(self.matrix) or not self.matrix.flags.writeable:
+            # Grow geometrically; this also copies a read-only memory map into RAM
+            grown = np.empty((max(2 * len(self.matrix), self.size + n), self.dim), dtype=np.float32)
+            grown[:self.size] = self.matrix[:self.size]
+            self.matrix = grown
+        self.matrix[self.size:self.size + n] = vectors
+        # Payloads first, so a concurrent search never sees a row without one
+        self.payloads.extend(payloads)
+        self.size += n
+
+    def search(self, query, limit: int = 3) -> List[Tuple[float, Dict[str, Any]]]:
+        if self.size == 0 or limit <= 0:
+            return []
+        scores = self.matrix[:self.size] @ normalize(query)[0]
+        if limit < self.size:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(self.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), self.payloads[i]) for i in top]
+
+    def save(self, directory: Path):
+        """
+        Appends the rows added since the last save, then commits them by
+        replacing the manifest. A crash before that leaves the old index
+        intact; its uncommitted tail is cut off by the next save.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        lines = "".join(json.dumps(p) + "\n" for p in self.payloads[self.saved:self.size]).encode()
+        rows = np.ascontiguousarray(self.matrix[self.saved:self.size])
+        for name, committed, data in ((VECTORS_FILE, self.saved * self.dim * 4, rows.tobytes()),
+                                      (PAYLOADS_FILE, self.saved_bytes, lines)):
+            with open(directory / name, "ab") as f:
+                f.truncate(committed)
+                f.write(data)
+        tmp = directory / f"{MANIFEST_FILE}.{uuid.uuid4().hex}"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "size": self.size, "payload_bytes": self.saved_bytes + len(lines)}, f)
+        os.replace(tmp, directory / MANIFEST_FILE)
+        self.saved, self.saved_bytes = self.size, self.saved_bytes + len(lines)
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["VectorIndex"]:
+        manifest_path = directory / MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        index = cls(manifest["dim"])
+        if manifest["size"]:
+            index.matrix = np.memmap(directory / VECTORS_FILE, dtype=np.float32, mode="r",
+                                     shape=(manifest["size"], manifest["dim"]))
+        with open(directory / PAYLOADS_FILE, "rb") as f:
+            data = f.read(manifest["payload_bytes"])
+        index.payloads = [json.loads(line) for line in data.splitlines()]
+        index.size = index.saved = manifest["size"]
+        index.saved_bytes = manifest["payload_bytes"]
+        return index
+
+class VectorStore:
+    """
+    Per-dataset VectorIndex instances, persisted under `root` and loaded
+    lazily with memory mapping. Search cost depends only on the size of the
+    dataset's own index. At most `cache_size` indexes stay loaded (least
+    recently used first out); without a `root` nothing could be reloaded,
+    so all are kept.
+    """
+
+    def __init__(self, root: Optional[str] = VECTOR_INDEX_DIR, cache_size: int = VECTOR_INDEX_CACHE_SIZE):
+        self.root = Path(root) if root else None
+        self.cache_size = cache_size
+        self.indexes: "OrderedDict[str, VectorIndex]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _directory(self, dataset_id: str) -> Path:
+        return self.root / str(dataset_id)
+
+    def _get(self, dataset_id: str) -> Optional[VectorIndex]:
+        index = self.indexes.get(dataset_id)
+        if index is not None:
+            self.indexes.move_to_end(dataset_id)
+        elif self.root is not None:
+            index = VectorIndex.load(self._directory(dataset_id))
+            if index is not None:
+                self._keep(dataset_id, index)
+        return index
+
+    def _keep(self, dataset_id: str, index: VectorIndex):
+        self.indexes[dataset_id] = index
+        self.indexes.move_to_end(dataset_id)
+        # Evicted indexes are saved already
+        while self.root is not None and len(self.indexes) > self.cache_size:
+            self.indexes.popitem(last=False)
+
+    def add(self, dataset_id: str, vectors, payloads: List[Dict[str, Any]]):
+        with self.lock:
+            index = self._get(dataset_id)
+            if index is None:
+                index = VectorIndex(np.shape(vectors)[-1])
+            index.add(vectors, payloads)
+            if self.root is not None:
+                index.save(self._directory(dataset_id))
+            self._keep(dataset_id, index)
+
+    def search(self, dataset_id: str, query, limit: int = 3) -> List[Tuple[float, Dict[str, Any]]]:
+        with self.lock:
+            index = self._get(dataset_id)
+        if index is None:
+            return []
+        return index.search(query, limit)
+
+    def delete(self, dataset_id: str):
+        """Drops the dataset's index, loaded and on disk."""
+        with self.lock:
+            self.indexes.pop(dataset_id, None)
+            if self.root is not None:
+                shutil.rmtree(self._directory(dataset_id), ignore_errors=True)
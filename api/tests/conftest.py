@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+FIXTURE_ROWS = 2000
+
+@pytest.fixture(scope="session")
+def frame() -> pd.DataFrame:
+    """Mixed-type frame with missing values, written as the fixture CSV."""
+    rng = np.random.default_rng(1)
+    n = FIXTURE_ROWS
+    return pd.DataFrame({
+        "age": rng.integers(18, 90, n),
+        "income": rng.normal(50000, 12000, n).round(2),
+        "score": np.where(rng.random(n) < 0.1, np.nan, rng.random(n)),
+        "city": rng.choice(["Berlin", "Lagos", "Lima", "Osaka"], n),
+        "flag": rng.random(n) < 0.3
+    })
+
+@pytest.fixture(scope="session")
+def csv_path(frame, tmp_path_factory) -> str:
+    path = tmp_path_factory.mktemp("data") / "fixture.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
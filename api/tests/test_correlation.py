@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from api.services import correlation, profiling, storage
+
+def _wide_frame(rows: int = 500, cols: int = 40, missing: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    base = rng.normal(size=(rows, 4))
+    # Columns share a few latent factors, so there are strong pairs to find
+    values = base @ rng.normal(size=(4, cols)) + rng.normal(scale=0.5, size=(rows, cols))
+    if missing:
+        values[rng.random(values.shape) < missing] = np.nan
+    return pd.DataFrame(values, columns=[f"c{i}" for i in range(cols)])
+
+def _blocked_matrix(df: pd.DataFrame, block_size: int) -> np.ndarray:
+    p = df.shape[1]
+    matrix = np.full((p, p), np.nan)
+    for i0, j0, r in correlation.iter_blocks(df.to_numpy(dtype=np.float64), block_size):
+        rows, cols = r.shape
+        matrix[i0:i0 + rows, j0:j0 + cols] = r
+        matrix[j0:j0 + cols, i0:i0 + rows] = r.T
+    return matrix
+
+@pytest.mark.parametrize("missing", [0.0, 0.2])
+@pytest.mark.parametrize("block_size", [7, 16, 256])
+def test_blocked_correlation_matches_pandas(missing, block_size):
+    df = _wide_frame(missing=missing)
+    # float32 products: agreement to about 1e-5
+    np.testing.assert_allclose(_blocked_matrix(df, block_size), df.corr().to_numpy(), atol=2e-5)
+
+def test_constant_and_sparse_columns_are_missing_like_pandas():
+    df = _wide_frame(rows=50, cols=5)
+    df["constant"] = 1.0
+    df["sparse"] = np.nan
+    df.loc[:0, "sparse"] = 1.0
+    expected = df.corr().to_numpy()
+    got = _blocked_matrix(df, 3)
+    np.testing.assert_array_equal(np.isnan(got), np.isnan(expected))
+    np.testing.assert_allclose(got, expected, atol=2e-5)
+
+def test_top_pairs_are_the_strongest(monkeypatch):
+    monkeypatch.setattr(correlation, "CORRELATION_TOP_K", 25)
+    df = _wide_frame(cols=60)
+    result = correlation.compute(df)
+
+    expected = df.corr().to_numpy()
+    upper = np.triu_indices(len(expected), k=1)
+    strongest = np.sort(np.abs(expected[upper]))[::-1][:25]
+    pairs = result["correlation_pairs"]
+    assert len(pairs) == 25
+    np.testing.assert_allclose([abs(p["r"]) for p in pairs], strongest, atol=1e-4)
+    for pair in pairs:
+        assert pair["r"] == pytest.approx(df[pair["a"]].corr(df[pair["b"]]), abs=1e-4)
+    # Too wide for nested dicts, and no matrix_path to store the matrix at
+    assert result["correlation"] == {}
+    assert result["correlation_info"]["matrix"] is None
+
+def test_streamed_comoments_respect_the_column_cap(monkeypatch):
+    monkeypatch.setattr(correlation, "CORRELATION_STREAMING_MAX_COLUMNS", 10)
+    df = _wide_frame(cols=30)
+    single = profiling.ProfileAccumulator()
+    single.update(df)
+    assert single.comoments.columns == list(df.columns[:10])
+    assert single.comoments.n.shape == (10, 10)
+
+    left, right = profiling.ProfileAccumulator(), profiling.ProfileAccumulator()
+    left.update(df.iloc[:200])
+    right.update(df.iloc[200:])
+    left.merge(right)
+    np.testing.assert_allclose(left.comoments.corr(), df.iloc[:, :10].corr().to_numpy(), atol=1e-9)
+
+def test_column_correlations_read_the_stored_matrix(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "LOCAL_ROOT", tmp_path)
+    df = _wide_frame(cols=60)
+    result = correlation.compute(df, matrix_path=str(tmp_path / "data.corr.npy"))
+    info = result["correlation_info"]
+    assert info["matrix"]["key"] == "data.corr.npy"
+
+    expected = df.corr()["c3"].drop("c3")
+    expected = expected.reindex(expected.abs().sort_values(ascending=False).index)[:5]
+    got = correlation.column_correlations(info, None, "c3", top=5)
+    assert [g["column"] for g in got] == list(expected.index)
+    np.testing.assert_allclose([g["r"] for g in got], expected.to_numpy(), atol=1e-3)
+    assert correlation.column_correlations(info, None, "missing") is None
+
+def test_column_correlations_of_a_narrow_table():
+    df = _wide_frame(cols=5)
+    result = correlation.compute(df)
+    got = correlation.column_correlations(result["correlation_info"], result["correlation"]["c0"], "c0", top=2)
+    expected = df.corr()["c0"].drop("c0")
+    assert got[0]["column"] == expected.abs().idxmax()
+    assert len(got) == 2
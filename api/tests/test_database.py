@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine, inspect, text
+from api.database import Base, upgrade_schema
+from api import models  # noqa: F401 (registers the tables)
+
+# The datasets table as the first release created it
+OLD_DATASETS = """
+CREATE TABLE datasets (
+    id CHAR(32) PRIMARY KEY, name VARCHAR, description TEXT, meta_info JSON,
+    insights JSON, story TEXT, file_path VARCHAR, tenant_id CHAR(32), created_at DATETIME
+)
+"""
+
+def test_upgrade_adds_new_columns_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(OLD_DATASETS))
+        conn.execute(text("INSERT INTO datasets (id, name) VALUES (lower(hex(randomblob(16))), 'old.csv')"))
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("datasets")}
+    assert columns == set(Base.metadata.tables["datasets"].columns.keys())
+    indexes = {i["name"] for i in inspector.get_indexes("datasets")}
+    assert "ix_datasets_tenant_created" in indexes
+    assert "dataset_chunks" in inspector.get_table_names()
+    with engine.connect() as conn:
+        # Datasets profiled before jobs existed are ready, and exact
+        row = conn.execute(text("SELECT status, profile_mode, columnar_path FROM datasets")).one()
+    assert tuple(row) == ("ready", "exact", None)
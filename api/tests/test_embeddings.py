@@ -0,0 +1,48 @@
+import sqlite3
+import threading
+import numpy as np
+import pytest
+from api.services.rag import EmbeddingService, HashingEmbedder
+
+def _encode_concurrently(service, callers: int = 5):
+    results, errors = [], []
+    def call(i):
+        try:
+            results.append(service.encode([f"text {i}", "shared"]))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    assert not any(t.is_alive() for t in threads), "callers still waiting"
+    return results, errors
+
+def test_concurrent_misses_are_cached():
+    service = EmbeddingService(HashingEmbedder(), "hashing", cache_path=None, batch_window_ms=20)
+    results, errors = _encode_concurrently(service)
+    assert not errors and len(results) == 5
+    assert service.misses == 10
+    np.testing.assert_array_equal(service.encode("shared"), results[0][1])
+    assert service.hits == 1
+
+def test_cache_write_failure_still_returns_vectors(monkeypatch):
+    service = EmbeddingService(HashingEmbedder(), "hashing", cache_path=None, batch_window_ms=20)
+    def fail(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(service, "_remember", fail)
+    results, errors = _encode_concurrently(service)
+    assert not errors and len(results) == 5
+    assert not service._draining
+
+def test_encoder_failure_reaches_every_caller():
+    class Broken:
+        def encode(self, texts):
+            return np.zeros((1, 4), dtype=np.float32)
+    service = EmbeddingService(Broken(), "broken", cache_path=None, batch_window_ms=20)
+    results, errors = _encode_concurrently(service)
+    assert not results and len(errors) == 5
+    assert not service._draining
+    with pytest.raises(ValueError):
+        service.encode(["again"] * 2 + ["other"])
@@ -0,0 +1,77 @@
+import uuid
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, joinedload
+from api.database import Base
+from api.models import User, Tenant
+from api.services import identity
+
+@pytest.fixture
+def cache(monkeypatch) -> identity.IdentityCache:
+    cache = identity.IdentityCache(ttl=60)
+    monkeypatch.setattr(identity, "_cache", cache)
+    return cache
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        tenant = Tenant(name="acme")
+        session.add_all([tenant, User(email="a@acme.com", full_name="Ann", role="analyst", tenant=tenant)])
+        session.commit()
+        yield session
+
+def _snapshot(session, email: str = "a@acme.com") -> identity.UserSnapshot:
+    user = session.query(User).options(joinedload(User.tenant)).filter(User.email == email).one()
+    return identity.UserSnapshot.from_user(user)
+
+def _fake_snapshot(email: str) -> identity.UserSnapshot:
+    return identity.UserSnapshot(id=uuid.uuid4(), email=email, full_name=None, role="viewer",
+                                 tenant_id=None, tenant=None)
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(identity.time, "monotonic", lambda: now[0])
+    cache = identity.IdentityCache(ttl=60)
+    cache.put(_fake_snapshot("a@acme.com"))
+
+    now[0] += 59
+    assert cache.get("a@acme.com") is not None
+    now[0] += 2
+    assert cache.get("a@acme.com") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_cache_is_bounded():
+    cache = identity.IdentityCache(max_entries=2)
+    for email in ["a@x.com", "b@x.com", "c@x.com"]:
+        cache.put(_fake_snapshot(email))
+    assert cache.get("a@x.com") is None
+    assert cache.get("c@x.com") is not None
+
+def test_user_update_invalidates_at_flush_and_commit(cache, session):
+    cache.put(_snapshot(session))
+    user = session.query(User).filter(User.email == "a@acme.com").one()
+    user.role = "viewer"
+    session.flush()
+    assert cache.get("a@acme.com") is None
+
+    # A concurrent request still reads the committed row and caches it
+    stale = identity.UserSnapshot(**{**_snapshot(session).__dict__, "role": "analyst"})
+    cache.put(stale)
+    session.commit()
+    assert cache.get("a@acme.com") is None
+    assert _snapshot(session).role == "viewer"
+
+def test_tenant_changes_invalidate_its_users(cache, session):
+    cache.put(_snapshot(session))
+    tenant = session.query(Tenant).filter(Tenant.name == "acme").one()
+    tenant.name = "acme-renamed"
+    session.commit()
+    assert cache.get("a@acme.com") is None
+
+def test_user_delete_invalidates(cache, session):
+    cache.put(_snapshot(session))
+    session.delete(session.query(User).filter(User.email == "a@acme.com").one())
+    session.commit()
+    assert cache.get("a@acme.com") is None
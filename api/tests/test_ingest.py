@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from api.services import appends, columnar, eda, ingest, profiling
+
+@pytest.fixture
+def dated_csv(tmp_path) -> str:
+    rng = np.random.default_rng(3)
+    n = 300
+    frame = pd.DataFrame({
+        "day": pd.date_range("2024-01-01", periods=n, freq="D").strftime("%Y-%m-%d"),
+        "seen_at": pd.date_range("2024-01-01 08:00", periods=n, freq="h").strftime("%Y-%m-%d %H:%M:%S"),
+        "amount": rng.normal(100, 10, n).round(2),
+        "count": rng.integers(0, 50, n),
+        "city": rng.choice(["Berlin", "Lagos", "Lima"], n)
+    })
+    path = tmp_path / "dated.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+def _schema(path: str, **kwargs) -> dict:
+    profile = eda.analyze_dataset(f"file://{path}", **kwargs)
+    assert "error" not in profile, profile.get("error")
+    return profile["schema"]
+
+def test_logical_dtype_ignores_datetime_unit():
+    values = pd.Series(["2024-01-01", "2024-02-01"])
+    for unit in ["s", "ms", "us", "ns"]:
+        assert ingest.logical_dtype(pd.to_datetime(values).astype(f"datetime64[{unit}]")) == "datetime64[ns]"
+
+def test_schema_is_the_same_on_every_path(dated_csv, tmp_path, monkeypatch):
+    schema = ingest.infer_schema(dated_csv)
+    expected = _schema(dated_csv, schema=schema, workers=1)
+    assert expected["day"] == expected["seen_at"] == "datetime64[ns]"
+
+    assert _schema(dated_csv, schema=schema, chunksize=50) == expected
+    parquet = columnar.write_columnar(f"file://{dated_csv}")
+    if parquet:
+        parquet = parquet.replace("file://", "")
+        assert _schema(parquet, schema=schema, workers=1) == expected
+        assert _schema(parquet, schema=schema, chunksize=50) == expected
+    monkeypatch.setattr(ingest, "HAS_ARROW", False)
+    assert _schema(dated_csv, schema=schema, workers=1) == expected
+
+    # Appending rows keeps the schema, whether or not the state was saved
+    state_path = str(tmp_path / "state.pkl")
+    _schema(dated_csv, schema=schema, workers=1, state_path=state_path)
+    state = profiling.load_state(state_path)
+    state.merge(appends.profile_rows(state, f"file://{dated_csv}"))
+    assert state.finalize()["schema"] == expected
+    rebuilt = appends.build_state([f"file://{dated_csv}"], schema=schema)
+    assert rebuilt.finalize()["schema"] == expected
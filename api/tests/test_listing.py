@@ -0,0 +1,84 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from api.database import Base, get_db
+from api.dependencies import get_current_tenant
+from api.models import Dataset, Tenant
+from api.routers import datasets
+
+NAMES = ["sales_2023.csv", "sales_2024.csv", "sales%.csv", "salesX.csv", "churn.csv"]
+
+@pytest.fixture
+def tenants(tmp_path):
+    url = tmp_path / "listing.db"
+    engine = create_engine(f"sqlite:///{url}")
+    Base.metadata.create_all(engine)
+    ours, theirs = Tenant(name="ours"), Tenant(name="theirs")
+    start = datetime(2024, 1, 1)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([ours, theirs])
+        for i in range(25):
+            # Every third dataset shares its timestamp with the one before
+            created_at = start + timedelta(minutes=i - i // 3)
+            db.add(Dataset(name=NAMES[i % len(NAMES)], tenant=ours, created_at=created_at, meta_info={"big": "x" * 100}))
+        db.add(Dataset(name="sales_other.csv", tenant=theirs, created_at=start))
+        db.commit()
+        ids = {t.name: t.id for t in (ours, theirs)}
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{url}", ids
+
+@pytest.fixture
+def client(tenants):
+    url, ids = tenants
+    engine = create_async_engine(url)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def db():
+        async with sessions() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(datasets.router)
+    app.dependency_overrides[get_db] = db
+    app.dependency_overrides[get_current_tenant] = lambda: Tenant(id=ids["ours"], name="ours")
+    with TestClient(app) as client:
+        yield client
+
+def _walk(client, **params):
+    pages, cursor = [], None
+    while True:
+        r = client.get("/datasets/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        pages.append(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_pages_cover_every_dataset_once_newest_first(client):
+    pages = _walk(client, limit=4)
+    rows = [row for page in pages for row in page]
+    assert [len(page) for page in pages] == [4] * 6 + [1]
+    assert len({row["id"] for row in rows}) == 25
+    keys = [(row["created_at"], uuid.UUID(row["id"])) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+    # Only the listed columns are returned
+    assert set(rows[0]) == {"id", "name", "created_at"}
+
+def test_last_full_page_has_no_cursor(client):
+    r = client.get("/datasets/", params={"limit": 25})
+    assert len(r.json()) == 25
+    assert "X-Next-Cursor" not in r.headers
+
+def test_prefix_matches_literally(client):
+    names = {row["name"] for page in _walk(client, prefix="sales_", limit=3) for row in page}
+    assert names == {"sales_2023.csv", "sales_2024.csv"}
+    names = {row["name"] for page in _walk(client, prefix="sales%") for row in page}
+    assert names == {"sales%.csv"}
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/datasets/", params={"cursor": "not-a-cursor"}).status_code == 400
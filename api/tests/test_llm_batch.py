@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from api.services.llm_batch import BatchingLLMClient
+from api.services.llm_client import LLMClient, LLMError, LLMRequestError
+
+class FakeClient(LLMClient):
+    """Answers with the upper-cased prompt; `error` makes every batch with a "bad" prompt fail."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.requests = []
+
+    def cache_identity(self):
+        return {"client": "fake"}
+
+    async def generate(self, prompt, timeout=None, use_cache=True):
+        return (await self.generate_batch([prompt], timeout))[0]
+
+    async def generate_batch(self, prompts, timeout=None):
+        self.requests.append(list(prompts))
+        if self.error is not None and "bad" in prompts:
+            raise self.error
+        return [p.upper() for p in prompts]
+
+    async def generate_stream(self, prompt, timeout=None, use_cache=True):
+        yield prompt
+
+def _run(client, prompts):
+    async def main():
+        return await asyncio.gather(*(client.generate(p) for p in prompts), return_exceptions=True)
+    return asyncio.run(main())
+
+def test_concurrent_prompts_share_one_request():
+    inner = FakeClient()
+    client = BatchingLLMClient(inner, window_ms=5)
+    assert _run(client, ["a", "b", "c"]) == ["A", "B", "C"]
+    assert inner.requests == [["a", "b", "c"]]
+    assert client.stats()["mean_batch_size"] == 3
+    assert not client._tasks
+
+def test_failed_batch_does_not_fan_out():
+    inner = FakeClient(LLMError("upstream unavailable"))
+    client = BatchingLLMClient(inner, window_ms=5)
+    results = _run(client, ["a", "bad", "c"])
+    assert all(isinstance(r, LLMError) for r in results)
+    # The inner client already retried; the batch is not resent prompt by prompt
+    assert inner.requests == [["a", "bad", "c"]]
+
+def test_rejected_batch_fails_only_the_bad_prompt():
+    inner = FakeClient(LLMRequestError("prompt too long"))
+    client = BatchingLLMClient(inner, window_ms=5)
+    results = _run(client, ["a", "bad", "c"])
+    assert results[0] == "A" and results[2] == "C"
+    assert isinstance(results[1], LLMRequestError)
+    assert inner.requests[0] == ["a", "bad", "c"]
+    assert sorted(inner.requests[1:]) == [["a"], ["bad"], ["c"]]
@@ -0,0 +1,24 @@
+import zlib
+import numpy as np
+import pandas as pd
+from api.services import profile_store, sketches
+
+def test_split_keeps_only_scalars_in_the_overview(frame):
+    chunks = (frame.iloc[i:i + 500] for i in range(0, len(frame), 500))
+    profile = sketches.profile_chunks_approx(chunks)
+    overview, sections = profile_store.split(profile)
+
+    assert set(sections) == set(profile_store.SECTIONS) & set(profile)
+    assert {"schema", "preview", "distinct_counts", "error_bounds", "correlation_info"} <= set(sections)
+    stored = {k: v for k, v in overview.items() if k != "sections"}
+    assert stored == {"row_count": len(frame), "column_count": frame.shape[1], "approximate": True, "truncated": False}
+    assert overview["sections"] == {name: size for name, (_, size) in sections.items()}
+
+    schema = profile_store.decode(zlib.decompress(sections["schema"][0]))
+    assert schema == profile["schema"]
+
+def test_encode_writes_missing_values_as_null():
+    value = {"mean": np.float64("nan"), "max": pd.NaT, "count": np.int64(3), "min": pd.Timestamp("2024-01-02")}
+    assert profile_store.decode(profile_store.encode(value)) == {
+        "mean": None, "max": None, "count": 3, "min": "2024-01-02T00:00:00"
+    }
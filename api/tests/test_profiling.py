@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from api.services import eda, profiling
+
+NUMERIC = ["age", "income", "score"]
+CATEGORICAL = ["city", "flag"]
+EXACT_STATS = ["count", "missing_count", "min", "max"]
+
+def _quantiles(summary):
+    return np.array([summary[k] for k in ("25%", "50%", "75%")], dtype=float)
+
+def _assert_close_profiles(expected, actual):
+    """`actual` (streamed) matches `expected`: exact moments and counts, quantiles within its error bounds."""
+    assert actual["schema"] == expected["schema"]
+    assert actual["row_count"] == expected["row_count"]
+    bounds = actual["error_bounds"]["quantile_abs_error"]
+    for col in NUMERIC:
+        want, got = expected["summary"][col], actual["summary"][col]
+        for key in EXACT_STATS:
+            assert got[key] == want[key], (col, key)
+        assert got["mean"] == pytest.approx(want["mean"], rel=1e-12)
+        assert got["std"] == pytest.approx(want["std"], rel=1e-9)
+        assert np.abs(_quantiles(got) - _quantiles(want)).max() <= bounds[col]
+
+        want_bins, got_bins = expected["distributions"][col]["bins"], actual["distributions"][col]["bins"]
+        assert [b["range"] for b in got_bins] == [b["range"] for b in want_bins]
+        want_counts = np.array([b["count"] for b in want_bins])
+        got_counts = np.array([b["count"] for b in got_bins])
+        assert got_counts.sum() == want_counts.sum()
+        # Interpolated counts only move rows between neighbouring bins
+        assert np.abs(got_counts - want_counts).max() <= 0.01 * actual["row_count"]
+    for col in CATEGORICAL:
+        for key in ("count", "unique", "top", "freq", "missing_count"):
+            assert actual["summary"][col][key] == expected["summary"][col][key], (col, key)
+        assert actual["distributions"][col] == expected["distributions"][col]
+
+def test_streaming_profile_matches_in_memory_profile(csv_path):
+    expected = eda.analyze_dataset(f"file://{csv_path}")
+    streamed = eda.analyze_dataset(f"file://{csv_path}", chunksize=300)
+    assert "error" not in expected and "error" not in streamed
+    _assert_close_profiles(expected, streamed)
+    for col in NUMERIC:
+        for other in NUMERIC:
+            assert streamed["correlation"][col][other] == pytest.approx(expected["correlation"][col][other], abs=1e-6)
+
+@pytest.mark.parametrize("split", [1, 700, 1999])
+def test_merged_accumulators_match_single_pass(frame, split):
+    single = profiling.ProfileAccumulator()
+    single.update(frame)
+    left, right = profiling.ProfileAccumulator(), profiling.ProfileAccumulator()
+    left.update(frame.iloc[:split])
+    right.update(frame.iloc[split:])
+    left.merge(right)
+
+    expected, merged = single.finalize(), left.finalize()
+    assert merged["row_count"] == expected["row_count"] == len(frame)
+    for col in NUMERIC:
+        want, got = expected["summary"][col], merged["summary"][col]
+        for key in EXACT_STATS:
+            assert got[key] == want[key], (col, key)
+        assert got["mean"] == pytest.approx(want["mean"], rel=1e-12)
+        assert got["std"] == pytest.approx(want["std"], rel=1e-9)
+        # The merged histogram may sit on a coarser grid than a single pass
+        exact = frame[col].quantile([0.25, 0.5, 0.75]).to_numpy()
+        assert np.abs(_quantiles(got) - exact).max() <= merged["error_bounds"]["quantile_abs_error"][col]
+    for col in CATEGORICAL:
+        assert merged["summary"][col] == expected["summary"][col]
+        assert merged["distributions"][col] == expected["distributions"][col]
+    np.testing.assert_allclose(left.comoments.corr(), single.comoments.corr(), atol=1e-9)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from api.services import sketches
+
+QUANTILES = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+def _rank_error(ordered, value, q):
+    """Distance of q from the ranks `value` takes in `ordered` (an interval, with ties)."""
+    lo = np.searchsorted(ordered, value, side="left") / len(ordered)
+    hi = np.searchsorted(ordered, value, side="right") / len(ordered)
+    return max(lo - q, q - hi, 0.0)
+
+def _rank_errors(sketch, values):
+    ordered = np.sort(values)
+    return [_rank_error(ordered, sketch.quantile(q), q) for q in QUANTILES]
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_kll_rank_error_within_bound(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(size=200000)
+    sketch = sketches.KLLSketch(seed=seed)
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+    assert sketch.n == len(values)
+    assert max(_rank_errors(sketch, values)) <= sketch.rank_error
+
+def test_merged_kll_rank_error_within_bound():
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=200000)
+    merged = sketches.KLLSketch(seed=0)
+    for i, chunk in enumerate(np.array_split(values, 8)):
+        part = sketches.KLLSketch(seed=i + 1)
+        part.update(chunk)
+        merged.merge(part)
+    assert merged.n == len(values)
+    assert max(_rank_errors(merged, values)) <= merged.rank_error
+
+@pytest.mark.parametrize("distinct", [100, 5000, 300000])
+def test_hll_estimate_within_bound(distinct):
+    hll = sketches.HyperLogLog()
+    # Repeated values must not count twice
+    values = pd.Series(np.tile(np.arange(distinct), 2))
+    step = len(values) // 4
+    for start in range(0, len(values), step):
+        hll.update(sketches.hash_values(values.iloc[start:start + step]))
+    # Three standard errors
+    assert abs(hll.estimate() - distinct) <= 3 * hll.relative_error * distinct
+
+def test_merged_hll_matches_single_pass():
+    values = pd.Series(np.arange(50000).astype(str))
+    single, left, right = sketches.HyperLogLog(), sketches.HyperLogLog(), sketches.HyperLogLog()
+    single.update(sketches.hash_values(values))
+    left.update(sketches.hash_values(values.iloc[:30000]))
+    right.update(sketches.hash_values(values.iloc[20000:]))
+    left.merge(right)
+    assert left.estimate() == single.estimate()
+
+def test_approximate_profile_reports_bounds_it_meets(frame):
+    chunks = (frame.iloc[i:i + 300] for i in range(0, len(frame), 300))
+    profile = sketches.profile_chunks_approx(chunks)
+    bounds = profile["error_bounds"]
+    assert profile["approximate"] and not profile["truncated"]
+    for col in ["age", "income", "score"]:
+        values = frame[col].dropna().to_numpy()
+        ordered = np.sort(values)
+        for key, q in (("25%", 0.25), ("50%", 0.5), ("75%", 0.75)):
+            assert _rank_error(ordered, profile["summary"][col][key], q) <= bounds["quantile_rank_error"], (col, key)
+        distinct = frame[col].nunique()
+        assert abs(profile["distinct_counts"][col] - distinct) <= 3 * bounds["distinct_relative_error"] * distinct
+    assert profile["summary"]["city"]["top"] == frame["city"].mode()[0]
+    assert bounds["top_count_error"]["city"] == 0
@@ -0,0 +1,44 @@
+import io
+import hashlib
+from fastapi import UploadFile
+from api.services import storage
+
+def test_upload_progress_is_published_while_storing(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "LOCAL_ROOT", tmp_path)
+    monkeypatch.setattr(storage, "CHUNK_SIZE", 1000)
+    data = b"x,y\n" + b"1,2\n" * 1000
+    seen = []
+
+    with storage.track_upload("t1", "up-1", len(data)) as progress:
+        def record(bytes_stored):
+            progress(bytes_stored)
+            seen.append(storage.upload_progress("t1", "up-1"))
+
+        path, content_hash = storage.upload_blob(UploadFile(io.BytesIO(data), filename="a.csv"), "t1", record)
+        # Other tenants can't see it
+        assert storage.upload_progress("t2", "up-1") is None
+
+    assert content_hash == hashlib.sha256(data).hexdigest()
+    assert open(path.replace("file://", ""), "rb").read() == data
+    assert [p["bytes_stored"] for p in seen] == [1000, 2000, 3000, 4000, len(data)]
+    assert all(p["total_bytes"] == len(data) for p in seen)
+    assert storage.upload_progress("t1", "up-1") is None
+
+def test_failed_upload_clears_its_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "LOCAL_ROOT", tmp_path)
+
+    class Broken(io.BytesIO):
+        def read(self, size=-1):
+            raise OSError("connection reset")
+
+    try:
+        with storage.track_upload("t1", "up-2") as progress:
+            storage.upload_blob(UploadFile(Broken(), filename="a.csv"), "t1", progress)
+    except OSError:
+        pass
+    assert storage.upload_progress("t1", "up-2") is None
+    assert not list((tmp_path / "t1" / "blobs").iterdir())
+
+def test_track_upload_without_id():
+    with storage.track_upload("t1", None) as progress:
+        assert progress is None
@@ -0,0 +1,68 @@
+import os
+import numpy as np
+from api.services.vector_index import VectorIndex, VectorStore, VECTORS_FILE, PAYLOADS_FILE
+
+DIM = 8
+
+def _vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, DIM))
+
+def test_search_returns_nearest_first():
+    store = VectorStore(None)
+    vectors = _vectors(20)
+    store.add("d", vectors, [{"i": i} for i in range(20)])
+    hits = store.search("d", vectors[7], limit=3)
+    assert hits[0][1] == {"i": 7}
+    assert abs(hits[0][0] - 1.0) < 1e-6
+    assert [score for score, _ in hits] == sorted((score for score, _ in hits), reverse=True)
+    assert store.search("other", vectors[0]) == []
+
+def test_adds_append_and_reload(tmp_path):
+    vectors = _vectors(10)
+    store = VectorStore(str(tmp_path))
+    store.add("d", vectors[:6], [{"i": i} for i in range(6)])
+    size = os.path.getsize(tmp_path / "d" / VECTORS_FILE)
+    store.add("d", vectors[6:], [{"i": i, "text": "line\nbreak"} for i in range(6, 10)])
+    # Only the new rows are written
+    assert os.path.getsize(tmp_path / "d" / VECTORS_FILE) == size + 4 * DIM * 4
+
+    reloaded = VectorStore(str(tmp_path))
+    assert reloaded.search("d", vectors[8], limit=1)[0][1] == {"i": 8, "text": "line\nbreak"}
+    reloaded.add("d", _vectors(1, seed=1), [{"i": 10}])
+    assert VectorIndex.load(tmp_path / "d").size == 11
+
+def test_uncommitted_tail_is_ignored_and_cut(tmp_path):
+    vectors = _vectors(5)
+    VectorStore(str(tmp_path)).add("d", vectors, [{"i": i} for i in range(5)])
+    # A save that crashed before its manifest was written
+    with open(tmp_path / "d" / VECTORS_FILE, "ab") as f:
+        f.write(b"\0" * 12)
+    with open(tmp_path / "d" / PAYLOADS_FILE, "ab") as f:
+        f.write(b'{"i": ')
+
+    store = VectorStore(str(tmp_path))
+    assert store.search("d", vectors[4], limit=1)[0][1] == {"i": 4}
+    store.add("d", _vectors(1, seed=1), [{"i": 5}])
+    index = VectorIndex.load(tmp_path / "d")
+    assert index.size == 6 and index.payloads[-1] == {"i": 5}
+    assert os.path.getsize(tmp_path / "d" / VECTORS_FILE) == 6 * DIM * 4
+
+def test_loaded_indexes_are_bounded(tmp_path):
+    store = VectorStore(str(tmp_path), cache_size=2)
+    vectors = _vectors(3)
+    for i, name in enumerate(["a", "b", "c"]):
+        store.add(name, vectors[i:i + 1], [{"name": name}])
+    assert list(store.indexes) == ["b", "c"]
+    # Evicted indexes are reloaded from disk
+    assert store.search("a", vectors[0], limit=1)[0][1] == {"name": "a"}
+    assert list(store.indexes) == ["c", "a"]
+
+def test_delete_drops_the_index(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vectors = _vectors(2)
+    store.add("a", vectors[:1], [{"name": "a"}])
+    store.add("b", vectors[1:], [{"name": "b"}])
+    store.delete("a")
+    assert "a" not in store.indexes and not (tmp_path / "a").exists()
+    assert store.search("a", vectors[0]) == []
+    assert store.search("b", vectors[1], limit=1)[0][1] == {"name": "b"}
@@ -0,0 +1,60 @@
+"""
+Synthetic CSVs for benchmarks: mixed numeric, categorical and
+missing-heavy columns, written in blocks so 1e7-row files don't need
+1e7 rows in memory.
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+# (numeric, categorical, missing-heavy) column counts per table shape
+SHAPES = {
+    "narrow": (6, 3, 2),
+    "wide": (150, 40, 10),
+}
+BLOCK_ROWS = 250_000
+
+def _block(rng: np.random.Generator, rows: int, shape: str) -> pd.DataFrame:
+    numeric, categorical, sparse = SHAPES[shape]
+    data = {}
+    base = rng.normal(size=rows)
+    for i in range(numeric):
+        kind = i % 3
+        if kind == 0:
+            # Correlated with the shared base column
+            data[f"num_{i}"] = base * (i % 5 + 1) + rng.normal(scale=0.5, size=rows)
+        elif kind == 1:
+            data[f"num_{i}"] = rng.lognormal(mean=3, sigma=1, size=rows).round(2)
+        else:
+            data[f"num_{i}"] = rng.integers(0, 1000, size=rows)
+    for i in range(categorical):
+        # Cardinalities from a handful to thousands, Zipf-skewed
+        cardinality = 5 * 10 ** (i % 4)
+        codes = np.minimum(rng.zipf(1.3, size=rows), cardinality) - 1
+        data[f"cat_{i}"] = np.char.add(f"c{i}_", codes.astype(str))
+    for i in range(sparse):
+        values = rng.normal(size=rows)
+        values[rng.random(rows) < 0.9] = np.nan
+        data[f"sparse_{i}"] = values
+    return pd.DataFrame(data)
+
+def generate_csv(path: str, rows: int, shape: str = "narrow", seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    written = 0
+    with open(path, "w", newline="") as f:
+        while written < rows or written == 0:
+            block = _block(rng, min(BLOCK_ROWS, rows - written), shape)
+            block.to_csv(f, index=False, header=written == 0)
+            written += len(block)
+            if rows == 0:
+                break
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=float, default=1e5)
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="narrow")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_csv(args.path, int(args.rows), args.shape, args.seed)
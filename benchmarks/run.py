@@ -0,0 +1,189 @@
+"""
+Benchmark suite: times profiling, indexing/retrieval and the API flow
+(upload -> status -> insights -> story -> chat) over synthetic datasets and
+writes the results as JSON, so runs can be compared across commits.
+
+    python -m benchmarks.run --rows 1e3,1e5 --shapes narrow,wide --output out.json
+
+The API runs in-process against a throwaway SQLite database and local
+storage in a temporary directory, with the mock LLM client and a
+configurable simulated completion latency, which every LLM stage
+(insights, story, chat) includes.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def _timed(fn, repeat: int = 1):
+    """Runs fn `repeat` times; returns (last result, median seconds)."""
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+def bench_profile(path: str, repeat: int) -> dict:
+    from api.services import eda
+    results = {}
+    for mode in (eda.EXACT, eda.APPROXIMATE):
+        profile, seconds = _timed(lambda: eda.analyze_dataset(f"file://{path}", mode=mode), repeat)
+        if "error" in profile:
+            raise RuntimeError(f"{mode} profile failed: {profile['error']}")
+        results[mode] = {"seconds": round(seconds, 4)}
+    return results
+
+def bench_rag(texts: int, queries: int) -> dict:
+    from api.services import rag
+    dataset_id = str(uuid.uuid4())
+    docs = [f"Insight {i}: column num_{i % 7} is skewed and correlates with cat_{i % 3}" for i in range(texts)]
+    _, index_seconds = _timed(lambda: rag.index_text(dataset_id, docs, [{"type": "insight"}] * len(docs)))
+    start = time.perf_counter()
+    for i in range(queries):
+        rag.search(dataset_id, f"which columns relate to num_{i % 7}?")
+    search_seconds = time.perf_counter() - start
+    return {
+        "index_seconds": round(index_seconds, 4),
+        "texts": texts,
+        "search_ms_mean": round(1000 * search_seconds / queries, 3),
+        "queries": queries
+    }
+
+def bench_api(client, headers: dict, path: str) -> dict:
+    stages = {}
+
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        r = client.post("/datasets/upload", headers=headers, files={"file": (os.path.basename(path), f, "text/csv")})
+    r.raise_for_status()
+    dataset_id = r.json()["id"]
+    stages["upload"] = time.perf_counter() - start
+
+    # Time from upload to a ready profile, as a client polling /status sees it
+    start = time.perf_counter()
+    while True:
+        status = client.get(f"/datasets/{dataset_id}/status", headers=headers).json()["status"]
+        if status in ("ready", "failed"):
+            break
+        time.sleep(0.02)
+    if status != "ready":
+        raise RuntimeError(f"Dataset {dataset_id} failed to profile")
+    stages["ready"] = time.perf_counter() - start
+
+    for stage, method, url, body in (
+        ("insights", "post", f"/datasets/{dataset_id}/insights", None),
+        ("story", "post", f"/datasets/{dataset_id}/story", None),
+        ("chat", "post", f"/datasets/{dataset_id}/chat", {"message": "Which columns have missing values?"}),
+    ):
+        start = time.perf_counter()
+        r = getattr(client, method)(url, headers=headers, json=body)
+        r.raise_for_status()
+        stages[stage] = time.perf_counter() - start
+
+    stages["total"] = sum(stages.values())
+    return {stage: round(seconds, 4) for stage, seconds in stages.items()}
+
+def _parse_rows(value: str):
+    return [int(float(v)) for v in value.split(",") if v]
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--rows", default="1e3,1e5", help="Comma-separated row counts, e.g. 1e3,1e5,1e7")
+    parser.add_argument("--shapes", default="narrow,wide", help="Comma-separated table shapes (narrow, wide)")
+    parser.add_argument("--repeat", type=int, default=1, help="Profiling runs per dataset; the median is reported")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated LLM completion latency")
+    parser.add_argument("--rag-texts", type=int, default=200)
+    parser.add_argument("--rag-queries", type=int, default=50)
+    parser.add_argument("--skip-api", action="store_true", help="Only benchmark profiling and retrieval")
+    parser.add_argument("--output", help="Write results to this JSON file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    from benchmarks.datagen import generate_csv, SHAPES
+    shapes = [s for s in args.shapes.split(",") if s]
+    unknown = set(shapes) - set(SHAPES)
+    if unknown:
+        parser.error(f"Unknown shapes: {', '.join(sorted(unknown))}")
+
+    # The database, uploads and vector index live at relative paths, so the
+    # app is imported from inside a scratch directory
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    cwd = os.getcwd()
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    try:
+        from api.seed import seed
+        from api.services import llm_client
+        from api.services.llm_client import MockLLMClient
+        seed()
+        llm_client.set_llm_client(MockLLMClient(latency_ms=args.llm_latency_ms))
+
+        results = []
+        api = None
+        if not args.skip_api:
+            from fastapi.testclient import TestClient
+            from api.main import app
+            api = TestClient(app)
+            api.__enter__()
+        try:
+            for shape in shapes:
+                for rows in _parse_rows(args.rows):
+                    path = os.path.join(workdir, f"{shape}_{rows}.csv")
+                    generate_csv(path, rows, shape)
+                    entry = {
+                        "shape": shape,
+                        "rows": rows,
+                        "file_mb": round(os.path.getsize(path) / 1e6, 2),
+                        "profile": bench_profile(path, args.repeat)
+                    }
+                    if api is not None:
+                        entry["api"] = bench_api(api, {"X-User-Email": "analyst@example.com"}, path)
+                    print(f"{shape} x {rows}: {json.dumps(entry)}", file=sys.stderr)
+                    results.append(entry)
+                    os.remove(path)
+        finally:
+            if api is not None:
+                api.__exit__(None, None, None)
+
+        report = {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "llm_latency_ms": args.llm_latency_ms,
+            "datasets": results,
+            "rag": bench_rag(args.rag_texts, args.rag_queries)
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if output:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+if __name__ == "__main__":
+    main()
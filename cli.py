@@ -3,27 +3,59 @@ from sdk.client import DataStoryClient
 from rich.console import Console
 from rich.table import Table
 import json
+import itertools
 
 app = typer.Typer()
 console = Console()
 client = DataStoryClient()
 
 @app.command()
-def upload(file_path: str):
+def upload(file_path: str, wait: bool = typer.Option(True, help="Wait for the analysis to finish."),
+           approximate: bool = typer.Option(False, help="Profile with sketches (faster, bounded memory).")):
     """Upload a CSV dataset."""
     try:
         with console.status("Uploading..."):
-            ds = client.upload_dataset(file_path)
+            ds = client.upload_dataset(file_path, profile_mode="approximate" if approximate else "exact")
         console.print(f"[green]Success![/green] Dataset uploaded with ID: [bold]{ds['id']}[/bold]")
+        if not wait:
+            console.print(f"Status: {ds['status']}")
+            return
+        with console.status("Analyzing..."):
+            ds = client.wait_for_dataset(ds['id'])
         rows = ds['meta_info'].get('row_count', 'N/A')
-        console.print(f"Stats: {rows} rows")
+        note = " (approximate profile)" if ds['meta_info'].get('approximate') else ""
+        console.print(f"Stats: {rows} rows{note}")
     except Exception as e:
         console.print(f"[red]Error:[/red] {e}")
 
 @app.command()
-def list():
-    """List all datasets."""
-    datasets = client.list_datasets()
+def append(dataset_id: str, file_path: str, wait: bool = typer.Option(True, help="Wait for the profile update.")):
+    """Append rows with the same columns to a dataset."""
+    try:
+        with console.status("Appending..."):
+            res = client.append_rows(dataset_id, file_path, wait=wait)
+        if wait:
+            console.print(f"[green]Success![/green] Stats: {res['meta_info'].get('row_count', 'N/A')} rows")
+        else:
+            console.print(f"[green]Success![/green] Chunk {res['seq']} queued")
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {e}")
+
+@app.command()
+def status(dataset_id: str):
+    """Show the analysis status of a dataset."""
+    res = client.get_status(dataset_id)
+    console.print(f"Status: [bold]{res['status']}[/bold]")
+    if res.get('error'):
+        console.print(f"[red]Error:[/red] {res['error']}")
+
+@app.command()
+def list(prefix: str = typer.Option(None, help="Only datasets whose name starts with this."),
+         limit: int = typer.Option(None, help="Show at most this many datasets.")):
+    """List datasets, newest first."""
+    datasets = client.iter_datasets(prefix=prefix)
+    if limit is not None:
+        datasets = itertools.islice(datasets, limit)
     table = Table(title="My Datasets")
     table.add_column("ID", style="cyan")
     table.add_column("Name", style="magenta")
@@ -35,10 +67,10 @@ def list():
     console.print(table)
 
 @app.command()
-def insights(dataset_id: str):
+def insights(dataset_id: str, no_cache: bool = typer.Option(False, help="Bypass the LLM response cache.")):
     """Generate insights for a dataset."""
     with console.status("Generating Insights..."):
-        insights = client.generate_insights(dataset_id)
+        insights = client.generate_insights(dataset_id, no_cache=no_cache)
     
     for i in insights:
         console.print(f"[bold]{i['title']}[/bold]")
@@ -47,18 +79,44 @@ def insights(dataset_id: str):
         console.print("-" * 20)
 
 @app.command()
-def chat(dataset_id: str, message: str):
+def chat(dataset_id: str, message: str, stream: bool = typer.Option(True, help="Print tokens as they arrive.")):
     """Ask a question about the dataset."""
+    if stream:
+        console.print("[bold blue]AI:[/bold blue] ", end="")
+        for token in client.chat(dataset_id, message, stream=True):
+            console.print(token, end="", markup=False, highlight=False)
+        console.print()
+        return
     with console.status("Thinking..."):
         res = client.chat(dataset_id, message)
     console.print(f"[bold blue]AI:[/bold blue] {res['response']}")
 
 @app.command()
-def story(dataset_id: str):
+def story(dataset_id: str, no_cache: bool = typer.Option(False, help="Bypass the LLM response cache."),
+          stream: bool = typer.Option(True, help="Print tokens as they arrive.")):
     """Generate a story for the dataset."""
+    if stream:
+        for token in client.generate_story(dataset_id, no_cache=no_cache, stream=True):
+            console.print(token, end="", markup=False, highlight=False)
+        console.print()
+        return
     with console.status("Writing Story..."):
-        res = client.generate_story(dataset_id)
+        res = client.generate_story(dataset_id, no_cache=no_cache)
+    console.print(res['story'])
+
+@app.command()
+def pipeline(dataset_id: str, no_cache: bool = typer.Option(False, help="Bypass the LLM response cache.")):
+    """Generate insights and the story in one request."""
+    with console.status("Running pipeline..."):
+        res = client.run_pipeline(dataset_id, no_cache=no_cache)
+
+    for i in res['insights']:
+        console.print(f"[bold]{i['title']}[/bold]")
+        console.print(f"{i['description']}")
+    console.print("-" * 20)
     console.print(res['story'])
+    timings = ", ".join(f"{k.replace('_ms', '')} {v:.0f} ms" for k, v in res['timings'].items())
+    console.print(f"[dim]{timings}[/dim]")
 
 if __name__ == "__main__":
     app()
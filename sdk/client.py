@@ -1,49 +1,213 @@
 import requests
+import json
 import os
+import time
+from urllib.parse import quote
+
+def _iter_sse(response):
+    """Yields (event, data) pairs from a Server-Sent Events response."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+def _iter_tokens(response):
+    with response:
+        response.raise_for_status()
+        for event, data in _iter_sse(response):
+            if event == "error":
+                raise RuntimeError(data.get("error"))
+            if event == "done":
+                return
+            yield data["token"]
 
 class DataStoryClient:
     def __init__(self, base_url="http://localhost:8000", email="analyst@example.com"):
         self.base_url = base_url
         self.headers = {"X-User-Email": email}
 
-    def upload_dataset(self, file_path):
-        """Uploads a CSV file and returns the dataset object."""
+    def upload_dataset(self, file_path, wait=False, timeout=600, poll_interval=1.0, profile_mode="exact",
+                       upload_id=None):
+        """
+        Uploads a CSV file. Analysis runs in the background, so this returns
+        {id, name, status} right away unless `wait` is set, in which case it
+        blocks until the profile is ready and returns the full dataset object.
+        `profile_mode="approximate"` uses bounded-memory sketches for huge files.
+        With `upload_id`, get_upload_progress(upload_id) reports the bytes
+        stored so far from another thread while this call runs.
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
             
         with open(file_path, "rb") as f:
             files = {"file": f}
-            response = requests.post(f"{self.base_url}/datasets/upload", headers=self.headers, files=files)
+            response = requests.post(f"{self.base_url}/datasets/upload", headers=self.headers, files=files,
+                                     params={"profile_mode": profile_mode, "upload_id": upload_id})
             response.raise_for_status()
-            return response.json()
+            dataset = response.json()
 
-    def list_datasets(self):
-        """Lists all datasets for the user."""
-        response = requests.get(f"{self.base_url}/datasets/", headers=self.headers)
+        if wait:
+            return self.wait_for_dataset(dataset["id"], timeout=timeout, poll_interval=poll_interval)
+        return dataset
+
+    def get_upload_progress(self, upload_id):
+        """Bytes stored so far of an upload sent with `upload_id`, or None if it is not in progress."""
+        response = requests.get(f"{self.base_url}/datasets/uploads/{upload_id}", headers=self.headers)
+        if response.status_code == 404:
+            return None
         response.raise_for_status()
         return response.json()
 
+    def get_status(self, dataset_id):
+        """Gets the analysis status (pending, running, ready, failed) of a dataset."""
+        response = requests.get(f"{self.base_url}/datasets/{dataset_id}/status", headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def wait_for_dataset(self, dataset_id, timeout=600, poll_interval=1.0):
+        """Polls until the dataset is analyzed and returns it."""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.get_status(dataset_id)
+            if status["status"] == "ready":
+                return self.get_dataset(dataset_id)
+            if status["status"] == "failed":
+                raise RuntimeError(f"Analysis failed: {status.get('error')}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Dataset {dataset_id} still {status['status']} after {timeout}s")
+            time.sleep(poll_interval)
+
+    def append_rows(self, dataset_id, file_path, wait=False, timeout=600, poll_interval=1.0, upload_id=None):
+        """
+        Appends the rows of a CSV with the same columns to a dataset. With
+        `wait`, blocks until the profile includes them and returns the dataset.
+        `upload_id` works as in upload_dataset.
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        with open(file_path, "rb") as f:
+            files = {"file": f}
+            response = requests.post(f"{self.base_url}/datasets/{dataset_id}/append", headers=self.headers, files=files,
+                                     params={"upload_id": upload_id})
+            response.raise_for_status()
+            chunk = response.json()
+
+        if not wait:
+            return chunk
+
+        deadline = time.time() + timeout
+        while self.get_status(dataset_id).get("pending_appends"):
+            if time.time() > deadline:
+                raise TimeoutError(f"Append to dataset {dataset_id} not profiled after {timeout}s")
+            time.sleep(poll_interval)
+        return self.get_dataset(dataset_id)
+
+    def list_datasets(self, limit=50, cursor=None, prefix=None):
+        """
+        Lists one page of the user's datasets, newest first. Returns
+        (datasets, next_cursor); next_cursor is None on the last page.
+        """
+        params = {"limit": limit, "cursor": cursor, "prefix": prefix}
+        response = requests.get(f"{self.base_url}/datasets/", headers=self.headers,
+                                params={k: v for k, v in params.items() if v is not None})
+        response.raise_for_status()
+        return response.json(), response.headers.get("X-Next-Cursor")
+
+    def iter_datasets(self, prefix=None, page_size=50):
+        """Yields all of the user's datasets, newest first, fetching pages as needed."""
+        cursor = None
+        while True:
+            datasets, cursor = self.list_datasets(limit=page_size, cursor=cursor, prefix=prefix)
+            yield from datasets
+            if not cursor:
+                return
+
     def get_dataset(self, dataset_id):
         """Gets details of a specific dataset."""
         response = requests.get(f"{self.base_url}/datasets/{dataset_id}", headers=self.headers)
         response.raise_for_status()
         return response.json()
 
-    def generate_insights(self, dataset_id):
-        """Triggers insight generation."""
-        response = requests.post(f"{self.base_url}/datasets/{dataset_id}/insights", headers=self.headers)
+    def delete_dataset(self, dataset_id):
+        """Deletes a dataset with its profile and search index."""
+        response = requests.delete(f"{self.base_url}/datasets/{dataset_id}", headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def get_profile(self, dataset_id, fields=None):
+        """
+        Gets a dataset's profile. `fields` (e.g. ["summary.Age", "distributions"])
+        limits it to those parts.
+        """
+        params = {"fields": ",".join(fields)} if fields else None
+        response = requests.get(f"{self.base_url}/datasets/{dataset_id}/profile", headers=self.headers, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def get_distribution(self, dataset_id, column, bins=None, value_range=None, top=None):
+        """
+        Histogram of a numeric column (`bins` bins over `value_range`, a
+        (min, max) tuple) or the `top` values of a categorical one.
+        """
+        params = {}
+        if bins is not None:
+            params["bins"] = bins
+        if value_range is not None:
+            params["range"] = f"{value_range[0]},{value_range[1]}"
+        if top is not None:
+            params["top"] = top
+        response = requests.get(f"{self.base_url}/datasets/{dataset_id}/columns/{quote(column, safe='')}/distribution",
+                                headers=self.headers, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def get_column_correlations(self, dataset_id, column, top=20):
+        """Gets the strongest correlations of a numeric column with the other columns."""
+        response = requests.get(f"{self.base_url}/datasets/{dataset_id}/columns/{quote(column, safe='')}/correlations",
+                                headers=self.headers, params={"top": top})
+        response.raise_for_status()
+        return response.json()
+
+    def generate_insights(self, dataset_id, no_cache=False):
+        """Triggers insight generation. `no_cache` bypasses the server's LLM response cache."""
+        response = requests.post(f"{self.base_url}/datasets/{dataset_id}/insights", headers=self.headers,
+                                 params={"no_cache": no_cache})
+        response.raise_for_status()
+        return response.json()
+
+    def generate_story(self, dataset_id, no_cache=False, stream=False):
+        """
+        Triggers story generation. `no_cache` bypasses the server's LLM
+        response cache. With `stream`, returns an iterator over the story's
+        tokens as they are generated; the server saves the story at the end.
+        """
+        response = requests.post(f"{self.base_url}/datasets/{dataset_id}/story", headers=self.headers,
+                                 params={"no_cache": no_cache, "stream": stream}, stream=stream)
+        if stream:
+            return _iter_tokens(response)
         response.raise_for_status()
         return response.json()
 
-    def generate_story(self, dataset_id):
-        """Triggers story generation."""
-        response = requests.post(f"{self.base_url}/datasets/{dataset_id}/story", headers=self.headers)
+    def run_pipeline(self, dataset_id, no_cache=False):
+        """Generates insights and the story in one call. Returns both plus per-stage timings."""
+        response = requests.post(f"{self.base_url}/datasets/{dataset_id}/pipeline", headers=self.headers,
+                                 params={"no_cache": no_cache})
         response.raise_for_status()
         return response.json()
 
-    def chat(self, dataset_id, message):
-        """Chat with the dataset."""
+    def chat(self, dataset_id, message, no_cache=False, stream=False):
+        """Chat with the dataset. With `stream`, returns an iterator over the answer's tokens."""
         payload = {"message": message}
-        response = requests.post(f"{self.base_url}/datasets/{dataset_id}/chat", headers=self.headers, json=payload)
+        response = requests.post(f"{self.base_url}/datasets/{dataset_id}/chat", headers=self.headers, json=payload,
+                                 params={"no_cache": no_cache, "stream": stream}, stream=stream)
+        if stream:
+            return _iter_tokens(response)
         response.raise_for_status()
         return response.json()
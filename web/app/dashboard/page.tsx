@@ -46,6 +46,33 @@ export default function Dashboard() {
         }
     };
 
+    const waitForAnalysis = async (id: string) => {
+        const email = localStorage.getItem("userEmail");
+        // Analysis runs in the background after upload; poll until it settles
+        for (let attempt = 0; attempt < 600; attempt++) {
+            try {
+                const res = await fetch(`http://localhost:8000/datasets/${id}/status`, {
+                    headers: { "X-User-Email": email || "" }
+                });
+                if (res.ok) {
+                    const { status, error } = await res.json();
+                    if (status === "ready") {
+                        setMessage("Analysis complete.");
+                        break;
+                    }
+                    if (status === "failed") {
+                        setMessage(`Analysis failed: ${error}`);
+                        break;
+                    }
+                }
+            } catch (e) {
+                console.error(e);
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+        fetchDatasetDetails(id);
+    };
+
     const generateInsights = async () => {
         if (!selectedDataset) return;
         setGenerating(true);
@@ -134,6 +161,7 @@ export default function Dashboard() {
                 await fetchDatasets();
                 const newDs = await res.json();
                 fetchDatasetDetails(newDs.id);
+                waitForAnalysis(newDs.id);
             } else {
                 const err = await res.json();
                 setMessage(`Error: ${err.detail}`);
@@ -1,6 +1,6 @@
 "use client";
 
-import { useState } from "react";
+import { useState, useEffect } from "react";
 import {
     BarChart,
     Bar,
@@ -11,18 +11,72 @@ import {
     ResponsiveContainer,
 } from "recharts";
 
+// Profile parts each tab needs, fetched from /profile when the tab is first shown
+const TAB_FIELDS: Record<string, string[]> = {
+    profile: ["schema", "summary", "distributions"],
+    correlation: ["correlation", "correlation_pairs"],
+};
+
+// Bins of a zoomed-in histogram
+const ZOOM_BINS = 20;
+
 export default function DatasetProfile({ data }: { data: any }) {
     const [tab, setTab] = useState("profile");
+    const [parts, setParts] = useState<Record<string, any>>({});
+    // Zoomed-in histograms by column, fetched from the distribution endpoint
+    const [zoom, setZoom] = useState<Record<string, any>>({});
+
+    useEffect(() => {
+        setParts({});
+        setZoom({});
+    }, [data?.id]);
+
+    const fetchDistribution = async (col: string, params: Record<string, string>) => {
+        const email = localStorage.getItem("userEmail");
+        const query = new URLSearchParams(params).toString();
+        const res = await fetch(`http://localhost:8000/datasets/${data.id}/columns/${encodeURIComponent(col)}/distribution?${query}`, {
+            headers: { "X-User-Email": email || "" }
+        });
+        if (!res.ok) throw new Error(`Distribution request failed: ${res.status}`);
+        return res.json();
+    };
+
+    // Clicking a histogram bar re-bins the values inside it
+    const zoomInto = async (col: string, index: number) => {
+        try {
+            // The stored profile has no bin edges; the same binning over the full range has
+            const edges = zoom[col]?.edges ?? (await fetchDistribution(col, { bins: String(parts.distributions[col].bins.length) })).edges;
+            if (!edges || index + 1 >= edges.length) return;
+            const dist = await fetchDistribution(col, { bins: String(ZOOM_BINS), range: `${edges[index]},${edges[index + 1]}` });
+            setZoom((prev) => ({ ...prev, [col]: dist }));
+        } catch (e) {
+            console.error(e);
+        }
+    };
+
+    useEffect(() => {
+        if (!data?.meta_info || data.meta_info.error) return;
+        const fields = TAB_FIELDS[tab].filter((f) => !(f in parts));
+        if (fields.length === 0) return;
+        const email = localStorage.getItem("userEmail");
+        fetch(`http://localhost:8000/datasets/${data.id}/profile?fields=${fields.join(",")}`, {
+            headers: { "X-User-Email": email || "" }
+        })
+            .then((res) => (res.ok ? res.json() : {}))
+            .then((profile) => setParts((prev) => ({ ...prev, ...Object.fromEntries(fields.map((f) => [f, profile[f] ?? null])) })))
+            .catch((e) => console.error(e));
+    }, [data?.id, data?.meta_info, tab, parts]);
 
     if (!data || !data.meta_info) return <div className="text-gray-500">Processing data... or no data available.</div>;
 
-    const { meta_info } = data;
-    const { summary, correlation, schema, distributions } = meta_info;
+    const { correlation, correlation_pairs, distributions } = parts;
+    const schema = parts.schema || {};
+    const summary = parts.summary || {};
 
     // Render a single distribution chart based on col name
     const renderChart = (col: string) => {
         if (!distributions || !distributions[col]) return <p className="text-xs text-gray-400">No chart data</p>;
-        const dist = distributions[col];
+        const dist = zoom[col] || distributions[col];
 
         let chartData = [];
         if (dist.type === "numeric") {
@@ -38,10 +92,29 @@ export default function DatasetProfile({ data }: { data: any }) {
                         <CartesianGrid strokeDasharray="3 3" vertical={false} />
                         <XAxis dataKey="name" hide />
                         <Tooltip />
-                        <Bar dataKey="count" fill="#8884d8" radius={[4, 4, 0, 0]} />
+                        <Bar
+                            dataKey="count"
+                            fill="#8884d8"
+                            radius={[4, 4, 0, 0]}
+                            cursor={dist.type === "numeric" ? "zoom-in" : undefined}
+                            onClick={(_: any, index: number) => dist.type === "numeric" && zoomInto(col, index)}
+                        />
                     </BarChart>
                 </ResponsiveContainer>
-                <p className="text-center text-xs text-gray-500 mt-1">{dist.type === "numeric" ? "Distribution" : "Top Values"}</p>
+                <p className="text-center text-xs text-gray-500 mt-1">
+                    {dist.type === "numeric" ? "Distribution" : "Top Values"}
+                    {zoom[col] && (
+                        <>
+                            {` (${zoom[col].range[0].toPrecision(3)} to ${zoom[col].range[1].toPrecision(3)}) `}
+                            <button
+                                className="text-blue-500"
+                                onClick={() => setZoom((prev) => { const { [col]: _, ...rest } = prev; return rest; })}
+                            >
+                                Reset
+                            </button>
+                        </>
+                    )}
+                </p>
             </div>
         );
     };
@@ -100,7 +173,33 @@ export default function DatasetProfile({ data }: { data: any }) {
             {tab === "correlation" && (
                 <div className="overflow-x-auto">
                     {(!correlation || Object.keys(correlation).length === 0) ? (
-                        <p>No numeric correlations available.</p>
+                        // Wide tables only keep the strongest pairs
+                        correlation_pairs && correlation_pairs.length > 0 ? (
+                            <table className="min-w-full text-sm text-left">
+                                <thead className="text-xs uppercase bg-gray-100 dark:bg-gray-700">
+                                    <tr>
+                                        <th className="px-4 py-2">Column A</th>
+                                        <th className="px-4 py-2">Column B</th>
+                                        <th className="px-4 py-2">r</th>
+                                    </tr>
+                                </thead>
+                                <tbody>
+                                    {correlation_pairs.map((p: any) => (
+                                        <tr key={`${p.a}|${p.b}`} className="border-b dark:border-gray-700">
+                                            <td className="px-4 py-2 font-bold">{p.a}</td>
+                                            <td className="px-4 py-2 font-bold">{p.b}</td>
+                                            <td className="px-4 py-2 bg-opacity-10" style={{
+                                                backgroundColor: `rgba(59, 130, 246, ${Math.abs(p.r)})`
+                                            }}>
+                                                {p.r.toFixed(2)}
+                                            </td>
+                                        </tr>
+                                    ))}
+                                </tbody>
+                            </table>
+                        ) : (
+                            <p>No numeric correlations available.</p>
+                        )
                     ) : (
                         <table className="min-w-full text-sm text-left">
                             <thead className="text-xs uppercase bg-gray-100 dark:bg-gray-700">